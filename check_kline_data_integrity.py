@@ -22,11 +22,11 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import pymysql
 import argparse
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Tuple, Set
 from tools.logger import logger
+from tools.db_pool import get_pool
 from config import mysql_config
 import pandas as pd
 
@@ -37,6 +37,7 @@ class KlineDataIntegrityChecker:
     def __init__(self):
         """初始化检查器"""
         self.mysql_config = mysql_config
+        self.db_pool = get_pool(self.mysql_config)
         self.current_time = datetime.now()
         # 排除最近15分钟的数据，因为可能还没有更新到数据库
         self.check_end_time = self.current_time - timedelta(minutes=15)
@@ -51,7 +52,7 @@ class KlineDataIntegrityChecker:
     def get_all_symbols_in_db(self) -> Dict[str, Dict]:
         """获取数据库中所有交易对及其数据统计"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             symbols_info = {}
@@ -139,7 +140,7 @@ class KlineDataIntegrityChecker:
     def check_1min_data_integrity(self, symbol: str) -> Dict[str, Any]:
         """检查1分钟K线数据完整性（当天数据）"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             # 计算时间范围
@@ -219,7 +220,7 @@ class KlineDataIntegrityChecker:
     def check_30min_data_integrity(self, symbol: str) -> Dict[str, Any]:
         """检查30分钟K线数据完整性（基于实际数据范围）"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             # 计算时间范围（30天前到今天00:00）
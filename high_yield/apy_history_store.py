@@ -0,0 +1,121 @@
+"""
+理财产品收益率曲线的本地存储
+
+按 (交易所, 产品, 曲线类型) 保存收益率时间序列，每个序列以已保存的最新时间点作为水位：
+1. 每轮只请求水位之后的新数据点并追加（水位点本身会重新获取，以更新未结束周期的数值）
+2. 距水位不足一个数据间隔时不发请求
+3. apy_day / apy_month 直接从本地读取
+
+用于GateIO uni-loan/earn/chart 和 Binance position-market-apr 曲线，替代每轮全量下载。
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from tools.logger import logger
+
+
+class ApyHistoryStore:
+    """基于SQLite的收益率曲线存储（线程安全）"""
+
+    def __init__(self, db_path: str, retention_days: int = 35, busy_timeout: float = 30):
+        """
+        :param db_path: SQLite数据库文件路径
+        :param retention_days: 数据保留天数
+        :param busy_timeout: 其他进程写入时等待锁的最长秒数
+        """
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.retention_ms = retention_days * 24 * 60 * 60 * 1000
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=busy_timeout, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS apy_history (
+                exchange TEXT NOT NULL,
+                product TEXT NOT NULL,
+                series TEXT NOT NULL,
+                timestamp INTEGER NOT NULL,
+                token TEXT NOT NULL,
+                apy REAL NOT NULL,
+                PRIMARY KEY (exchange, product, series, timestamp)
+            )
+        ''')
+        self._conn.commit()
+        self.stats = {'fetched': 0, 'skipped': 0, 'points': 0}
+
+    def watermark(self, exchange: str, product: str, series: str) -> Optional[int]:
+        """已保存的最新时间点（毫秒），没有数据时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MAX(timestamp) FROM apy_history WHERE exchange = ? AND product = ? AND series = ?',
+                (exchange, product, series)).fetchone()
+        return row[0]
+
+    def fetch_start(self, exchange: str, product: str, series: str, window_start_ms: int,
+                    interval_ms: int) -> Optional[int]:
+        """
+        计算增量请求的开始时间
+        :param window_start_ms: 需要的数据窗口开始时间（毫秒）
+        :param interval_ms: 数据点间隔（毫秒），距水位不足一个间隔时无需请求
+        :return: 请求的开始时间（毫秒），None表示本地数据已是最新
+        """
+        watermark = self.watermark(exchange, product, series)
+        if watermark is None or watermark < window_start_ms:
+            start = window_start_ms
+        elif time.time() * 1000 - watermark < interval_ms:
+            start = None
+        else:
+            start = watermark
+        with self._lock:
+            self.stats['skipped' if start is None else 'fetched'] += 1
+        return start
+
+    def append(self, exchange: str, token: str, product: str, series: str, points: List[Dict]):
+        """追加数据点 [{'timestamp': 毫秒, 'apy': 收益率}]，相同时间点覆盖"""
+        if not points:
+            return
+        rows = [(exchange, product, series, int(point['timestamp']), token, float(point['apy'])) for point in points]
+        try:
+            with self._lock:
+                with self._conn:
+                    self._conn.executemany('''
+                        INSERT OR REPLACE INTO apy_history (exchange, product, series, timestamp, token, apy)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', rows)
+                self.stats['points'] += len(rows)
+        except sqlite3.Error as e:
+            logger.error(f"保存{exchange} {token}收益率曲线失败: {str(e)}")
+
+    def load(self, exchange: str, product: str, series: str, since_ms: int) -> List[Dict]:
+        """读取since_ms之后（包含）的数据点，按时间升序"""
+        with self._lock:
+            rows = self._conn.execute('''
+                SELECT timestamp, apy FROM apy_history
+                WHERE exchange = ? AND product = ? AND series = ? AND timestamp >= ?
+                ORDER BY timestamp
+            ''', (exchange, product, series, since_ms)).fetchall()
+        return [{'timestamp': timestamp, 'apy': apy} for timestamp, apy in rows]
+
+    def prune(self):
+        """删除超过保留天数的数据"""
+        cutoff = int(time.time() * 1000) - self.retention_ms
+        with self._lock:
+            with self._conn:
+                deleted = self._conn.execute('DELETE FROM apy_history WHERE timestamp < ?', (cutoff,)).rowcount
+        if deleted:
+            logger.info(f"清理{deleted}条过期收益率曲线数据")
+
+    def log_stats(self):
+        """输出本轮的增量请求统计并重置"""
+        logger.info(f"📈 收益率曲线: 增量请求 {self.stats['fetched']} 次, 本地已是最新跳过 {self.stats['skipped']} 次, "
+                    f"新增/更新 {self.stats['points']} 个数据点")
+        self.stats = {'fetched': 0, 'skipped': 0, 'points': 0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
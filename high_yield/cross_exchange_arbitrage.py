@@ -222,9 +222,27 @@ def get_all_trading_pairs() -> Set[str]:
     
     return trading_pairs
 
+def add_ticker_info(result: Dict[str, Any], market: str, exchange: str, ticker: Dict[str, Any]):
+    """
+    把行情快照中的价格和交易量记录到交易对信息中（价格低于最小要求时跳过），合约同时记录资金费率
+    :param result: 交易对信息字典
+    :param market: spot 或 futures
+    :param exchange: 交易所名称
+    :param ticker: ExchangeAPI 行情快照中的行情，None表示交易所没有该交易对
+    """
+    if not ticker or ticker['price'] < min_token_price:  # 检查价格是否满足最小要求
+        return
+    result[market][exchange] = {
+        'price': ticker['price'],
+        'volume': ticker['volume']
+    }
+    if market == 'futures' and ticker['funding_rate'] is not None:
+        result['funding_rates'][exchange] = ticker['funding_rate'] * 100
+
 def get_trading_pair_info(api: ExchangeAPI, token: str) -> Dict[str, Any]:
     """
     获取交易对在各个交易所的价格和交易量信息
+    价格、交易量和资金费率来自 ExchangeAPI 的全市场行情快照，遍历所有交易对时每个交易所只请求一次
     :param api: ExchangeAPI实例
     :param token: 交易对
     :return: 交易对信息字典
@@ -234,115 +252,27 @@ def get_trading_pair_info(api: ExchangeAPI, token: str) -> Dict[str, Any]:
         'futures': {},
         'funding_rates': {}
     }
-    
-    # 获取Binance信息
-    try:
-        # 获取现货价格和交易量
-        spot_url = "https://api.binance.com/api/v3/ticker/24hr"
-        spot_params = {"symbol": token}
-        debug_log(f"Binance现货请求: URL={spot_url}, 参数={spot_params}")
-        spot_response = requests.get(spot_url, params=spot_params, proxies=api.session.proxies)
-        debug_log(f"Binance现货响应: 状态码={spot_response.status_code}, 内容={spot_response.text}")
-        if spot_response.status_code == 200:
-            spot_data = spot_response.json()
-            price = float(spot_data['lastPrice'])
-            if price >= min_token_price:  # 检查价格是否满足最小要求
-                result['spot']['Binance'] = {
-                    'price': price,
-                    'volume': float(spot_data['volume']) * price
-                }
-        
-        # 获取合约价格、交易量和资金费率
-        futures_url = "https://fapi.binance.com/fapi/v1/ticker/24hr"
-        futures_params = {"symbol": token}
-        debug_log(f"Binance合约请求: URL={futures_url}, 参数={futures_params}")
-        futures_response = requests.get(futures_url, params=futures_params, proxies=api.session.proxies)
-        debug_log(f"Binance合约响应: 状态码={futures_response.status_code}, 内容={futures_response.text}")
-        if futures_response.status_code == 200:
-            futures_data = futures_response.json()
-            price = float(futures_data['lastPrice'])
-            if price >= min_token_price:  # 检查价格是否满足最小要求
-                result['futures']['Binance'] = {
-                    'price': price,
-                    'volume': float(futures_data['volume']) * price
-                }
-                # 检查资金费率字段是否存在
-                if 'lastFundingRate' in futures_data:
-                    result['funding_rates']['Binance'] = float(futures_data['lastFundingRate']) * 100
-                else:
-                    debug_log(f"Binance合约数据中缺少lastFundingRate字段: {futures_data}")
-    except Exception as e:
-        logger.error(f"获取Binance {token}信息失败: {str(e)}")
-        debug_log(f"Binance异常详情: {str(e)}")
 
-    # 获取Bybit信息
-    try:
-        # 获取现货价格和交易量
-        spot_url = "https://api.bybit.com/v5/market/tickers"
-        spot_params = {"category": "spot"}
-        debug_log(f"Bybit现货请求: URL={spot_url}, 参数={spot_params}")
-        spot_response = requests.get(spot_url, params=spot_params, proxies=api.session.proxies)
-        debug_log(f"Bybit现货响应: 状态码={spot_response.status_code}, 内容={spot_response.text}")
-        if spot_response.status_code == 200:
-            spot_data = spot_response.json()
-            if spot_data["retCode"] == 0 and "result" in spot_data:
-                for item in spot_data["result"]["list"]:
-                    if item["symbol"] == token:
-                        price = float(item["lastPrice"])
-                        if price >= min_token_price:  # 检查价格是否满足最小要求
-                            result['spot']['Bybit'] = {
-                                'price': price,
-                                'volume': float(item["volume24h"]) * price
-                            }
-                        break
-        
-        # 获取合约价格、交易量和资金费率
-        futures_url = "https://api.bybit.com/v5/market/tickers"
-        futures_params = {"category": "linear"}
-        debug_log(f"Bybit合约请求: URL={futures_url}, 参数={futures_params}")
-        futures_response = requests.get(futures_url, params=futures_params, proxies=api.session.proxies)
-        debug_log(f"Bybit合约响应: 状态码={futures_response.status_code}, 内容={futures_response.text}")
-        if futures_response.status_code == 200:
-            futures_data = futures_response.json()
-            if futures_data["retCode"] == 0 and "result" in futures_data:
-                for item in futures_data["result"]["list"]:
-                    if item["symbol"] == token:
-                        price = float(item["lastPrice"])
-                        if price >= min_token_price:  # 检查价格是否满足最小要求
-                            result['futures']['Bybit'] = {
-                                'price': price,
-                                'volume': float(item["volume24h"]) * price
-                            }
-                            result['funding_rates']['Bybit'] = float(item["fundingRate"]) * 100
-                        break
-    except Exception as e:
-        logger.error(f"获取Bybit {token}信息失败: {str(e)}")
-        debug_log(f"Bybit异常详情: {str(e)}")
+    # 获取Binance和Bybit信息
+    for exchange in ['Binance', 'Bybit']:
+        try:
+            add_ticker_info(result, 'spot', exchange, api.get_spot_ticker(exchange, token))
+            add_ticker_info(result, 'futures', exchange, api.get_futures_ticker(exchange, token))
+            debug_log(f"{exchange}行情: 现货={result['spot'].get(exchange)}, 合约={result['futures'].get(exchange)}")
+        except Exception as e:
+            logger.error(f"获取{exchange} {token}信息失败: {str(e)}")
+            debug_log(f"{exchange}异常详情: {str(e)}")
 
     # 获取GateIO信息
     try:
         # 获取现货价格和交易量
-        spot_url = "https://api.gateio.ws/api/v4/spot/tickers"
-        debug_log(f"GateIO现货请求: URL={spot_url}")
-        spot_response = requests.get(spot_url, proxies=api.session.proxies)
-        debug_log(f"GateIO现货响应: 状态码={spot_response.status_code}, 内容={spot_response.text}")
-        if spot_response.status_code == 200:
-            spot_data = spot_response.json()
-            gate_io_token = token.replace('USDT', '_USDT')
-            for ticker in spot_data:
-                if ticker['currency_pair'] == gate_io_token:
-                    price = float(ticker['last'])
-                    if price >= min_token_price:  # 检查价格是否满足最小要求
-                        result['spot']['GateIO'] = {
-                            'price': price,
-                            'volume': float(ticker['base_volume']) * price
-                        }
-                    break
-        
-        # 获取合约价格、交易量和资金费率
+        add_ticker_info(result, 'spot', 'GateIO', api.get_spot_ticker('GateIO', token))
+
+        # 获取合约价格、交易量和资金费率（需要合约详情判断是否在退市）
+        gate_io_token = token.replace('USDT', '_USDT')
         futures_url = f"https://api.gateio.ws/api/v4/futures/usdt/contracts/{gate_io_token}"
         debug_log(f"GateIO合约请求: URL={futures_url}")
-        futures_response = requests.get(futures_url, proxies=api.session.proxies)
+        futures_response = api.session.get(futures_url, proxies=api.session.proxies)
         debug_log(f"GateIO合约响应: 状态码={futures_response.status_code}, 内容={futures_response.text}")
         if futures_response.status_code == 200:
             futures_data = futures_response.json()
@@ -365,49 +295,8 @@ def get_trading_pair_info(api: ExchangeAPI, token: str) -> Dict[str, Any]:
 
     # 获取Bitget信息
     try:
-        # 获取现货价格和交易量
-        spot_url = "https://api.bitget.com/api/spot/v1/market/ticker"
-        spot_params = {"symbol": f"{token.replace('USDT', '')}USDT_SPBL"}
-        spot_response = make_bitget_request(spot_url, params=spot_params, proxies=api.session.proxies)
-        if spot_response.status_code == 200:
-            spot_data = spot_response.json()
-            if spot_data["code"] == "00000" and "data" in spot_data:
-                data = spot_data["data"]
-                if isinstance(data, dict):
-                    price = float(data["close"])
-                    if price >= min_token_price:  # 检查价格是否满足最小要求
-                        result['spot']['Bitget'] = {
-                            'price': price,
-                            'volume': float(data["baseVol"]) * price
-                        }
-        
-        # 获取合约价格、交易量和资金费率
-        futures_url = "https://api.bitget.com/api/v2/mix/market/ticker"
-        futures_params = {"symbol": token, "productType": "USDT-FUTURES"}
-        futures_response = make_bitget_request(futures_url, params=futures_params, proxies=api.session.proxies)
-        if futures_response.status_code == 200:
-            futures_data = futures_response.json()
-            if futures_data["code"] == "00000" and "data" in futures_data:
-                data = futures_data["data"]
-                if isinstance(data, dict):
-                    price = float(data["lastPr"])
-                    if price >= min_token_price:  # 检查价格是否满足最小要求
-                        result['futures']['Bitget'] = {
-                            'price': price,
-                            'volume': float(data["usdtVol"])
-                        }
-        
-        # 获取资金费率
-        funding_url = "https://api.bitget.com/api/v2/mix/market/current-fund-rate"
-        funding_params = {"symbol": token, "productType": "USDT-FUTURES"}
-        funding_response = make_bitget_request(funding_url, params=funding_params, proxies=api.session.proxies)
-        if funding_response.status_code == 200:
-            funding_data = funding_response.json()
-            if funding_data["code"] == "00000" and "data" in funding_data:
-                for item in funding_data["data"]:
-                    if item["symbol"] == token:
-                        result['funding_rates']['Bitget'] = float(item["fundingRate"]) * 100
-                        break
+        add_ticker_info(result, 'spot', 'Bitget', api.get_spot_ticker('Bitget', token))
+        add_ticker_info(result, 'futures', 'Bitget', api.get_futures_ticker('Bitget', token))
     except Exception as e:
         logger.error(f"获取Bitget {token}信息失败: {str(e)}")
         debug_log(f"Bitget异常详情: {str(e)}")
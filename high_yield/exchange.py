@@ -1,10 +1,8 @@
 import time
 from datetime import datetime
 from pydoc_data.topics import topics
-from time import sleep
 
 import ccxt
-import requests
 import os
 import sys
 import argparse
@@ -21,15 +19,40 @@ from trade.gateio_api import get_earn_positions
 from config import proxies, stability_buy_apy_threshold, yield_percentile, bitget_api_key, bitget_api_secret, \
     bitget_api_passphrase, okx_earn_insurance_keep_ratio, okx_login_token
 from tools.logger import logger
+from tools.http_session import PooledHTTPSession
+from tools.rate_limiter import WeightRateLimiter
+from tools.ticker_snapshot import TickerSnapshot
+from tools.funding_rate_store import FundingRateStore
+from high_yield.apy_history_store import ApyHistoryStore
+from concurrent.futures import ThreadPoolExecutor, wait, TimeoutError as FuturesTimeoutError
+from functools import partial
+from tools.premium_index_snapshot import get_premium_index
 
 
 class ExchangeAPI:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        self.session.proxies.update(proxies)
+    def __init__(self, pool_size=10, timeout=(5, 20), max_retries=3, backoff_factor=0.5, history_workers=4,
+                 history_timeout=120, ticker_ttl=10, funding_timeout=10):
+        """
+        :param pool_size: 每个交易所主机保持的最大长连接数
+        :param timeout: 默认请求超时（秒），(连接超时, 读取超时)
+        :param max_retries: 连接错误和429/5xx的最大重试次数
+        :param backoff_factor: 重试退避系数（秒）
+        :param history_workers: 每个交易所并发获取产品收益率曲线等补充信息的线程数
+        :param history_timeout: 每个交易所等待补充信息的最长秒数，超时返回部分结果
+        :param ticker_ttl: 全市场行情快照的有效秒数
+        :param funding_timeout: 并发获取资金费率时每个交易所的默认超时秒数
+        """
+        # 所有请求都通过按主机划分的长连接会话发出，复用经过代理的TLS连接
+        self.session = PooledHTTPSession(
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            },
+            proxies=proxies,
+            pool_size=pool_size,
+            timeout=timeout,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+        )
         self.binance_funding_info = {}
         self.products = []
         # 添加交易量缓存
@@ -44,63 +67,156 @@ class ExchangeAPI:
         self.bybit_futures_volumes = {}
         self.gateio_futures_volumes = {}
         self.okx_futures_volumes = {}
+        # 全市场行情快照（价格、买卖价、成交额），每个交易所一次请求，替代逐个交易对查询价格
+        self.spot_tickers = {
+            'Binance': TickerSnapshot('Binance现货', self._load_binance_spot_tickers, ticker_ttl),
+            'Bitget': TickerSnapshot('Bitget现货', self._load_bitget_spot_tickers, ticker_ttl),
+            'Bybit': TickerSnapshot('Bybit现货', self._load_bybit_spot_tickers, ticker_ttl),
+            'GateIO': TickerSnapshot('GateIO现货', self._load_gateio_spot_tickers, ticker_ttl),
+            'OKX': TickerSnapshot('OKX现货', self._load_okx_spot_tickers, ticker_ttl),
+        }
+        self.futures_tickers = {
+            'Binance': TickerSnapshot('Binance合约', self._load_binance_futures_tickers, ticker_ttl),
+            'Bitget': TickerSnapshot('Bitget合约', self._load_bitget_futures_tickers, ticker_ttl),
+            'Bybit': TickerSnapshot('Bybit合约', self._load_bybit_futures_tickers, ticker_ttl),
+            'GateIO': TickerSnapshot('GateIO合约', self._load_gateio_futures_tickers, ticker_ttl),
+            'OKX': TickerSnapshot('OKX合约', self._load_okx_futures_tickers, ticker_ttl),
+        }
+        # 各交易所资金费率并发获取（get_funding_rates）
+        self.funding_timeout = funding_timeout
+        self.funding_rate_fetchers = {
+            'Binance': self.get_binance_futures_funding_rate,
+            'Bitget': self.get_bitget_futures_funding_rate,
+            'Bybit': self.get_bybit_futures_funding_rate,
+            'OKX': self.get_okx_futures_funding_rate,
+            'GateIO': self.get_gateio_futures_funding_rate,
+        }
+        self.funding_executor = None
+        # 历史资金费率本地仓库（只增量请求新的结算记录）
+        self.funding_history = FundingRateStore()
+        self.okx_ccxt = None
         self.binance_exchange_info = None  # Cache for exchange info
         self.binance_exchange_info_time = 0  # Timestamp of last update
         self.gateio_subscribed_products = []
+        # 理财产品补充信息（收益率曲线、购买额度）的并发获取：每个交易所独立的线程池和限速，
+        # 替代原来每次请求后的固定sleep，被限速的交易所不会占用其他交易所的线程
+        self.history_workers = history_workers
+        self.history_timeout = history_timeout
+        self.history_executors = {}
+        # 按秒计数，不读取Binance按分钟统计的权重响应头（否则每秒只能发出一个请求）
+        self.history_limiters = {
+            'Binance': WeightRateLimiter(max_weight=10, safety_ratio=1.0, window_seconds=1, header_name=None),
+            'GateIO': WeightRateLimiter(max_weight=1, safety_ratio=1.0, window_seconds=1, header_name=None),
+            'Bybit': WeightRateLimiter(max_weight=10, safety_ratio=1.0, window_seconds=1, header_name=None),
+            'OKX': WeightRateLimiter(max_weight=10, safety_ratio=1.0, window_seconds=1, header_name=None),
+        }
+        # 收益率曲线本地存储（每轮只增量获取新数据点）
+        self.apy_history = ApyHistoryStore(os.path.join(current_dir, '..', 'trade', 'cache', 'apy_history.sqlite3'))
         self.get_gateio_subscribed_products()
 
+    @staticmethod
+    def _ticker(price, bid=None, ask=None, volume=0.0, funding_rate=None, mark_price=None):
+        """统一的行情格式，交易所返回空字符串的字段为None"""
+        def to_float(value):
+            return float(value) if value not in (None, '') else None
+        return {
+            'price': to_float(price) or 0.0,
+            'bid': to_float(bid),
+            'ask': to_float(ask),
+            'volume': to_float(volume) or 0.0,
+            'funding_rate': to_float(funding_rate),
+            'mark_price': to_float(mark_price),
+        }
+
+    def _get_tickers_json(self, url, params=None):
+        response = self.session.get(url, params=params, proxies=proxies)
+        response.raise_for_status()
+        return response.json()
+
+    def _load_binance_spot_tickers(self):
+        data = self._get_tickers_json("https://api.binance.com/api/v3/ticker/24hr")
+        return {item['symbol']: self._ticker(item['lastPrice'], item.get('bidPrice'), item.get('askPrice'),
+                                             float(item['volume']) * float(item['weightedAvgPrice']))
+                for item in data}
+
+    def _load_bitget_spot_tickers(self):
+        data = self._get_tickers_json("https://api.bitget.com/api/v2/spot/market/tickers").get('data', [])
+        return {item['symbol']: self._ticker(item['lastPr'], item.get('bidPr'), item.get('askPr'), item['usdtVolume'])
+                for item in data}
+
+    def _load_bybit_spot_tickers(self):
+        data = self._get_tickers_json("https://api.bybit.com/v5/market/tickers", {'category': 'spot'})
+        return {item['symbol']: self._ticker(item['lastPrice'], item.get('bid1Price'), item.get('ask1Price'),
+                                             float(item['volume24h']) * float(item['lastPrice']))
+                for item in data.get('result', {}).get('list', [])}
+
+    def _load_gateio_spot_tickers(self):
+        data = self._get_tickers_json("https://api.gateio.ws/api/v4/spot/tickers")
+        return {item['currency_pair'].replace('_', ''): self._ticker(
+                    item['last'], item.get('highest_bid'), item.get('lowest_ask'), item['quote_volume'])
+                for item in data}
+
+    def _load_okx_spot_tickers(self):
+        data = self._get_tickers_json("https://www.okx.com/api/v5/market/tickers", {'instType': 'SPOT'})
+        return {item['instId'].replace('-', ''): self._ticker(item['last'], item.get('bidPx'), item.get('askPx'),
+                                                              float(item['volCcy24h']) * float(item['last']))
+                for item in data.get('data', [])}
+
+    def _load_binance_futures_tickers(self):
+        data = self._get_tickers_json("https://fapi.binance.com/fapi/v1/ticker/24hr")
+        return {item['symbol']: self._ticker(item['lastPrice'],
+                                             volume=float(item['volume']) * float(item['weightedAvgPrice']))
+                for item in data}
+
+    def _load_bitget_futures_tickers(self):
+        data = self._get_tickers_json("https://api.bitget.com/api/v2/mix/market/tickers",
+                                      {'productType': 'USDT-FUTURES'}).get('data', [])
+        return {item['symbol']: self._ticker(item['lastPr'], item.get('bidPr'), item.get('askPr'),
+                                             item['usdtVolume'], item.get('fundingRate'), item.get('markPrice'))
+                for item in data}
+
+    def _load_bybit_futures_tickers(self):
+        data = self._get_tickers_json("https://api.bybit.com/v5/market/tickers", {'category': 'linear'})
+        return {item['symbol']: self._ticker(item['lastPrice'], item.get('bid1Price'), item.get('ask1Price'),
+                                             float(item['volume24h']) * float(item['lastPrice']),
+                                             item.get('fundingRate'), item.get('markPrice'))
+                for item in data.get('result', {}).get('list', [])}
+
+    def _load_gateio_futures_tickers(self):
+        data = self._get_tickers_json("https://api.gateio.ws/api/v4/futures/usdt/tickers")
+        return {item['contract'].replace('_', ''): self._ticker(
+                    item['last'], item.get('highest_bid'), item.get('lowest_ask'), item['volume_24h_settle'],
+                    item.get('funding_rate'), item.get('mark_price'))
+                for item in data}
+
+    def _load_okx_futures_tickers(self):
+        data = self._get_tickers_json("https://www.okx.com/api/v5/market/tickers", {'instType': 'SWAP'})
+        return {item['instId'].replace('-SWAP', '').replace('-', ''): self._ticker(
+                    item['last'], item.get('bidPx'), item.get('askPx'), float(item['volCcy24h']) * float(item['last']))
+                for item in data.get('data', []) if item['instId'].endswith('-SWAP')}
+
+    def get_spot_ticker(self, exchange, symbol):
+        """从行情快照查询现货行情（price/bid/ask/volume），symbol如 ETHUSDT，没有该交易对时返回None"""
+        return self.spot_tickers[exchange].get(symbol)
+
+    def get_futures_ticker(self, exchange, symbol):
+        """从行情快照查询U本位合约行情（price/bid/ask/volume/funding_rate/mark_price），没有该交易对时返回None"""
+        return self.futures_tickers[exchange].get(symbol)
+
     def get_binance_spot_price(self, symbol):
-        try:
-            r = requests.get('https://api.binance.com/api/v3/ticker/price', params={"symbol": symbol}, proxies=proxies)
-            return float(r.json().get('price', 0))
-        except Exception as e:
-            logger.error(f"get {symbol} binance spot price failed: {e}")
-            return 0
+        return self.spot_tickers['Binance'].price(symbol)
 
     def get_bitget_spot_price(self, symbol):
-        market_url = "https://api.bitget.com/api/v2/spot/market/tickers"
-        try:
-            response = requests.get(market_url, proxies=proxies, params={'symbol': symbol})
-            data = response.json().get('data', [])
-            if data:
-                return float(data[0].get('lastPr', 0))
-            else:
-                return 0
-        except Exception as e:
-            logger.error(f"get {symbol} bitget spot price failed: {e}")
-            return 0
+        return self.spot_tickers['Bitget'].price(symbol)
 
     def get_bybit_spot_price(self, symbol):
-        url = "https://api.bybit.com/v5/market/tickers"
-        try:
-            response = requests.get(url, proxies=proxies, params={'category': 'spot', 'symbol': symbol})
-            data = response.json().get('result', {}).get('list', [])
-            return float(data[0].get('lastPrice', 0))
-        except Exception as e:
-            logger.error(f"get {symbol} bybit spot price failed: {e}")
-            return 0
+        return self.spot_tickers['Bybit'].price(symbol)
 
     def get_gateio_spot_price(self, symbol):
-        new_symbol = symbol.replace('USDT', '_USDT')
-        url = f"https://api.gateio.ws/api/v4/spot/tickers"
-        try:
-            response = requests.get(url, proxies=proxies, params={'currency_pair': new_symbol})
-            data = response.json()
-            return float(data[0].get('last', 0))
-        except Exception as e:
-            logger.error(f"get {symbol} gateio spot price failed: {e}")
-            return 0
+        return self.spot_tickers['GateIO'].price(symbol)
 
     def get_okx_spot_price(self, symbol):
-        new_symbol = symbol.replace('USDT', '-USDT')
-        url = f"https://www.okx.com/api/v5/market/ticker"
-        try:
-            response = requests.get(url, proxies=proxies, params={'instId': new_symbol})
-            data = response.json().get('data', [])
-            return float(data[0].get('last', 0))
-        except Exception as e:
-            logger.error(f"get {symbol} okx spot price failed: {e}")
-            return 0
+        return self.spot_tickers['OKX'].price(symbol)
 
     def get_gateio_subscribed_products(self):
         if not self.gateio_subscribed_products:
@@ -112,132 +228,128 @@ class ExchangeAPI:
 
     def get_binance_volumes(self):
         """获取币安所有交易对24小时交易量"""
-        try:
-            volume_url = "https://api.binance.com/api/v3/ticker/24hr"
-            volume_response = requests.get(volume_url, proxies=proxies)
-            if volume_response.status_code == 200:
-                for item in volume_response.json():
-                    if item['symbol'].endswith('USDT'):
-                        token = item['symbol'].replace('USDT', '')
-                        self.binance_volumes[token] = float(item['volume']) * float(item['weightedAvgPrice'])
-        except Exception as e:
-            logger.error(f"获取Binance交易量数据失败: {str(e)}")
+        for symbol, ticker in self.spot_tickers['Binance'].tickers().items():
+            if symbol.endswith('USDT'):
+                self.binance_volumes[symbol.replace('USDT', '')] = ticker['volume']
 
     def get_bitget_volumes(self):
         """获取Bitget所有交易对24小时交易量"""
-        try:
-            volume_url = "https://api.bitget.com/api/v2/spot/market/tickers"
-            volume_response = requests.get(volume_url, proxies=proxies)
-            if volume_response.status_code == 200:
-                for item in volume_response.json().get('data', []):
-                    if item['symbol'].endswith('USDT'):
-                        token = item['symbol'].replace('USDT', '')
-                        self.bitget_volumes[token] = float(item['usdtVolume'])
-        except Exception as e:
-            logger.error(f"获取Bitget交易量数据失败: {str(e)}")
+        for symbol, ticker in self.spot_tickers['Bitget'].tickers().items():
+            if symbol.endswith('USDT'):
+                self.bitget_volumes[symbol.replace('USDT', '')] = ticker['volume']
 
     def get_bybit_volumes(self):
         """获取Bybit所有交易对24小时交易量"""
-        try:
-            volume_url = "https://api.bybit.com/v5/market/tickers?category=spot"
-            volume_response = requests.get(volume_url, proxies=proxies)
-            if volume_response.status_code == 200:
-                for item in volume_response.json().get('result', {}).get('list', []):
-                    if item['symbol'].endswith('USDT'):
-                        token = item['symbol'].replace('USDT', '')
-                        self.bybit_volumes[token] = float(item['volume24h']) * float(item['lastPrice'])
-        except Exception as e:
-            logger.error(f"获取Bybit交易量数据失败: {str(e)}")
+        for symbol, ticker in self.spot_tickers['Bybit'].tickers().items():
+            if symbol.endswith('USDT'):
+                self.bybit_volumes[symbol.replace('USDT', '')] = ticker['volume']
 
     def get_gateio_volumes(self):
         """获取GateIO所有交易对24小时交易量"""
-        try:
-            volume_url = "https://api.gateio.ws/api/v4/spot/tickers"
-            volume_response = requests.get(volume_url, proxies=proxies)
-            if volume_response.status_code == 200:
-                for item in volume_response.json():
-                    if item['currency_pair'].endswith('_USDT'):
-                        token = item['currency_pair'].replace('_USDT', '')
-                        self.gateio_volumes[token] = float(item['quote_volume'])
-        except Exception as e:
-            logger.error(f"获取GateIO交易量数据失败: {str(e)}")
+        for symbol, ticker in self.spot_tickers['GateIO'].tickers().items():
+            if symbol.endswith('USDT'):
+                self.gateio_volumes[symbol.replace('USDT', '')] = ticker['volume']
 
     def get_okx_volumes(self):
         """获取OKX所有交易对24小时交易量"""
-        try:
-            volume_url = "https://www.okx.com/api/v5/market/tickers?instType=SPOT"
-            volume_response = requests.get(volume_url, proxies=proxies)
-            if volume_response.status_code == 200:
-                for item in volume_response.json().get('data', []):
-                    if item['instId'].endswith('-USDT'):
-                        token = item['instId'].replace('-USDT', '')
-                        self.okx_volumes[token] = float(item['volCcy24h']) * float(item['last'])
-        except Exception as e:
-            logger.error(f"获取OKX交易量数据失败: {str(e)}")
+        for symbol, ticker in self.spot_tickers['OKX'].tickers().items():
+            if symbol.endswith('USDT'):
+                self.okx_volumes[symbol.replace('USDT', '')] = ticker['volume']
 
     def get_binance_futures_volumes(self):
         """获取币安合约24小时交易量"""
-        try:
-            url = "https://fapi.binance.com/fapi/v1/ticker/24hr"
-            response = requests.get(url, proxies=proxies)
-            if response.status_code == 200:
-                for item in response.json():
-                    if item['symbol'].endswith('USDT'):
-                        self.binance_futures_volumes[item['symbol']] = float(item['volume']) * float(item['weightedAvgPrice'])
-        except Exception as e:
-            logger.error(f"获取Binance合约交易量数据失败: {str(e)}")
+        for symbol, ticker in self.futures_tickers['Binance'].tickers().items():
+            if symbol.endswith('USDT'):
+                self.binance_futures_volumes[symbol] = ticker['volume']
 
     def get_bybit_futures_volumes(self):
         """获取Bybit合约24小时交易量"""
-        try:
-            url = "https://api.bybit.com/v5/market/tickers?category=linear"
-            response = requests.get(url, proxies=proxies)
-            if response.status_code == 200:
-                data = response.json().get('result', {}).get('list', [])
-                for item in data:
-                    if item['symbol'].endswith('USDT'):
-                        self.bybit_futures_volumes[item['symbol']] = float(item['volume24h']) * float(item['lastPrice'])
-        except Exception as e:
-            logger.error(f"获取Bybit合约交易量数据失败: {str(e)}")
+        for symbol, ticker in self.futures_tickers['Bybit'].tickers().items():
+            if symbol.endswith('USDT'):
+                self.bybit_futures_volumes[symbol] = ticker['volume']
 
     def get_bitget_futures_volumes(self):
         """获取Bitget合约24小时交易量"""
-        try:
-            url = "https://api.bitget.com/api/v2/mix/market/tickers?productType=USDT-FUTURES"
-            response = requests.get(url, proxies=proxies)
-            if response.status_code == 200:
-                for item in response.json().get('data', []):
-                    self.bitget_futures_volumes[item['symbol']] = float(item['usdtVolume'])
-        except Exception as e:
-            logger.error(f"获取Bitget合约交易量数据失败: {str(e)}")
+        for symbol, ticker in self.futures_tickers['Bitget'].tickers().items():
+            self.bitget_futures_volumes[symbol] = ticker['volume']
 
     def get_gateio_futures_volumes(self):
         """获取GateIO合约24小时交易量"""
-        try:
-            url = "https://api.gateio.ws/api/v4/futures/usdt/tickers"
-            response = requests.get(url, proxies=proxies)
-            if response.status_code == 200:
-                data = response.json()
-                for item in data:
-                    contract = item['contract']
-                    if contract.endswith('_USDT'):
-                        symbol = contract.replace('_USDT', 'USDT')
-                        self.gateio_futures_volumes[symbol] = float(item['volume_24h_settle'])
-        except Exception as e:
-            logger.error(f"获取GateIO合约交易量数据失败: {str(e)}")
+        for symbol, ticker in self.futures_tickers['GateIO'].tickers().items():
+            if symbol.endswith('USDT'):
+                self.gateio_futures_volumes[symbol] = ticker['volume']
 
     def get_okx_futures_volumes(self):
         """获取OKX合约24小时交易量"""
-        try:
-            url = "https://www.okx.com/api/v5/market/tickers?instType=SWAP"
-            response = requests.get(url, proxies=proxies)
+        for symbol, ticker in self.futures_tickers['OKX'].tickers().items():
+            if symbol.endswith('USDT'):
+                self.okx_futures_volumes[symbol] = ticker['volume']
+
+    def log_ticker_stats(self):
+        """输出行情快照的查询和刷新次数"""
+        lines = ["📊 行情快照统计:"]
+        for snapshot in list(self.spot_tickers.values()) + list(self.futures_tickers.values()):
+            if snapshot.stats['refreshes'] or snapshot.stats['errors']:
+                lines.append(f"  {snapshot.name}: 查询 {snapshot.stats['lookups']} 次, "
+                             f"刷新 {snapshot.stats['refreshes']} 次, 失败 {snapshot.stats['errors']} 次")
+        if len(lines) > 1:
+            logger.info("\n".join(lines))
+
+    def _history_request(self, exchange, method, url, **kwargs):
+        """按交易所限速发出补充信息请求"""
+        limiter = self.history_limiters[exchange]
+        limiter.acquire_sync(1)
+        response = self.session.request(method, url, **kwargs)
+        limiter.update_from_response(response)
+        return response
+
+    def _run_product_jobs(self, exchange, products, jobs):
+        """
+        并发执行产品的补充信息请求，结果合并到对应产品中
+        :param exchange: 交易所名称（决定使用的线程池和限速器）
+        :param products: 产品列表
+        :param jobs: {产品下标: 返回待更新字段dict的函数}
+        超过history_timeout未完成的产品保留默认值，返回部分结果
+        """
+        if not jobs:
+            return
+        executor = self.history_executors.get(exchange)
+        if executor is None:
+            executor = self.history_executors[exchange] = ThreadPoolExecutor(
+                max_workers=self.history_workers, thread_name_prefix=f"{exchange.lower()}-history")
+
+        start = time.time()
+        futures = {executor.submit(job): index for index, job in jobs.items()}
+        done, not_done = wait(futures, timeout=self.history_timeout)
+        for future in done:
+            product = products[futures[future]]
+            try:
+                product.update(future.result())
+            except Exception as e:
+                logger.error(f"获取{exchange} {product['token']}补充信息失败: {str(e)}")
+        for future in not_done:
+            future.cancel()
+        if not_done:
+            logger.warning(f"{exchange}有{len(not_done)}/{len(jobs)}个产品的补充信息在{self.history_timeout}秒内未完成，返回部分结果")
+        logger.info(f"获取{exchange} {len(done)}个产品的补充信息耗时{time.time() - start:.1f}秒")
+
+    def _get_binance_apy_history(self, token, product_id):
+        """获取币安活期产品近30天的收益率曲线（只请求本地水位之后的数据）"""
+        window_start = int(time.time() * 1000) - 30 * 24 * 60 * 60 * 1000
+        start_time = self.apy_history.fetch_start('Binance', product_id, 'market_apr', window_start, 60 * 60 * 1000)
+        if start_time is not None:
+            url = f'https://www.binance.com/bapi/earn/v1/friendly/lending/daily/product/position-market-apr?productId={product_id}&startTime={start_time}'
+            response = self._history_request('Binance', 'GET', url, proxies=proxies)
             if response.status_code == 200:
-                for item in response.json().get('data', []):
-                    if item['instId'].endswith('-USDT-SWAP'):
-                        symbol = item['instId'].replace('-USDT-SWAP', 'USDT')
-                        self.okx_futures_volumes[symbol] = float(item['volCcy24h']) * float(item['last'])
-        except Exception as e:
-            logger.error(f"获取OKX合约交易量数据失败: {str(e)}")
+                points = [{'timestamp': int(i['calcTime']), 'apy': float(i['marketApr']) * 100}
+                          for i in response.json().get('data', {}).get('marketAprList', [])]
+                self.apy_history.append('Binance', token, product_id, 'market_apr', points)
+            else:
+                logger.error(
+                    f"binance get asset charts, url: {url}, status: {response.status_code}, response: {response.text}")
+        apy_month = self.apy_history.load('Binance', product_id, 'market_apr', window_start)
+        apy_day = apy_month[-24:]
+        return {'apy_month': apy_month, 'apy_day': apy_day}
 
     def get_binance_earn_products(self):
         """
@@ -261,7 +373,7 @@ class ExchangeAPI:
                 "orderBy": "APY_DESC",
                 "simpleEarnType": "ALL",
             }
-            response = requests.get(url, params=params, proxies=proxies)
+            response = self.session.get(url, params=params, proxies=proxies)
 
             # 记录响应状态码和响应文本的前100个字符用于调试
             if response.status_code != 200:
@@ -274,6 +386,7 @@ class ExchangeAPI:
             # 检查新API的返回结构
             if "data" in data and isinstance(data["data"]['list'], list):
                 products = []
+                history_jobs = {}
                 for item in data["data"]['list']:
                     # 适配新的API返回结构
                     # duration = int(item['duration'])
@@ -289,22 +402,8 @@ class ExchangeAPI:
                         duration = int(item_sub.get("duration", 0))
                         apy_month = []
                         apy_day = []
-                        if duration == 0:
-                            startTime = int(time.time() * 1000) - 30 * 24 * 60 * 60 * 1000
-                            try:
-                                if apy > stability_buy_apy_threshold:
-                                    url = f'https://www.binance.com/bapi/earn/v1/friendly/lending/daily/product/position-market-apr?productId={prouct_id}&startTime={startTime}'
-                                    response = requests.get(url, proxies=proxies)
-                                    sleep(0.1)
-                                    if response.status_code == 200:
-                                        apy_month = [{'timestamp': int(i['calcTime']), 'apy': float(i['marketApr']) * 100}
-                                                     for i in response.json().get('data', {}).get('marketAprList', [])]
-                                        apy_day = sorted(apy_month[-24:], key=lambda item: item['timestamp'], reverse=False)
-                                    else:
-                                        logger.error(
-                                            f"binance get asset charts, url: {url}, status: {response.status_code}, response: {response.text}")
-                            except Exception as e:
-                                logger.error(f"binance get asset charts, url: {url}, error: {str(e)}")
+                        if duration == 0 and apy > stability_buy_apy_threshold:
+                            history_jobs[len(products)] = partial(self._get_binance_apy_history, token, str(prouct_id))
                         price = self.get_binance_spot_price(f"{token}USDT") if token not in ['USDC', 'USDT'] else 1.00
                         product = {
                             "exchange": "Binance",
@@ -338,6 +437,8 @@ class ExchangeAPI:
                     #             "volume_24h": self.binance_volumes.get(token, 0)
                     #         }
                     #         products.append(product)
+                # 并发获取收益率曲线
+                self._run_product_jobs('Binance', products, history_jobs)
                 return products
         except Exception as e:
             logger.error(f"获取Binance活期理财产品时出错: {str(e)}")
@@ -390,6 +491,39 @@ class ExchangeAPI:
             logger.error(f"获取Bitget活期理财产品时出错: {str(e)}")
         return products
 
+    def _get_bybit_fixed_purchase_limits(self, product_type, product_id, token):
+        """获取Bybit定期理财产品的最小、最大购买额"""
+        params = {"product_type": product_type, "product_id": product_id}
+        logger.info(f"获取bybit定期理财产品{token}购买额度, params: {params}")
+        r = self._history_request('Bybit', 'POST', 'https://api2.bybit.com/s1/byfi/get-product-detail', proxies=proxies, json=params)
+        if r.status_code == 200 and r.json().get('result', {}).get('status_code') == 200:
+            product_detail = r.json().get('result', {}).get('fixed_term_saving_product_detail')
+            return {
+                'min_purchase': float(product_detail.get('individual_min_share')) / 100000000,
+                'max_purchase': float(product_detail.get('individual_max_share')) / 100000000,
+            }
+        return {}
+
+    def _get_bybit_apy_history(self, product_id, token):
+        """获取Bybit活期理财产品近24小时的收益率曲线"""
+        url = "https://api2.bybit.com/s1/byfi/get-flexible-saving-apr-history"
+        response = self._history_request(
+            'Bybit', 'POST',
+            url=url,
+            json={"product_id": product_id},
+            headers={"Content-Type": "application/json"},
+            proxies=proxies
+        )
+        if response.status_code != 200:
+            logger.error(
+                f"bybit get asset charts failed, url: {url}, status: {response.status_code}, response: {response.text}")
+        data = response.json().get('result', {}).get('hourly_apr_list', [])
+        apy_day = [{'apy': int(i['apr_e8']) / 1000000, 'timestamp': int(i['timestamp']) * 1000} for
+                   i in data]
+        apy_day = sorted(apy_day, key=lambda item: item['timestamp'], reverse=False)
+        logger.debug(f"获取bybit {token}近24小时收益率曲线, 数据：{data}")
+        return {'apy_day': apy_day}
+
     def get_bybit_earn_products(self):
         """
         获取Bybit活期理财产品
@@ -402,7 +536,7 @@ class ExchangeAPI:
             if not self.bybit_volumes:
                 self.get_bybit_volumes()
             logger.info("获取bybit币种和产品id对应关系信息")
-            r = requests.get('https://api2.bybit.com/s1/byfi/get-coins', proxies=proxies)
+            r = self.session.get('https://api2.bybit.com/s1/byfi/get-coins', proxies=proxies)
             coins = {}
             for coin in r.json().get('result', {}).get('coins', []):
                 coins[int(coin['coin'][0])] = coin['coin'][1]
@@ -413,21 +547,17 @@ class ExchangeAPI:
             product_type = 6
             url = 'https://api2.bybit.com/s1/byfi/get-saving-homepage-product-cards'
             data = {"product_area":[0],"page":1,"limit":20,"product_type":product_type,"coin_name":"","sort_apr":1,"match_user_asset":False,"show_available":True,"fixed_saving_version":1}
-            r = requests.post(url, json=data, proxies=proxies)
+            r = self.session.post(url, json=data, proxies=proxies)
             data = r.json()
+            detail_jobs = {}
             for item in data['result']['coin_products']:
                 for item_sub in item.get('saving_products', []):
                     token = coins[item_sub['coin']]
-                    # 获取最大、最小购买额
+                    # 获取最大、最小购买额（并发获取，见下方）
                     min_purchase = 0
                     max_purchase = 0
-                    params = {"product_type": product_type, "product_id": item_sub.get('product_id')}
-                    logger.info(f"获取bybit定期理财产品{token}购买额度, params: {params}")
-                    r = requests.post('https://api2.bybit.com/s1/byfi/get-product-detail', proxies=proxies, json=params)
-                    if r.status_code == 200 and r.json().get('result', {}).get('status_code') == 200:
-                        product_detail = r.json().get('result', {}).get('fixed_term_saving_product_detail')
-                        min_purchase = float(product_detail.get('individual_min_share'))/100000000
-                        max_purchase = float(product_detail.get('individual_max_share')) / 100000000
+                    detail_jobs[len(products)] = partial(
+                        self._get_bybit_fixed_purchase_limits, product_type, item_sub.get('product_id'), token)
                     price = self.get_bybit_spot_price(f"{token}USDT") if token not in ['USDC', 'USDT'] else 1.00
                     product = {
                         "exchange": "Bybit",
@@ -442,7 +572,7 @@ class ExchangeAPI:
                         'price': price
                     }
                     products.append(product)
-                    sleep(0.1)
+            self._run_product_jobs('Bybit', products, detail_jobs)
             # 活期期理财产品
             # https://api.bybit.com/v5/earn/product?category=FlexibleSaving
             url = "https://api.bybit.com/v5/earn/product"
@@ -456,6 +586,7 @@ class ExchangeAPI:
                     f"get bybit flexible product info failed, url: {url}, code: {response.status_code}, error: {response.text}")
             data = response.json()
             if data["retCode"] == 0 and "result" in data and "list" in data["result"]:
+                history_jobs = {}
                 for item in data["result"]["list"]:
                     token = item["coin"]
                     apy = float(item["estimateApr"].replace("%", ""))
@@ -463,26 +594,9 @@ class ExchangeAPI:
                     # apy_percentile = apy
                     if item['status'] != 'Available':
                         continue
-                    try:
-                        # 最新一个点是否大于最小收益率，很多时候收益率是向下走的
-                        if apy >= stability_buy_apy_threshold:
-                            url = "https://api2.bybit.com/s1/byfi/get-flexible-saving-apr-history"
-                            response = requests.post(
-                                url=url,
-                                json={"product_id": item['productId']},
-                                headers={"Content-Type": "application/json"},
-                                proxies=proxies
-                            )
-                            if response.status_code != 200:
-                                logger.error(
-                                    f"bybit get asset charts failed, url: {url}, status: {response.status_code}, response: {response.text}")
-                            data = response.json().get('result', {}).get('hourly_apr_list', [])
-                            apy_day = [{'apy': int(i['apr_e8']) / 1000000, 'timestamp': int(i['timestamp']) * 1000} for
-                                       i in data]
-                            apy_day = sorted(apy_day, key=lambda item: item['timestamp'], reverse=False)
-                            logger.debug(f"获取bybit {token}近24小时收益率曲线, 数据：{data}")
-                    except Exception as e:
-                        logger.error(f"获取 {token}的收益曲线失败： {str(e)}")
+                    # 最新一个点是否大于最小收益率，很多时候收益率是向下走的
+                    if apy >= stability_buy_apy_threshold:
+                        history_jobs[len(products)] = partial(self._get_bybit_apy_history, item['productId'], token)
                     token = item["coin"]
                     price = self.get_bybit_spot_price(f"{token}USDT") if token not in ['USDC', 'USDT'] else 1.00
                     product = {
@@ -499,6 +613,7 @@ class ExchangeAPI:
                         'price': price
                     }
                     products.append(product)
+                self._run_product_jobs('Bybit', products, history_jobs)
             else:
                 logger.error(f"Bybit API返回错误: {data}")
         except Exception as e:
@@ -519,31 +634,9 @@ class ExchangeAPI:
         try:
             if not self.gateio_volumes:
                 self.get_gateio_volumes()
-            url = f'https://www.gate.io/apiw/v2/uni-loan/earn/chart?from={start}&to={end}&asset={token}&type=1'
-            logger.debug(f"get gateio {token}近1天收益率曲线, url: {url}")
-            response = requests.get(
-                url=url,
-                proxies=proxies)
-            if response.status_code != 200:
-                logger.error(
-                    f"gateio get 1day asset charts, url: {url}, status: {response.status_code}, response: {response.text}")
-            else:
-                logger.debug(f"get gateio 1day asset charts, url: {url}, data: {response.json()}")
-            data = response.json().get('data', [])
-            apy_day = [{'timestamp': int(i['time']) * 1000, 'apy': float(i['value'])} for i in data]
-            apy_day = sorted(apy_day, key=lambda item: item['timestamp'], reverse=False)
-            sleep(2)
-            url = f'https://www.gate.io/apiw/v2/uni-loan/earn/chart?from={start_30}&to={end}&asset={token}&type=2'
-            logger.debug(f"get gateio {token}近30天收益率曲线, url: {url}")
-            response = requests.get(
-                url=url,
-                proxies=proxies)
-            if response.status_code != 200:
-                logger.error(
-                    f"gateio get 30days asset charts, url: {url}, status: {response.status_code}, response: {response.text}")
-            data = response.json().get('data', [])
-            apy_month = [{'timestamp': i['time'] * 1000, 'apy': float(i['value'])} for i in data]
-            sleep(2)
+            history = self._get_gateio_apy_history(token, start, start_30, end)
+            apy_day = history['apy_day'] or apy_day
+            apy_month = history['apy_month']
         except Exception as e:
             logger.error(f"get asset chart {token} error: {str(e)}")
         price = self.get_gateio_spot_price(f"{token}USDT") if token not in ['USDC', 'USDT'] else 1.00
@@ -561,6 +654,31 @@ class ExchangeAPI:
         }
         return product
 
+    def _sync_gateio_apy_chart(self, token, chart_type, series, window_start, end, interval):
+        """增量获取GateIO收益率曲线（chart_type 1: 小时数据, 2: 日数据）并追加到本地存储，时间单位为秒"""
+        start = self.apy_history.fetch_start('GateIO', token, series, window_start * 1000, interval * 1000)
+        if start is None:
+            return
+        # https://www.gate.io/apiw/v2/uni-loan/earn/chart?from=1741874400&to=1741957200&asset=SOL&type=1
+        url = f'https://www.gate.io/apiw/v2/uni-loan/earn/chart?from={start // 1000}&to={end}&asset={token}&type={chart_type}'
+        logger.debug(f"get gateio {token} {series}收益率曲线, url: {url}")
+        response = self._history_request('GateIO', 'GET', url=url, proxies=proxies)
+        if response.status_code != 200:
+            logger.error(
+                f"gateio get {series} asset charts, url: {url}, status: {response.status_code}, response: {response.text}")
+            return
+        data = response.json().get('data', [])
+        points = [{'timestamp': int(i['time']) * 1000, 'apy': float(i['value'])} for i in data]
+        self.apy_history.append('GateIO', token, token, series, points)
+
+    def _get_gateio_apy_history(self, token, start, start_30, end):
+        """获取GateIO活期理财产品近1天和近30天的收益率曲线（只请求本地水位之后的数据）"""
+        self._sync_gateio_apy_chart(token, 1, 'hourly', start, end, 60 * 60)
+        self._sync_gateio_apy_chart(token, 2, 'daily', start_30, end, 24 * 60 * 60)
+        apy_day = self.apy_history.load('GateIO', token, 'hourly', start * 1000)
+        apy_month = self.apy_history.load('GateIO', token, 'daily', start_30 * 1000)
+        return {'apy_day': apy_day, 'apy_month': apy_month}
+
     def get_gateio_earn_products(self):
         """
         获取GateIO活期理财产品
@@ -594,7 +712,7 @@ class ExchangeAPI:
                 'lang': 'cn',
                 'exchange_rate_switch': '1',
             }
-            response = requests.get(url, params=params, headers=headers, cookies=cookies, proxies=proxies)
+            response = self.session.get(url, params=params, headers=headers, cookies=cookies, proxies=proxies)
             if response.status_code != 200:
                 logger.error(
                     f"get gateio活期理财产品, url: {url}, code: {response.status_code}, error: {response.text}")
@@ -604,6 +722,7 @@ class ExchangeAPI:
                 end = int(datetime.now().replace(microsecond=0, second=0, minute=0).timestamp())
                 start = end - 1 * 24 * 60 * 60
                 start_30 = end - 30 * 24 * 60 * 60
+                history_jobs = {}
                 for item in data["data"]["list"]:
                     token = item["asset"]
                     apy = float(item["last_time_rate_year"]) * 100
@@ -611,34 +730,7 @@ class ExchangeAPI:
                     apy_month = []
                     apy_day = []
                     if apy >= stability_buy_apy_threshold:
-                        try:
-                            # https://www.gate.io/apiw/v2/uni-loan/earn/chart?from=1741874400&to=1741957200&asset=SOL&type=1
-                            url = f'https://www.gate.io/apiw/v2/uni-loan/earn/chart?from={start}&to={end}&asset={token}&type=1'
-                            logger.debug(f"get gateio {token}近1天收益率曲线, url: {url}")
-                            response = requests.get(
-                                url=url,
-                                proxies=proxies)
-                            if response.status_code != 200:
-                                logger.error(
-                                    f"gateio get 1day asset charts, url: {url}, status: {response.status_code}, response: {response.text}")
-                            else:
-                                logger.debug(f"get gateio 1day asset charts, url: {url}, data: {response.json()}")
-                            data = response.json().get('data', [])
-                            apy_day = [{'timestamp': int(i['time']) * 1000, 'apy': float(i['value'])} for i in data]
-                            apy_day = sorted(apy_day, key=lambda item: item['timestamp'], reverse=False)
-                            url = f'https://www.gate.io/apiw/v2/uni-loan/earn/chart?from={start_30}&to={end}&asset={token}&type=2'
-                            logger.debug(f"get gateio {token}近30天收益率曲线, url: {url}")
-                            response = requests.get(
-                                url=url,
-                                proxies=proxies)
-                            if response.status_code != 200:
-                                logger.error(
-                                    f"gateio get 30days asset charts, url: {url}, status: {response.status_code}, response: {response.text}")
-                            data = response.json().get('data', [])
-                            apy_month = [{'timestamp': i['time'] * 1000, 'apy': float(i['value'])} for i in data]
-                        except Exception as e:
-                            logger.error(f"get asset chart {item['asset']} error: {str(e)}")
-                        sleep(2)
+                        history_jobs[len(products)] = partial(self._get_gateio_apy_history, token, start, start_30, end)
                     price = self.get_gateio_spot_price(f"{token}USDT") if token not in ['USDC', 'USDT'] else 1.00
                     product = {
                         "exchange": "GateIO",
@@ -654,12 +746,41 @@ class ExchangeAPI:
                         'price': price
                     }
                     products.append(product)
+                # 并发获取收益率曲线（按GateIO限速）
+                self._run_product_jobs('GateIO', products, history_jobs)
             else:
                 logger.error(f"GateIO API返回错误: {data}")
         except Exception as e:
             logger.error(f"获取GateIO活期理财产品时出错: {str(e)}")
         return products
 
+    def _get_okx_apy_history(self, token, token_id, now_timestamp_ms):
+        """获取OKX活期理财产品近1天和近30天的收益率曲线（已扣除保险金比例）"""
+        url = f'https://www.okx.com/priapi/v2/financial/rate-history?currencyId={token_id}&t={now_timestamp_ms}'
+        logger.debug(f"get okx {token}近1天收益率曲线, url: {url}")
+        headers = {
+            "accept": "application/json",
+            "content-type": "application/json",
+            "authorization": okx_login_token,
+            "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36 Edg/130.0.0.0",
+        }
+        response = self._history_request(
+            'OKX', 'GET',
+            url=url,
+            headers=headers,
+            proxies=proxies)
+        if response.status_code != 200:
+            logger.error(
+                f"gateio get asset charts, url: {url}, status: {response.status_code}, response: {response.text}")
+        data = response.json().get('data', {})
+        apy_day = [{'apy': float(i['rate']) * 100 * (1-okx_earn_insurance_keep_ratio), 'timestamp': int(i['dataDate'])} for i in
+                   data.get('lastOneDayRates', {}).get('rates')]
+        apy_day = sorted(apy_day, key=lambda item: item['timestamp'], reverse=False)
+        apy_month = [{'timestamp': i['dataDate'],
+                      'apy': float(i['rate']) * 100 * (1 - okx_earn_insurance_keep_ratio)} for i in
+                     data.get('lastOneMonthRates', {}).get('rates', [])]
+        return {'apy_day': apy_day, 'apy_month': apy_month}
+
     def get_okx_earn_products(self):
         """
         获取OKX活期理财产品
@@ -673,7 +794,7 @@ class ExchangeAPI:
             
             # 获取所有交易对24小时交易量
             volume_url = "https://www.okx.com/api/v5/market/tickers?instType=SPOT"
-            volume_response = requests.get(volume_url, proxies=proxies)
+            volume_response = self.session.get(volume_url, proxies=proxies)
             volumes = {}
             if volume_response.status_code == 200:
                 for item in volume_response.json().get('data', []):
@@ -683,13 +804,14 @@ class ExchangeAPI:
             
             now_timestamp_ms = int(time.time() * 1000)
             url = f"https://www.okx.com/priapi/v1/earn/simple-earn/all-products?type=all&t={now_timestamp_ms}"
-            response = requests.get(url, proxies=proxies)
+            response = self.session.get(url, proxies=proxies)
             if response.status_code != 200:
                 logger.error(
                     f"get okx flexible products error, url: {url}, status: {response.status_code}, response: {response.text}")
             data = response.json()
 
             if data["code"] == 0 and "data" in data and "allProducts" in data["data"]:
+                history_jobs = {}
                 for item in data["data"]["allProducts"]['currencies']:
                     token = item["investCurrency"]["currencyName"]
                     toked_id = int(item['investCurrency']['currencyId'])
@@ -698,31 +820,7 @@ class ExchangeAPI:
                     apy_day = []
                     apy_month = []
                     if apy > stability_buy_apy_threshold:
-                        try:
-                            url = f'https://www.okx.com/priapi/v2/financial/rate-history?currencyId={toked_id}&t={now_timestamp_ms}'
-                            logger.debug(f"get okx {token}近1天收益率曲线, url: {url}")
-                            headers = {
-                                "accept": "application/json",
-                                "content-type": "application/json",
-                                "authorization": okx_login_token,
-                                "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36 Edg/130.0.0.0",
-                            }
-                            response = requests.get(
-                                url=url,
-                                headers=headers,
-                                proxies=proxies)
-                            if response.status_code != 200:
-                                logger.error(
-                                    f"gateio get asset charts, url: {url}, status: {response.status_code}, response: {response.text}")
-                            data = response.json().get('data', {})
-                            apy_day = [{'apy': float(i['rate']) * 100 * (1-okx_earn_insurance_keep_ratio), 'timestamp': int(i['dataDate'])} for i in
-                                       data.get('lastOneDayRates', {}).get('rates')]
-                            apy_day = sorted(apy_day, key=lambda item: item['timestamp'], reverse=False)
-                            apy_month = [{'timestamp': i['dataDate'],
-                                          'apy': float(i['rate']) * 100 * (1 - okx_earn_insurance_keep_ratio)} for i in
-                                         data.get('lastOneMonthRates', {}).get('rates', [])]
-                        except Exception as e:
-                            logger.error(f"get asset chart {item['asset']} error: {str(e)}")
+                        history_jobs[len(products)] = partial(self._get_okx_apy_history, token, toked_id, now_timestamp_ms)
                     price = self.get_okx_spot_price(f"{token}USDT") if token not in ['USDC', 'USDT'] else 1.00
                     product = {
                         "exchange": "OKX",
@@ -738,7 +836,7 @@ class ExchangeAPI:
                         'price': price
                     }
                     products.append(product)
-                    sleep(0.1)
+                self._run_product_jobs('OKX', products, history_jobs)
             else:
                 logger.error(f"OKX API返回错误: {data}")
         except Exception as e:
@@ -759,7 +857,7 @@ class ExchangeAPI:
         """
         url = f"https://www.binance.com/bapi/futures/v1/public/future/common/get-funding-info"
         try:
-            response = requests.get(url, proxies=proxies)
+            response = self.session.get(url, proxies=proxies)
             if response.status_code == 200:
                 data = response.json()
                 # logger.info(f"binance funding info get funding info: {data}")
@@ -769,7 +867,7 @@ class ExchangeAPI:
             logger.error(
                 f"binance get funding info failed, url: {url}, code: {response.status_code}, error: {response.text}")
 
-    def get_binance_future_funding_rate_history(self, token, startTime, endTime):
+    def _fetch_binance_funding_rates(self, token, startTime, endTime):
         """
         https://developers.binance.com/docs/zh-CN/derivatives/usds-margined-futures/market-data/rest-api/Get-Funding-Rate-History
         [{
@@ -777,39 +875,36 @@ class ExchangeAPI:
             "fundingTime": 1740758400000,
             "fundingRate": "0.00001248",
             "markPrice": "2221.68000000"
-        },
-        {
-            "symbol": "ETHUSDT",
-            "fundingTime": 1740787200000,
-            "fundingRate": "0.00004855",
-            "markPrice": "2236.07630952"
-        },
-        {
-            "symbol": "ETHUSDT",
-            "fundingTime": 1740816000000,
-            "fundingRate": "-0.00001061",
-            "markPrice": "2228.15000000"
         }]
-        :param token:
-        :param startTime:
-        :param endTime:
-        :return:
         """
         history = []
+        while True:
+            url = f"https://fapi.binance.com/fapi/v1/fundingRate?symbol={token}&startTime={startTime}&endTime={endTime}&limit=1000"
+            response = self.session.get(url, proxies=proxies)
+            response.raise_for_status()
+            page = response.json()
+            history.extend({'fundingTime': int(i['fundingTime']), 'fundingRate': i['fundingRate'],
+                            'markPrice': i.get('markPrice')} for i in page)
+            if len(page) < 1000:
+                return history
+            startTime = int(page[-1]['fundingTime']) + 1
+
+    def _funding_rate_history(self, exchange, token, startTime, endTime, fetch, scale=1):
+        """从本地仓库读取历史资金费率（先增量同步），按结算时间升序，资金费率乘以scale"""
         try:
-            url = f"https://fapi.binance.com/fapi/v1/fundingRate?symbol={token}&startTime={startTime}&endTime={endTime}"
-            response = requests.get(url, proxies=proxies)
-            if response.status_code != 200:
-                logger.error(
-                    f"binance future funding rate history failed, url:{url}, status:{response.status_code}, response:{response.text}")
-            else:
-                logger.debug(
-                    f"binance future funding rate history success, url:{url}, status:{response.status_code}, response:{response.text}")
-            history = [{'fundingTime': int(i['fundingTime']), 'fundingRate': float(i['fundingRate']), 'symbol': token}
-                       for i in response.json()]
+            data = self.funding_history.history(exchange, token, partial(fetch, token), startTime, endTime)
         except Exception as e:
-            logger.error(f"get get_binance_future_funding_rate_history failed, code: {str(e)}")
-        return history
+            logger.error(f"获取{exchange} {token}历史资金费率失败: {str(e)}")
+            return []
+        return [{'fundingTime': int(funding_time), 'fundingRate': float(rate) * scale, 'symbol': token}
+                for funding_time, rate in zip(data['funding_time'], data['funding_rate'])]
+
+    def get_binance_future_funding_rate_history(self, token, startTime, endTime):
+        """
+        获取币安合约历史资金费率（原始小数）
+        :return [{'fundingTime': 1740758400000, 'fundingRate': 0.00001248, 'symbol': 'ETHUSDT'}]
+        """
+        return self._funding_rate_history('Binance', token, startTime, endTime, self._fetch_binance_funding_rates)
 
     def get_binance_exchange_info(self):
         """获取并缓存币安合约交易对信息"""
@@ -820,7 +915,7 @@ class ExchangeAPI:
 
         try:
             url = "https://fapi.binance.com/fapi/v1/exchangeInfo"
-            response = requests.get(url, proxies=proxies)
+            response = self.session.get(url, proxies=proxies)
             if response.status_code == 200:
                 self.binance_exchange_info = response.json()
                 self.binance_exchange_info_time = current_time
@@ -857,11 +952,14 @@ class ExchangeAPI:
                 logger.debug(f"币安合约{token}状态不是TRADING或未找到状态: {token_status}")
                 return {}
             
-            url = f"https://fapi.binance.com/fapi/v1/premiumIndex?symbol={token}"
-            response = requests.get(url, proxies=proxies)
-            if response.status_code != 200 and response.text.find('Invalid symbol') == -1:
-                logger.debug(f"binance get {token} future failed, url: {url}, status: {response.status_code}, response: {response.text}")
-            data = response.json()
+            # 优先读取行情进程维护的本机快照，不可用或过期时再请求REST
+            data = get_premium_index(token)
+            if data is None:
+                url = f"https://fapi.binance.com/fapi/v1/premiumIndex?symbol={token}"
+                response = self.session.get(url, proxies=proxies)
+                if response.status_code != 200 and response.text.find('Invalid symbol') == -1:
+                    logger.debug(f"binance get {token} future failed, url: {url}, status: {response.status_code}, response: {response.text}")
+                data = response.json()
             if not self.binance_funding_info:
                 self.get_binance_funding_info()
             fundingIntervalHours = self.binance_funding_info.get(token, {}).get('fundingIntervalHours', 8)
@@ -879,75 +977,56 @@ class ExchangeAPI:
             logger.debug(f"获取{exchange} {token}合约资金费率时出错: {str(e)}")
             return {}
 
-    def get_bybit_futures_funding_rate_history(self, token, startTime, endTime):
+    def _fetch_bybit_funding_rates(self, token, startTime, endTime):
         """
         https://bybit-exchange.github.io/docs/zh-TW/v5/market/history-fund-rate
-        [{
-            "symbol": "ETHUSDT",
-            "fundingRate": "0.000074",
-            "fundingTime": "1741939200000"
-        },
-        {
-            "symbol": "ETHUSDT",
-            "fundingRate": "0.000023",
-            "fundingTime": "1741910400000"
-        }]
-        :param token:
-        :param startTime:
-        :param endTime:
-        :param pageSize:
-        :param pageNo:
-        :return:
+        按时间倒序返回，每页最多200条
         """
         history = []
-        try:
-            # symbol = token.replace('USDT', 'PERP')
-            url = f"https://api.bybit.com/v5/market/funding/history?category=linear&symbol={token}&&startTime={startTime}&endTime={endTime}"
-            response = requests.get(url, proxies=proxies)
-            if response.status_code != 200:
-                logger.error(
-                    f"bybit future funding rate history get {url}, status: {response.status_code}, response: {response.text}")
-            history = response.json().get('result', {}).get('list', [])
-            history = [
-                {'symbol': token, 'fundingRate': float(i['fundingRate']), 'fundingTime': int(i['fundingRateTimestamp'])}
-                for i in history]
-        except Exception as e:
-            logger.error(f"get get_bybit_future_funding_rate_history failed, code: {str(e)}")
-        return history
+        while True:
+            url = f"https://api.bybit.com/v5/market/funding/history?category=linear&symbol={token}&startTime={startTime}&endTime={endTime}&limit=200"
+            response = self.session.get(url, proxies=proxies)
+            response.raise_for_status()
+            data = response.json()
+            if data.get('retCode') != 0:
+                raise Exception(f"bybit funding history failed: {data.get('retMsg')}")
+            page = data.get('result', {}).get('list', [])
+            history.extend({'fundingTime': int(i['fundingRateTimestamp']), 'fundingRate': i['fundingRate']} for i in page)
+            if len(page) < 200:
+                return history
+            endTime = min(int(i['fundingRateTimestamp']) for i in page) - 1
+
+    def get_bybit_futures_funding_rate_history(self, token, startTime, endTime):
+        """
+        获取Bybit合约历史资金费率（原始小数）
+        :return [{'fundingTime': 1741939200000, 'fundingRate': 0.000074, 'symbol': 'ETHUSDT'}]
+        """
+        return self._funding_rate_history('Bybit', token, startTime, endTime, self._fetch_bybit_funding_rates)
 
-    def get_bitget_futures_funding_rate_history(self, token, startTime, endTime, pageSize=100, pageNo=1):
+    def _fetch_bitget_funding_rates(self, token, startTime, endTime, max_pages=10):
         """
         https://www.bitget.com/zh-CN/api-doc/contract/market/Get-History-Funding-Rate
-        [{
-            "symbol": "ETHUSDT",
-            "fundingRate": "0.000074",
-            "fundingTime": "1741939200000"
-        },
-        {
-            "symbol": "ETHUSDT",
-            "fundingRate": "0.000023",
-            "fundingTime": "1741910400000"
-        }]
-        :param token:
-        :param startTime:
-        :param endTime:
-        :param pageSize:
-        :param pageNo:
-        :return:
+        按时间倒序分页返回，每页最多100条，翻页直到早于开始时间；超过max_pages仍未到达开始时间时抛出异常
         """
         history = []
-        try:
-            url = f"https://api.bitget.com/api/v2/mix/market/history-fund-rate?symbol={token}&productType=USDT-FUTURES&pageSize={pageSize}&pageNo={pageNo}"
-            response = requests.get(url, proxies=proxies)
-            if response.status_code != 200:
-                logger.error(
-                    f"bitget future funding rate history failed, url: {url}, status: {response.status_code}, response: {response.text}")
-            history = response.json().get('data', [])
-            history = [{'symbol': token, 'fundingTime': int(i['fundingTime']), 'fundingRate': float(i['fundingRate'])}
-                       for i in history if startTime <= int(i['fundingTime']) <= endTime]
-        except Exception as e:
-            logger.error(f"{token} get_bitget_future_funding_rate_history failed, code: {str(e)}")
-        return history
+        for page_no in range(1, max_pages + 1):
+            url = f"https://api.bitget.com/api/v2/mix/market/history-fund-rate?symbol={token}&productType=USDT-FUTURES&pageSize=100&pageNo={page_no}"
+            response = self.session.get(url, proxies=proxies)
+            response.raise_for_status()
+            page = response.json().get('data', [])
+            history.extend({'fundingTime': int(i['fundingTime']), 'fundingRate': i['fundingRate']}
+                           for i in page if startTime <= int(i['fundingTime']) <= endTime)
+            if len(page) < 100 or min(int(i['fundingTime']) for i in page) < startTime:
+                return history
+        # 缺少的是较早的结算，返回部分数据会被仓库记录为已同步
+        raise Exception(f"bitget {token} funding history exceeds {max_pages} pages")
+
+    def get_bitget_futures_funding_rate_history(self, token, startTime, endTime):
+        """
+        获取Bitget合约历史资金费率（原始小数）
+        :return [{'fundingTime': 1741939200000, 'fundingRate': 0.000074, 'symbol': 'ETHUSDT'}]
+        """
+        return self._funding_rate_history('Bitget', token, startTime, endTime, self._fetch_bitget_funding_rates)
 
     def get_bitget_futures_funding_price(self, token):
         """
@@ -1002,51 +1081,23 @@ class ExchangeAPI:
         """
         exchange = 'Bitget'
         try:
-            # 检查并获取交易量数据
-            if not self.bitget_futures_volumes:
-                self.get_bitget_futures_volumes()
-            
-            # 首先检查合约是否存在
-            contract_url = "https://api.bitget.com/api/v2/mix/market/contracts"
-            contract_params = {
-                "productType": "usdt-futures",
-                "symbol": token
-            }
-            contract_response = self.session.get(contract_url, params=contract_params)
-            if contract_response.status_code != 200:
-                logger.error(f"bitget get {token} contract info failed, url: {contract_url}, status: {contract_response.status_code}, response: {contract_response.text}")
-                return {}
-            
-            contract_data = contract_response.json()
-            if not contract_data.get('data'):  # 如果data为空列表，说明合约不存在
+            # 合约是否存在、资金费率和标记价格来自全市场行情快照，只需单独请求结算时间
+            ticker = self.get_futures_ticker(exchange, token)
+            if not ticker or ticker['funding_rate'] is None:
                 logger.debug(f"bitget合约{token}不存在")
                 return {}
-            
-            url = "https://api.bitget.com/api/v2/mix/market/current-fund-rate"
-            params = {
-                "symbol": f"{token}",
-                "productType": "USDT-FUTURES",
-            }
-            response = self.session.get(url, params=params)
-            if response.status_code != 200:
-                if response.text.find('does not exis') == -1:
-                    logger.error(f"bitget get {token} future, url: {url}, status: {response.status_code}, response: {response.text}")
-            data = response.json()
 
-            if data["code"] == "00000" and "data" in data:
-                funding_time, fundingIntervalHours = self.get_bitget_futures_funding_time(token)
-                fundingIntervalHoursText = fundingIntervalHours if fundingIntervalHours else "无"
-                mark_price = self.get_bitget_futures_funding_price(token)
-                return {
-                    "exchange": exchange,
-                    'fundingTime': int(funding_time),
-                    'fundingRate': float(data["data"][0]["fundingRate"]) * 100,
-                    'markPrice': float(mark_price),
-                    'fundingIntervalHours': fundingIntervalHours,
-                    'fundingIntervalHoursText': fundingIntervalHoursText,
-                    'volume_24h': self.bitget_futures_volumes.get(token, 0),
-                }  # 转换为百分比
-            return {}
+            funding_time, fundingIntervalHours = self.get_bitget_futures_funding_time(token)
+            fundingIntervalHoursText = fundingIntervalHours if fundingIntervalHours else "无"
+            return {
+                "exchange": exchange,
+                'fundingTime': int(funding_time),
+                'fundingRate': ticker['funding_rate'] * 100,  # 转换为百分比
+                'markPrice': ticker['mark_price'] or ticker['price'],
+                'fundingIntervalHours': fundingIntervalHours,
+                'fundingIntervalHoursText': fundingIntervalHoursText,
+                'volume_24h': ticker['volume'],
+            }
         except Exception as e:
             logger.error(f"获取{exchange} {token}合约资金费率时出错: {str(e)}")
             return {}
@@ -1146,8 +1197,10 @@ class ExchangeAPI:
                 self.get_okx_futures_volumes()
             
             symbol = token.replace('USDT', '/USDT:USDT')
-            # 初始化OKX交易所实例
-            exchange = ccxt.okx({'proxies': proxies})
+            # 复用OKX交易所实例，市场信息只在第一次调用时加载
+            if self.okx_ccxt is None:
+                self.okx_ccxt = ccxt.okx({'proxies': proxies})
+            exchange = self.okx_ccxt
 
             # 获取当前价格
             ticker = exchange.fetch_ticker(symbol)
@@ -1174,57 +1227,112 @@ class ExchangeAPI:
                 logger.error(f"获取{exchange} {token}合约资金费率时出错: {str(e)}")
             return {}
 
-    def get_okx_futures_funding_rate_history(self, token, startTime, endTime):
+    def _fetch_okx_funding_rates(self, token, startTime, endTime):
         """
-        获取 OKX 合约资金费率
-        :return {'fundingTime': 1741478400001, 'fundingRate': 0.0068709999999999995, 'markPrice': 2202.84}
+        https://www.okx.com/docs-v5/zh/#public-data-rest-api-get-funding-rate-history
+        按时间倒序返回，每页最多100条
         """
         history = []
-        symbol = token.replace('USDT', '-USD-SWAP')
-        try:
-            # 初始化OKX交易所实例
-            url = f"https://www.okx.com/api/v5/public/funding-rate-history?instId={symbol}&before={startTime}&after={endTime}"
-            response = requests.get(url, proxies=proxies)
-            if response.status_code != 200:
-                logger.error(
-                    f"okx future funding rate history failed,  url: {url}, status: {response.status_code}, response: {response.text}")
-            history = response.json().get('data', [])
-            history = [
-                {'fundingTime': int(i['fundingTime']), 'symbol': token, 'fundingRate': float(i['fundingRate']) * 100}
-                for i in history]
-        except Exception as e:
-            logger.error(f"get get_okx_future_funding_rate_history failed, code: {str(e)}")
-        return history
+        symbol = token.replace('USDT', '-USDT-SWAP')
+        while True:
+            url = f"https://www.okx.com/api/v5/public/funding-rate-history?instId={symbol}&before={startTime - 1}&after={endTime + 1}&limit=100"
+            response = self.session.get(url, proxies=proxies)
+            response.raise_for_status()
+            data = response.json()
+            if data.get('code') != '0':
+                raise Exception(f"okx funding history failed: {data.get('msg')}")
+            page = data.get('data', [])
+            history.extend({'fundingTime': int(i['fundingTime']), 'fundingRate': i['fundingRate']} for i in page)
+            if len(page) < 100:
+                return history
+            endTime = min(int(i['fundingTime']) for i in page) - 1
 
-    def get_gateio_futures_funding_rate_history(self, token, startTime, endTime):
+    def get_okx_futures_funding_rate_history(self, token, startTime, endTime):
         """
-        获取 OKX 合约资金费率
-        :return {'fundingTime': 1741478400001, 'fundingRate': 0.0068709999999999995, 'markPrice': 2202.84}
+        获取OKX合约历史资金费率（百分比）
+        :return [{'fundingTime': 1741478400001, 'fundingRate': 0.0068709999999999995, 'symbol': 'ETHUSDT'}]
+        """
+        return self._funding_rate_history('OKX', token, startTime, endTime, self._fetch_okx_funding_rates, scale=100)
+
+    def _fetch_gateio_funding_rates(self, token, startTime, endTime):
+        """
+        https://www.gate.io/docs/developers/apiv4/zh_CN/#合约市场历史资金费率
+        按时间倒序返回，时间单位为秒，每页最多1000条
         """
         history = []
-        try:
-            gate_io_token = token.replace('USDT', '_USDT')
-            url = f"https://api.gateio.ws/api/v4/futures/usdt/funding_rate?contract={gate_io_token}&from={int(startTime / 1000)}&to={int(endTime / 1000)}"
-            headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+        gate_io_token = token.replace('USDT', '_USDT')
+        start, end = int(startTime / 1000), int(endTime / 1000)
+        headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+        while True:
+            url = f"https://api.gateio.ws/api/v4/futures/usdt/funding_rate?contract={gate_io_token}&from={start}&to={end}&limit=1000"
             response = self.session.get(url, headers=headers, proxies=proxies)
-            if response.status_code != 200:
-                logger.error(
-                    f"okx future funding rate history failed, url: {url}, status: {response.status_code}, response: {response.text}")
-            history = response.json()
-            history = [{'fundingTime': i['t'] * 1000, 'symbol': token, 'fundingRate': 100 * float(i['r'])} for i in
-                       history]
-        except Exception as e:
-            logger.error(f"get get_gateio_future_funding_rate_history failed, code: {str(e)}")
-        return history
+            response.raise_for_status()
+            page = response.json()
+            history.extend({'fundingTime': i['t'] * 1000, 'fundingRate': i['r']} for i in page)
+            if len(page) < 1000:
+                return history
+            end = min(i['t'] for i in page) - 1
+
+    def get_gateio_futures_funding_rate_history(self, token, startTime, endTime):
+        """
+        获取GateIO合约历史资金费率（百分比）
+        :return [{'fundingTime': 1741478400000, 'fundingRate': 0.0068709999999999995, 'symbol': 'ETHUSDT'}]
+        """
+        return self._funding_rate_history('GateIO', token, startTime, endTime, self._fetch_gateio_funding_rates,
+                                          scale=100)
+
+    def get_funding_rates(self, token, exchanges=None, timeout=None):
+        """
+        并发获取合约在各交易所的资金费率，总耗时约等于最慢的一个交易所
+        :param token: 交易对，如 ETHUSDT
+        :param exchanges: 交易所列表，默认全部（Binance、Bitget、Bybit、OKX、GateIO）
+        :param timeout: 每个交易所的超时秒数，可以是数字或 {交易所: 秒数}，默认funding_timeout
+        :return: {'rates': {交易所: 资金费率dict，没有合约、失败或超时为{}},
+                  'latency_ms': {交易所: 耗时毫秒，超时为None}, 'timed_out': [超时的交易所], 'total_ms': 总耗时毫秒}
+        """
+        exchanges = exchanges or list(self.funding_rate_fetchers)
+        if self.funding_executor is None:
+            # 超时的请求仍会占用线程直到结束，线程数留出余量
+            self.funding_executor = ThreadPoolExecutor(max_workers=2 * len(self.funding_rate_fetchers),
+                                                       thread_name_prefix='funding-rate')
+
+        latency = {}
+
+        def timed(exchange):
+            begin = time.perf_counter()
+            try:
+                return self.funding_rate_fetchers[exchange](token)
+            finally:
+                latency[exchange] = round((time.perf_counter() - begin) * 1000, 1)
+
+        start = time.perf_counter()
+        futures = {exchange: self.funding_executor.submit(timed, exchange) for exchange in exchanges}
+        rates, timed_out = {}, []
+        for exchange, future in futures.items():
+            limit = timeout.get(exchange, self.funding_timeout) if isinstance(timeout, dict) else (timeout or self.funding_timeout)
+            try:
+                rates[exchange] = future.result(timeout=max(0.0, limit - (time.perf_counter() - start))) or {}
+            except FuturesTimeoutError:
+                future.cancel()
+                rates[exchange] = {}
+                timed_out.append(exchange)
+            except Exception as e:
+                logger.error(f"获取{exchange} {token}合约资金费率时出错: {str(e)}")
+                rates[exchange] = {}
+        total_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        latency_ms = {exchange: None if exchange in timed_out else latency.get(exchange) for exchange in exchanges}
+        if timed_out:
+            logger.warning(f"获取{token}资金费率超时: {', '.join(timed_out)}")
+        logger.debug(f"获取{token}资金费率耗时{total_ms}ms: " +
+                     ", ".join(f"{exchange} {'超时' if ms is None else f'{ms}ms'}" for exchange, ms in latency_ms.items()))
+        return {'rates': rates, 'latency_ms': latency_ms, 'timed_out': timed_out, 'total_ms': total_ms}
 
     def get_funding_rate(self, token):
-        rates = []
-        rates.append(self.get_binance_futures_funding_rate(token))
-        rates.append(self.get_bitget_futures_funding_rate(token))
-        rates.append(self.get_bybit_futures_funding_rate(token))
-        rates.append(self.get_okx_futures_funding_rate(token))
-        rates.append(self.get_gateio_futures_funding_rate(token))
-        return rates
+        """获取合约在各交易所的资金费率列表（Binance、Bitget、Bybit、OKX、GateIO顺序），没有合约的交易所为{}"""
+        exchanges = ['Binance', 'Bitget', 'Bybit', 'OKX', 'GateIO']
+        rates = self.get_funding_rates(token, exchanges)['rates']
+        return [rates[exchange] for exchange in exchanges]
 
     def print_funding_rate_info(self, token):
         """
@@ -31,6 +31,7 @@ from typing import List, Dict, Any
 from exchange import ExchangeAPI
 from config import funding_rate_webhook_url, funding_rate_threshold, min_avg_yield_threshold, min_funding_rate, volume_24h_threshold, proxies
 from tools.logger import logger
+from tools.premium_index_snapshot import get_premium_index
 import ccxt
 import os
 
@@ -110,19 +111,20 @@ def calculate_average_annual_yield(funding_rates: List[Dict[str, Any]], interval
     
     return total_yield / len(funding_rates)
 
-def get_funding_rate_history(exchange: str, token: str, days: int) -> List[Dict[str, Any]]:
-    """获取指定交易所和交易对的历史资金费率
+def get_funding_rate_history(exchange: str, token: str, days: int, api: ExchangeAPI = None) -> List[Dict[str, Any]]:
+    """获取指定交易所和交易对的历史资金费率（来自本地资金费率仓库，只增量请求新的结算记录）
     
     Args:
         exchange: 交易所名称
         token: 交易对
         days: 获取天数
+        api: ExchangeAPI实例，默认新建
         
     Returns:
         历史资金费率列表，每个元素包含fundingRate、fundingTime和fundingIntervalHours
     """
     history_rates = []
-    api = ExchangeAPI()
+    api = api or ExchangeAPI()
     
     # 计算时间范围
     end_time = int(time.time() * 1000)
@@ -264,129 +266,22 @@ def get_24h_volume(api: ExchangeAPI, exchange: str, token: str) -> Dict[str, Any
     :return: 包含合约和现货交易量的字典
     """
     try:
-        # 获取合约交易量（仅从指定交易所获取）
-        future_volume = 0
-        future_price = 0
-        if exchange == 'Binance':
-            if not api.binance_futures_volumes:
-                api.get_binance_futures_volumes()
-            future_volume = api.binance_futures_volumes.get(token, 0)
-            # 获取合约价格
-            url = f"https://fapi.binance.com/fapi/v1/ticker/price?symbol={token}"
-            response = requests.get(url, proxies=api.session.proxies)
-            if response.status_code == 200:
-                future_price = float(response.json()['price'])
-        elif exchange == 'Bitget':
-            if not api.bitget_futures_volumes:
-                api.get_bitget_futures_volumes()
-            future_volume = api.bitget_futures_volumes.get(token, 0)
-            # 获取合约价格
-            url = "https://api.bitget.com/api/v2/mix/market/symbol-price"
-            params = {"symbol": token, "productType": "USDT-FUTURES"}
-            response = make_bitget_request(url, params=params, proxies=api.session.proxies)
-            if response.status_code == 200:
-                data = response.json()
-                if data["code"] == "00000" and "data" in data:
-                    future_price = float(data["data"][0]["price"])
-        elif exchange == 'Bybit':
-            if not api.bybit_futures_volumes:
-                api.get_bybit_futures_volumes()
-            future_volume = api.bybit_futures_volumes.get(token, 0)
-            # 获取合约价格
-            url = "https://api.bybit.com/v5/market/tickers"
-            params = {"category": "linear", "symbol": token}
-            response = requests.get(url, params=params, proxies=api.session.proxies)
-            if response.status_code == 200:
-                data = response.json()
-                if data["retCode"] == 0 and "result" in data and "list" in data["result"]:
-                    future_price = float(data["result"]["list"][0]["lastPrice"])
-        elif exchange == 'GateIO':
-            if not api.gateio_futures_volumes:
-                api.get_gateio_futures_volumes()
-            future_volume = api.gateio_futures_volumes.get(token, 0)
-            # 获取合约价格
-            gate_io_token = token.replace('USDT', '_USDT')
-            url = f"https://api.gateio.ws/api/v4/futures/usdt/contracts/{gate_io_token}"
-            response = requests.get(url, proxies=api.session.proxies)
-            if response.status_code == 200:
-                data = response.json()
-                future_price = float(data['mark_price'])
-        elif exchange == 'OKX':
-            if not api.okx_futures_volumes:
-                api.get_okx_futures_volumes()
-            future_volume = api.okx_futures_volumes.get(token, 0)
-            # 获取合约价格
-            symbol = token.replace('USDT', '/USDT:USDT')
-            exchange = ccxt.okx({'proxies': proxies})
-            ticker = exchange.fetch_ticker(symbol)
-            future_price = float(ticker['last'])
+        # 获取合约交易量和价格（仅从指定交易所获取，来自全市场行情快照）
+        future_ticker = api.get_futures_ticker(exchange, token)
+        future_volume = future_ticker['volume'] if future_ticker else 0
+        future_price = future_ticker['price'] if future_ticker else 0
         
         # 获取所有交易所的现货交易量和价格
         spot_data = {}
         spot_token = token.replace('USDT', '')
         
-        # 获取所有交易所的现货交易量
-        if not api.binance_volumes:
-            api.get_binance_volumes()
-        if not api.bitget_volumes:
-            api.get_bitget_volumes()
-        if not api.bybit_volumes:
-            api.get_bybit_volumes()
-        if not api.gateio_volumes:
-            api.get_gateio_volumes()
-        if not api.okx_volumes:
-            api.get_okx_volumes()
-        
-        # 获取每个交易所的现货数据
+        # 获取每个交易所的现货数据（来自全市场行情快照）
         for spot_exchange in ['Binance', 'Bitget', 'Bybit', 'GateIO', 'OKX']:
-            spot_volume = 0
-            spot_price = 0
+            ticker = api.get_spot_ticker(spot_exchange, f"{spot_token}USDT")
+            spot_volume = ticker['volume'] if ticker else 0
+            spot_price = ticker['price'] if ticker else 0
             price_diff = 0
             
-            if spot_exchange == 'Binance':
-                spot_volume = api.binance_volumes.get(spot_token, 0)
-                url = f"https://api.binance.com/api/v3/ticker/price?symbol={spot_token}USDT"
-                response = requests.get(url, proxies=api.session.proxies)
-                if response.status_code == 200:
-                    spot_price = float(response.json()['price'])
-            elif spot_exchange == 'Bitget':
-                spot_volume = api.bitget_volumes.get(spot_token, 0)
-                url = "https://api.bitget.com/api/spot/v1/market/ticker"
-                params = {"symbol": f"{spot_token}USDT_SPBL"}
-                response = make_bitget_request(url, params=params, proxies=api.session.proxies)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data["code"] == "00000" and "data" in data:
-                        spot_price = float(data["data"]["close"])
-            elif spot_exchange == 'Bybit':
-                spot_volume = api.bybit_volumes.get(spot_token, 0)
-                url = "https://api.bybit.com/v5/market/tickers"
-                params = {"category": "spot", "symbol": f"{spot_token}USDT"}
-                response = requests.get(url, params=params, proxies=api.session.proxies)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data["retCode"] == 0 and "result" in data and "list" in data["result"]:
-                        spot_price = float(data["result"]["list"][0]["lastPrice"])
-            elif spot_exchange == 'GateIO':
-                spot_volume = api.gateio_volumes.get(spot_token, 0)
-                url = "https://api.gateio.ws/api/v4/spot/tickers"
-                response = requests.get(url, proxies=api.session.proxies)
-                if response.status_code == 200:
-                    data = response.json()
-                    gate_io_token = spot_token + '_USDT'
-                    for ticker in data:
-                        if ticker['currency_pair'] == gate_io_token:
-                            spot_price = float(ticker['last'])
-                            break
-            elif spot_exchange == 'OKX':
-                spot_volume = api.okx_volumes.get(spot_token, 0)
-                url = f"https://www.okx.com/api/v5/market/ticker?instId={spot_token}-USDT"
-                response = requests.get(url, proxies=api.session.proxies)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data["code"] == "0" and "data" in data:
-                        spot_price = float(data["data"][0]["last"])
-            
             # 计算价差
             if spot_price > 0:
                 price_diff = (future_price - spot_price) / spot_price * 100
@@ -511,10 +406,15 @@ def get_all_funding_rates(api: ExchangeAPI) -> List[Dict[str, Any]]:
     # 获取Binance所有合约资金费率
     try:
         logger.info("开始获取Binance所有合约资金费率")
-        url = "https://fapi.binance.com/fapi/v1/premiumIndex"
-        response = requests.get(url, proxies=api.session.proxies)
-        if response.status_code == 200:
-            data = response.json()
+        # 优先读取行情进程维护的本机快照，不可用或过期时再请求REST
+        snapshot = get_premium_index()
+        if snapshot is not None:
+            data = list(snapshot.values())
+        else:
+            url = "https://fapi.binance.com/fapi/v1/premiumIndex"
+            response = requests.get(url, proxies=api.session.proxies)
+            data = response.json() if response.status_code == 200 else None
+        if data is not None:
             count = 0
             for item in data:
                 if float(item['lastFundingRate']) * 100 >= min_funding_rate:  # 转换为百分比
@@ -680,10 +580,11 @@ def main():
                 logger.info(f"{rate['exchange']} {rate['token']}所有现货交易所交易量都不足 {volume_24h_threshold}，跳过")
                 continue
             
-            # 获取1天、7天和30天的历史数据
-            history_1d = get_funding_rate_history(rate['exchange'], rate['token'], 1)
-            history_7d = get_funding_rate_history(rate['exchange'], rate['token'], 7)
-            history_30d = get_funding_rate_history(rate['exchange'], rate['token'], 30)
+            # 获取30天的历史数据，1天和7天从中截取
+            history_30d = get_funding_rate_history(rate['exchange'], rate['token'], 30, api)
+            now_ms = int(time.time() * 1000)
+            history_7d = [h for h in history_30d if h['fundingTime'] >= now_ms - 7 * 24 * 60 * 60 * 1000]
+            history_1d = [h for h in history_30d if h['fundingTime'] >= now_ms - 1 * 24 * 60 * 60 * 1000]
             
             # 计算平均年化收益率
             avg_yield_1d = calculate_average_annual_yield(history_1d, rate['fundingIntervalHours'])
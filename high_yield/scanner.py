@@ -13,8 +13,8 @@ from datetime import datetime
 import sys
 import os
 import subprocess
-import pymysql
 import json
+from concurrent.futures import ThreadPoolExecutor, wait
 
 # import traceback
 
@@ -29,6 +29,7 @@ from tools.wechatwork import WeChatWorkBot
 from tools.telegram import TelegramBot
 from high_yield.token_manager import TokenManager
 from tools.proxy import get_proxy_ip
+from tools.db_pool import get_connection
 from config import leverage_ratio, yield_percentile, stability_buy_apy_threshold, sell_apy_threshold, \
     future_percentile, highyield_buy_apy_threshold, stability_buy_webhook_url, highyield_buy_webhook_url, \
     highyield_checkpoints, volume_24h_threshold, subscribed_webhook_url, project_root, earn_auto_buy, \
@@ -64,9 +65,9 @@ class CryptoYieldMonitor:
         self._init_database()
     
     def _get_db_connection(self):
-        """获取数据库连接"""
+        """从共享连接池获取数据库连接（close()时归还连接池）"""
         try:
-            connection = pymysql.connect(**mysql_config)
+            connection = get_connection(mysql_config)
             return connection
         except Exception as e:
             logger.error(f"数据库连接失败: {str(e)}")
@@ -156,41 +157,13 @@ class CryptoYieldMonitor:
         """检查Token是否在任意交易所上线了合约交易，且交易费率为正"""
         results = []
 
-        # 检查Binance
-        try:
-            binance_rate = self.exchange_api.get_binance_futures_funding_rate(token)
-            logger.debug(f"{token} Binance Perp info: {binance_rate}")
-        except Exception as e:
-            binance_rate = None
-            logger.error(f"获取{token}的合约资金费率报错：: {str(e)}")
-
-        try:
-            bitget_rate = self.exchange_api.get_bitget_futures_funding_rate(token)
-            logger.debug(f"{token} Bitget Perp info: {bitget_rate}")
-        except Exception as e:
-            bitget_rate = None
-            logger.error(f"获取Bitget {token}的合约资金费率报错：: {str(e)}")
-
-        try:
-            bybit_rate = self.exchange_api.get_bybit_futures_funding_rate(token)
-            logger.debug(f"{token} Bybit Perp info: {bybit_rate}")
-        except Exception as e:
-            bybit_rate = None
-            logger.error(f"获取Bybit {token}的合约资金费率报错：: {str(e)}")
-
-        # try:
-        #     gate_io_rate = self.exchange_api.get_gateio_futures_funding_rate(token)
-        #     logger.debug(f"{token} GateIO Perp info: {gate_io_rate}")
-        # except Exception as e:
-        #     bybit_rate = None
-        #     logger.error(f"获取GateIO {token}的合约资金费率报错：: {str(e)}")
-
-        try:
-            okx_rate = self.exchange_api.get_okx_futures_funding_rate(token)
-            logger.debug(f"{token} GateIO Perp info: {okx_rate}")
-        except Exception as e:
-            okx_rate = None
-            logger.error(f"获取OKX {token}的合约资金费率报错：: {str(e)}")
+        # 并发获取各交易所的资金费率（GateIO暂不检查）
+        funding = self.exchange_api.get_funding_rates(token, ['Binance', 'Bitget', 'Bybit', 'OKX'])
+        logger.debug(f"{token} Perp info: {funding['rates']}, 耗时: {funding['latency_ms']}")
+        binance_rate = funding['rates']['Binance']
+        bitget_rate = funding['rates']['Bitget']
+        bybit_rate = funding['rates']['Bybit']
+        okx_rate = funding['rates']['OKX']
 
         end = int(time.time() * 1000)
         start = end - 7 * 24 * 60 * 60 * 1000
@@ -507,6 +480,42 @@ class CryptoYieldMonitor:
         logger.info(
             f"从{products[0]['exchange']}获取到{len([i for i in products if i['duration'] == 0])}个活期理财和{len([i for i in products if i['duration'] > 0])}个定期理财产品")
 
+    def collect_earn_products(self, timeout=300):
+        """
+        并发获取各交易所的理财产品，总耗时取决于最慢的交易所
+        :param timeout: 等待所有交易所的最长秒数，超时的交易所本轮跳过
+        :return: 按交易所顺序合并的产品列表
+        """
+        collectors = [
+            ('Binance', self.exchange_api.get_binance_earn_products),
+            ('GateIO', self.exchange_api.get_gateio_earn_products),
+            ('Bitget', self.exchange_api.get_bitget_earn_products),
+            ('Bybit', self.exchange_api.get_bybit_earn_products),
+            ('OKX', self.exchange_api.get_okx_earn_products),
+        ]
+        start = time.time()
+        executor = ThreadPoolExecutor(max_workers=len(collectors), thread_name_prefix='earn-collector')
+        futures = {name: executor.submit(collector) for name, collector in collectors}
+        wait(futures.values(), timeout=timeout)
+        # 超时的交易所在后台继续执行，不再等待
+        executor.shutdown(wait=False)
+
+        products = []
+        for name, future in futures.items():
+            if not future.done():
+                logger.warning(f"获取{name}理财产品超过{timeout}秒未完成，本轮跳过")
+                continue
+            try:
+                exchange_products = future.result()
+            except Exception as e:
+                logger.error(f"获取{name}理财产品失败: {str(e)}")
+                continue
+            if exchange_products:
+                self.print_products_count(exchange_products)
+                products += exchange_products
+        logger.info(f"获取所有交易所理财产品耗时{time.time() - start:.1f}秒")
+        return products
+
     def run(self):
         # 尝试获取外网出口IP
         proxy_ip = get_proxy_ip()
@@ -521,32 +530,8 @@ class CryptoYieldMonitor:
                 with open(self.combined_file, 'w', encoding='utf-8') as f:
                     f.write('')
 
-            products = []
-            # 获取所有交易所的活期理财产品
-            binance_products = self.exchange_api.get_binance_earn_products()
-            if binance_products:
-                self.print_products_count(binance_products)
-                products += binance_products
-
-            gateio_products = self.exchange_api.get_gateio_earn_products()
-            if gateio_products:
-                self.print_products_count(gateio_products)
-                products += gateio_products
-
-            bitget_products = self.exchange_api.get_bitget_earn_products()
-            if bitget_products:
-                self.print_products_count(bitget_products)
-                products += bitget_products
-
-            bybit_products = self.exchange_api.get_bybit_earn_products()
-            if bybit_products:
-                self.print_products_count(bybit_products)
-                products += bybit_products
-
-            okx_products = self.exchange_api.get_okx_earn_products()
-            if okx_products:
-                self.print_products_count(okx_products)
-                products += okx_products
+            # 并发获取所有交易所的理财产品
+            products = self.collect_earn_products()
 
             # 合并所有产品
             # all_products = binance_products + bitget_products + bybit_products + gateio_products + okx_products
@@ -559,6 +544,12 @@ class CryptoYieldMonitor:
             # self.position_check(all_products)
         except Exception as e:
             logger.exception(f"运行监控任务时发生错误: {str(e)}")
+        finally:
+            self.exchange_api.session.log_stats()
+            self.exchange_api.log_ticker_stats()
+            self.exchange_api.funding_history.log_stats()
+            self.exchange_api.apy_history.log_stats()
+            self.exchange_api.apy_history.prune()
 
 
 # 主程序入口
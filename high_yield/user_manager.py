@@ -3,6 +3,7 @@ from pymysql import Error
 from datetime import datetime, timedelta
 from config import db_host, db_port, db_database, db_user, db_pass
 from tools.logger import logger
+from tools.db_pool import get_pool
 
 class UserManager:
     """管理代币数据库操作的类"""
@@ -20,7 +21,8 @@ class UserManager:
     def connect(self):
         """连接到MySQL数据库"""
         try:
-            self.connection = pymysql.connect(
+            # 从共享连接池借出连接，disconnect时归还
+            self.connection = get_pool(dict(
                 host=self.host,
                 port=self.port,
                 database=self.database,
@@ -28,7 +30,7 @@ class UserManager:
                 password=self.password,
                 charset='utf8mb4',
                 cursorclass=pymysql.cursors.DictCursor
-            )
+            )).get_connection()
             return True
         except Error as e:
             logger.error(f"连接MySQL时发生错误: {e}")
@@ -39,7 +41,7 @@ class UserManager:
         if self.connection:
             self.connection.close()
             self.connection = None
-            logger.info("数据库连接已关闭")
+            logger.info("数据库连接已归还连接池")
 
     def create_table(self):
         """创建数据表（如果不存在）"""
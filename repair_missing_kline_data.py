@@ -22,12 +22,12 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import pymysql
 import argparse
 import asyncio
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Tuple
 from tools.logger import logger
+from tools.db_pool import get_pool
 from config import mysql_config, binance_api_key, binance_api_secret, proxies
 from binance.client import Client
 
@@ -38,6 +38,7 @@ class KlineDataRepairer:
     def __init__(self):
         """初始化修复器"""
         self.mysql_config = mysql_config
+        self.db_pool = get_pool(self.mysql_config)
         self.current_time = datetime.now()
         # 排除最近15分钟的数据，因为可能还没有更新到数据库
         self.check_end_time = self.current_time - timedelta(minutes=15)
@@ -58,7 +59,7 @@ class KlineDataRepairer:
     def find_missing_1min_data(self, symbol: str) -> List[Tuple[datetime, datetime]]:
         """找出1分钟K线数据的缺失时间段（基于实际数据范围）"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             # 获取当天的所有1分钟K线时间戳（排除最近15分钟）
@@ -130,7 +131,7 @@ class KlineDataRepairer:
     def find_missing_30min_data(self, symbol: str) -> List[Tuple[datetime, datetime]]:
         """找出30分钟K线数据的缺失时间段（基于实际数据范围）"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             # 获取30分钟K线时间戳
@@ -267,19 +268,10 @@ class KlineDataRepairer:
             # 根据间隔选择表名
             table_name = 'kline_data_1min' if interval == '1min' else 'kline_data_30min'
 
-            conn = pymysql.connect(**self.mysql_config)
-            cursor = conn.cursor()
-
-            saved_count = 0
+            rows = []
             for kline in klines:
                 try:
-                    cursor.execute(f'''
-                        INSERT IGNORE INTO {table_name} 
-                        (symbol, open_time, close_time, open_price, high_price, low_price, 
-                         close_price, volume, quote_volume, trades_count, 
-                         taker_buy_base_volume, taker_buy_quote_volume)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ''', (
+                    rows.append((
                         symbol,
                         int(kline[0]),          # open_time
                         int(kline[6]),          # close_time
@@ -293,10 +285,24 @@ class KlineDataRepairer:
                         float(kline[9]),        # taker_buy_base_volume
                         float(kline[10])        # taker_buy_quote_volume
                     ))
-                    if cursor.rowcount > 0:
-                        saved_count += 1
                 except Exception as e:
-                    logger.debug(f"插入{interval}K线数据失败 (可能重复): {str(e)}")
+                    logger.debug(f"跳过格式异常的{interval}K线数据: {str(e)}")
+
+            if not rows:
+                return False
+
+            conn = self.db_pool.get_connection()
+            cursor = conn.cursor()
+
+            # 多行INSERT IGNORE，一次往返写入
+            cursor.executemany(f'''
+                INSERT IGNORE INTO {table_name} 
+                (symbol, open_time, close_time, open_price, high_price, low_price, 
+                 close_price, volume, quote_volume, trades_count, 
+                 taker_buy_base_volume, taker_buy_quote_volume)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ''', rows)
+            saved_count = max(cursor.rowcount, 0)
 
             conn.commit()
             conn.close()
@@ -313,7 +319,7 @@ class KlineDataRepairer:
     def get_all_symbols_in_db(self) -> List[str]:
         """获取数据库中所有交易对"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             # 从两个表中获取所有交易对
@@ -0,0 +1,244 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip('config')
+pytest.importorskip('binance')
+pytest.importorskip('ccxt.pro')
+
+from tools.scan_metrics import ScanMetrics
+from tools.ttl_cache import TTLCache
+from trade import binance_price_high_scanner as scanner_module
+from trade.binance_price_high_scanner import BinancePriceHighScanner
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+@pytest.fixture
+def scanner(tmp_path):
+    scanner = BinancePriceHighScanner.__new__(BinancePriceHighScanner)
+    db_path = str(tmp_path / 'metadata.sqlite3')
+    scanner.products_store = TTLCache(db_path, 'products', ttl_seconds=60)
+    scanner.symbol_description_store = TTLCache(db_path, 'symbol_description', ttl_seconds=60)
+    scanner.products_store.set_many({'BTCUSDT': ['pow']})
+    scanner.symbol_description_store.set_many({'BTC': 'Bitcoin'})
+    scanner.products_data = {'BTCUSDT': ['pow']}
+    scanner.symbol_description_data = {'BTC': 'Bitcoin'}
+    scanner.products_stale = True
+    scanner.symbol_description_stale = True
+    yield scanner
+    scanner.products_store.close()
+    scanner.symbol_description_store.close()
+
+
+def respond_with(monkeypatch, body):
+    monkeypatch.setattr(scanner_module.requests, 'get', lambda *args, **kwargs: FakeResponse(body))
+
+
+@pytest.mark.parametrize('body', [{'success': False, 'message': 'busy'}, {'success': True, 'data': []}, []])
+def test_refresh_products_keeps_cache_on_bad_response(scanner, monkeypatch, body):
+    respond_with(monkeypatch, body)
+    scanner._refresh_products()
+
+    assert scanner.products_data == {'BTCUSDT': ['pow']}
+    assert scanner.products_stale
+    assert scanner.products_store.load_all()[0] == {'BTCUSDT': ['pow']}
+
+
+def test_refresh_products_replaces_cache_on_success(scanner, monkeypatch):
+    respond_with(monkeypatch, {'success': True, 'data': [{'s': 'ETHUSDT', 'tags': ['pos']}]})
+    scanner._refresh_products()
+
+    assert scanner.products_data == {'ETHUSDT': ['pos']}
+    assert not scanner.products_stale
+    assert scanner.products_store.load_all()[0] == {'ETHUSDT': ['pos']}
+
+
+@pytest.mark.parametrize('body', [{}, {'other_key': 'value'}, ['symbol_desc_BTC']])
+def test_refresh_symbol_descriptions_keeps_cache_on_bad_response(scanner, monkeypatch, body):
+    respond_with(monkeypatch, body)
+    scanner._refresh_symbol_descriptions()
+
+    assert scanner.symbol_description_data == {'BTC': 'Bitcoin'}
+    assert scanner.symbol_description_stale
+    assert scanner.symbol_description_store.load_all()[0] == {'BTC': 'Bitcoin'}
+
+
+def test_save_pending_klines_requeues_failed_symbols(monkeypatch):
+    scanner = BinancePriceHighScanner.__new__(BinancePriceHighScanner)
+    scanner.scan_metrics = ScanMetrics()
+    saved = {}
+
+    def save_kline_data(symbol, klines, interval='1min'):
+        if symbol == 'ETHUSDT':
+            return False
+        saved[symbol] = klines
+        return True
+
+    monkeypatch.setattr(scanner, 'save_kline_data', save_kline_data)
+    pending = {'BTCUSDT': [[1]], 'ETHUSDT': [[1], [2]]}
+    asyncio.run(scanner._save_pending_klines(pending))
+
+    assert saved == {'BTCUSDT': [[1]]}
+    assert pending == {'ETHUSDT': [[1], [2]]}
+
+
+def test_backfill_skips_only_symbols_with_today_1min_klines(monkeypatch):
+    scanner = BinancePriceHighScanner.__new__(BinancePriceHighScanner)
+    scanner.scan_concurrency = 2
+    today_start_ms = int(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp() * 1000)
+    yesterday_ms = today_start_ms - int(timedelta(hours=1).total_seconds() * 1000)
+    inventory = {
+        # 扫描持续更新的交易对
+        'BTCUSDT': {'last_1min': today_start_ms + 60000},
+        # 保存了30分钟K线但没有写入断点就中断
+        'ETHUSDT': {'last_1min': None},
+        # 只有前一天的1分钟K线
+        'SOLUSDT': {'last_1min': yesterday_ms},
+    }
+    initialized = []
+
+    async def initialize_kline_data(symbol, checkpoints=None):
+        initialized.append(symbol)
+        return True
+
+    class FakeLimiter:
+        def stats(self):
+            return {'total_weight': 0, 'total_wait_seconds': 0}
+
+    monkeypatch.setattr(scanner, 'get_all_futures_symbols', lambda: list(inventory) + ['NEWUSDT'])
+    monkeypatch.setattr(scanner, 'load_kline_inventory', lambda: setattr(scanner, 'kline_inventory', inventory))
+    monkeypatch.setattr(scanner, '_load_backfill_checkpoints', lambda date_str: {})
+    monkeypatch.setattr(scanner, 'initialize_kline_data', initialize_kline_data)
+    monkeypatch.setattr(scanner, '_log_kline_ingest_stats', lambda: None)
+    scanner.weight_limiter = FakeLimiter()
+
+    asyncio.run(scanner.initialize_all_kline_data())
+
+    assert sorted(initialized) == ['ETHUSDT', 'NEWUSDT', 'SOLUSDT']
+
+
+def test_close_waits_for_cancelled_order_listener():
+    class FakeNotifier:
+        async def close(self):
+            pass
+
+    class FakePool:
+        def stats(self):
+            return {}
+
+        def close_all(self):
+            pass
+
+    async def run():
+        scanner = BinancePriceHighScanner.__new__(BinancePriceHighScanner)
+        scanner.notifier = FakeNotifier()
+        scanner.db_pool = FakePool()
+        scanner.metadata_prefetch_task = None
+        scanner.metadata_refresh_executor = ThreadPoolExecutor(max_workers=1)
+        scanner.binance_trading = None
+        scanner.order_listener_task = asyncio.create_task(asyncio.sleep(3600))
+        await asyncio.sleep(0)
+
+        await scanner.close()
+        return scanner.order_listener_task
+
+    assert asyncio.run(run()).cancelled()
+
+
+def test_order_listener_starts_before_reconcile(monkeypatch):
+    events = []
+
+    class FakeTrading:
+        async def watch_orders(self):
+            events.append('watch')
+            await asyncio.Event().wait()
+
+    async def reconcile():
+        events.append('reconcile')
+
+    async def run():
+        scanner = BinancePriceHighScanner.__new__(BinancePriceHighScanner)
+        scanner.binance_trading = FakeTrading()
+        scanner.order_listener_task = None
+        scanner.unmatched_close_order_updates = {}
+        monkeypatch.setattr(scanner, '_reconcile_close_orders', reconcile)
+
+        await scanner.check_and_update_close_orders()
+        scanner.order_listener_task.cancel()
+
+    asyncio.run(run())
+    assert events == ['watch', 'reconcile']
+
+
+def test_order_listener_reconciles_after_reconnect(monkeypatch):
+    events = []
+
+    class FakeTrading:
+        def __init__(self):
+            self.calls = 0
+
+        async def watch_orders(self):
+            self.calls += 1
+            events.append(f'watch{self.calls}')
+            if self.calls == 1:
+                raise ConnectionError("stream closed")
+            if self.calls == 2:
+                return [{'id': '42', 'status': 'closed', 'average': '1.5'}]
+            await asyncio.Event().wait()
+
+    async def reconcile():
+        events.append('reconcile')
+
+    real_sleep = asyncio.sleep
+
+    async def no_wait(seconds, *args):
+        await real_sleep(0)
+
+    async def run():
+        scanner = BinancePriceHighScanner.__new__(BinancePriceHighScanner)
+        scanner.binance_trading = FakeTrading()
+        monkeypatch.setattr(scanner, '_reconcile_close_orders', reconcile)
+        monkeypatch.setattr(scanner, '_handle_order_update', lambda order: events.append(f"order{order['id']}"))
+        monkeypatch.setattr(scanner_module.asyncio, 'sleep', no_wait)
+
+        task = asyncio.create_task(scanner._watch_close_orders())
+        while 'watch3' not in events:
+            await real_sleep(0)
+        task.cancel()
+
+    asyncio.run(run())
+    assert events == ['watch1', 'watch2', 'reconcile', 'order42', 'watch3']
+
+
+def test_only_close_order_updates_are_parked(monkeypatch):
+    scanner = BinancePriceHighScanner.__new__(BinancePriceHighScanner)
+    scanner.unmatched_close_order_updates = {}
+    scanner.close_order_ids = {'known'}
+    monkeypatch.setattr(scanner, 'update_close_order_status', lambda *args: 0)
+
+    updates = [
+        # 开仓卖空单成交
+        {'id': 'entry', 'status': 'closed', 'side': 'sell', 'average': '2', 'info': {'ps': 'SHORT'}},
+        # 买入平空的止盈单，记录还未写入
+        {'id': 'take_profit', 'status': 'closed', 'side': 'buy', 'average': '1.9', 'info': {'ps': 'SHORT'}},
+        {'id': 'known', 'status': 'canceled', 'side': 'buy', 'info': {}},
+        {'id': 'reduce', 'status': 'closed', 'side': 'sell', 'average': '3', 'reduceOnly': True, 'info': {}},
+        {'id': 'open', 'status': 'open', 'side': 'buy', 'info': {'ps': 'SHORT'}},
+    ]
+    for order in updates:
+        scanner._handle_order_update(order)
+
+    assert sorted(scanner.unmatched_close_order_updates) == ['known', 'reduce', 'take_profit']
+    assert scanner.unmatched_close_order_updates['known'][:2] == ('CANCELLED', 0.0)
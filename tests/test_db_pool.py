@@ -0,0 +1,138 @@
+import gc
+
+import pymysql
+import pytest
+
+from tools import db_pool
+from tools.db_pool import MySQLConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, args=None):
+        self.conn.executed.append(query)
+
+
+class FakeConnection:
+    cursorclass = FakeCursor
+
+    def __init__(self):
+        self.executed = []
+        self.rollbacks = 0
+        self.closed = False
+        self.alive = True
+        self.fail_rollback = False
+
+    def cursor(self, cursor_class):
+        return cursor_class(self)
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise pymysql.err.OperationalError("lost connection")
+        self.rollbacks += 1
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise pymysql.err.OperationalError("gone away")
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    created = []
+
+    def connect(**kwargs):
+        created.append(FakeConnection())
+        return created[-1]
+
+    monkeypatch.setattr(db_pool.pymysql, 'connect', connect)
+    return created
+
+
+def test_release_rolls_back_and_reuses_connection(connections):
+    pool = MySQLConnectionPool({}, max_size=2)
+    conn = pool.get_connection()
+    conn.cursor().execute('SELECT 1')
+    conn.close()
+    # 重复close不会重复归还
+    conn.close()
+
+    assert connections[0].rollbacks == 1
+    assert pool.stats()['in_use'] == 0 and pool.stats()['idle'] == 1
+
+    with pool.connection() as again:
+        again.cursor().execute('SELECT 2')
+    assert len(connections) == 1
+    stats = pool.stats()
+    assert stats['created'] == 1 and stats['reused'] == 1 and stats['queries'] == 2
+
+    with pytest.raises(pymysql.err.InterfaceError):
+        conn.cursor()
+
+
+def test_failed_rollback_discards_connection(connections):
+    pool = MySQLConnectionPool({})
+    conn = pool.get_connection()
+    connections[0].fail_rollback = True
+    conn.close()
+
+    assert connections[0].closed
+    assert pool.stats()['idle'] == 0 and pool.stats()['discarded'] == 1
+
+
+def test_idle_connections_beyond_max_size_are_closed(connections):
+    pool = MySQLConnectionPool({}, max_size=1, max_overflow=2)
+    first, second = pool.get_connection(), pool.get_connection()
+    first.close()
+    second.close()
+
+    assert pool.stats()['idle'] == 1
+    assert [conn.closed for conn in connections] == [False, True]
+
+
+def test_checkout_times_out_when_exhausted(connections):
+    pool = MySQLConnectionPool({}, max_size=1, max_overflow=0, checkout_timeout=0.05)
+    held = pool.get_connection()
+    with pytest.raises(pymysql.err.OperationalError):
+        pool.get_connection()
+    held.close()
+    pool.get_connection().close()
+    assert pool.stats()['waits'] >= 1
+
+
+def test_dead_connection_is_reconnected_before_use(connections):
+    pool = MySQLConnectionPool({}, ping_interval=0)
+    pool.get_connection().close()
+    connections[0].alive = False
+
+    conn = pool.get_connection()
+    conn.cursor().execute('SELECT 1')
+    conn.close()
+
+    assert connections[0].closed
+    assert connections[1].executed == ['SELECT 1']
+    assert pool.stats()['reconnects'] == 1
+
+
+def test_unreleased_connection_is_reclaimed_on_garbage_collection(connections):
+    pool = MySQLConnectionPool({}, max_size=1, max_overflow=0, checkout_timeout=0.05)
+    pool.get_connection()
+    gc.collect()
+
+    # 泄漏的连接被丢弃，名额归还连接池
+    assert connections[0].closed
+    assert pool.stats()['in_use'] == 0
+    pool.get_connection().close()
+
+
+def test_get_pool_shares_pool_per_config():
+    config = {'host': 'db.test', 'port': 3306, 'user': 'u', 'password': 'p', 'database': 'test_get_pool'}
+    assert db_pool.get_pool(config) is db_pool.get_pool(dict(config))
+    assert db_pool.get_pool(config) is not db_pool.get_pool({**config, 'database': 'other'})
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from tools.funding_rate_store import HOUR_MS, FundingRateStore, normalize_symbol
+
+START_MS = 1704067200000  # 2024-01-01 00:00 UTC
+
+
+class FakeExchange:
+    """按8小时结算生成资金费率，记录每次请求的时间范围"""
+
+    def __init__(self, interval_hours=8, fail=False):
+        self.interval_ms = interval_hours * HOUR_MS
+        self.fail = fail
+        self.requests = []
+
+    def rate(self, funding_time):
+        return (funding_time - START_MS) / self.interval_ms * 1e-5
+
+    def __call__(self, start_ms, end_ms):
+        self.requests.append((start_ms, end_ms))
+        if self.fail:
+            raise ConnectionError("timeout")
+        first = START_MS + -(-(start_ms - START_MS) // self.interval_ms) * self.interval_ms
+        return [{'fundingTime': t, 'fundingRate': str(self.rate(t)), 'markPrice': ''}
+                for t in range(first, end_ms + 1, self.interval_ms)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FundingRateStore(str(tmp_path / 'funding.sqlite3'))
+    yield store
+    store.close()
+
+
+def test_normalize_symbol():
+    for symbol in ('ETH/USDT:USDT', 'ETH_USDT', 'ETH-USDT-SWAP', 'ETHUSDT'):
+        assert normalize_symbol(symbol) == 'ETHUSDT'
+
+
+def test_first_sync_fetches_window_and_load_returns_arrays(store):
+    fetch = FakeExchange()
+    now_ms = START_MS + 2 * 24 * HOUR_MS
+    assert store.sync('Binance', 'ETH/USDT:USDT', fetch, START_MS, now_ms) == 7
+    assert fetch.requests == [(START_MS, now_ms)]
+
+    data = store.load('Binance', 'ETHUSDT', START_MS, now_ms)
+    assert data['funding_time'].dtype == np.int64
+    assert data['funding_time'].tolist() == list(range(START_MS, now_ms + 1, 8 * HOUR_MS))
+    np.testing.assert_allclose(data['funding_rate'], [fetch.rate(t) for t in data['funding_time']])
+    assert np.isnan(data['mark_price']).all()
+    assert store.interval_hours('Binance', 'ETHUSDT') == 8
+
+
+def test_sync_skips_until_next_settlement_then_fetches_only_new_points(store):
+    fetch = FakeExchange()
+    now_ms = START_MS + 24 * HOUR_MS
+    store.sync('Binance', 'ETHUSDT', fetch, START_MS, now_ms)
+
+    # 距上次结算不足一个周期（也未超过max_stale_hours）：不请求
+    assert store.sync('Binance', 'ETHUSDT', fetch, START_MS, now_ms + 3 * HOUR_MS) == 0
+    assert len(fetch.requests) == 1 and store.stats['skipped'] == 1
+
+    # 到达下一次结算：只请求最后一次结算之后的数据
+    later_ms = now_ms + 8 * HOUR_MS
+    assert store.sync('Binance', 'ETHUSDT', fetch, START_MS, later_ms) == 1
+    assert fetch.requests[-1] == (now_ms + 1, later_ms)
+    assert len(store.load('Binance', 'ETHUSDT', START_MS, later_ms)['funding_time']) == 5
+
+
+def test_sync_rechecks_after_max_stale_hours(store):
+    fetch = FakeExchange()
+    now_ms = START_MS + 24 * HOUR_MS
+    store.sync('Binance', 'ETHUSDT', fetch, START_MS, now_ms)
+
+    # 交易所可能缩短结算周期，超过max_stale_hours后即使未到下一次结算也重新检查
+    recheck_ms = now_ms + 5 * HOUR_MS
+    assert store.sync('Binance', 'ETHUSDT', fetch, START_MS, recheck_ms) == 0
+    assert fetch.requests[-1] == (now_ms + 1, recheck_ms)
+
+
+def test_sync_backfills_earlier_window(store):
+    fetch = FakeExchange()
+    now_ms = START_MS + 3 * 24 * HOUR_MS
+    store.sync('Binance', 'ETHUSDT', fetch, START_MS + 2 * 24 * HOUR_MS, now_ms)
+
+    assert store.sync('Binance', 'ETHUSDT', fetch, START_MS, now_ms) == 6
+    assert fetch.requests[-1] == (START_MS, START_MS + 2 * 24 * HOUR_MS - 1)
+    assert len(store.load('Binance', 'ETHUSDT', START_MS, now_ms)['funding_time']) == 10
+
+
+def test_failed_fetch_is_not_recorded_as_synced(store):
+    now_ms = START_MS + 24 * HOUR_MS
+    failing = FakeExchange(fail=True)
+    assert store.sync('OKX', 'ETH-USDT-SWAP', failing, START_MS, now_ms) == 0
+    assert store.stats['errors'] == 1
+
+    fetch = FakeExchange()
+    assert store.sync('OKX', 'ETH-USDT-SWAP', fetch, START_MS, now_ms) == 4
+    assert fetch.requests == [(START_MS, now_ms)]
+
+
+def test_empty_period_is_remembered(store):
+    fetch = FakeExchange()
+    now_ms = START_MS + 24 * HOUR_MS
+    # 新上线的交易对还没有结算，同步过的范围同样记录，max_stale_hours内不再请求
+    assert store.sync('Bybit', 'NEWUSDT', lambda start, end: [], START_MS, now_ms) == 0
+    assert store.sync('Bybit', 'NEWUSDT', fetch, START_MS, now_ms + HOUR_MS) == 0
+    assert fetch.requests == []
+    assert store.interval_hours('Bybit', 'NEWUSDT') == store.default_interval_hours
+
+
+def test_history_is_shared_between_store_instances(tmp_path):
+    db_path = str(tmp_path / 'funding.sqlite3')
+    fetch = FakeExchange(interval_hours=4)
+    now_ms = START_MS + 24 * HOUR_MS
+    writer = FundingRateStore(db_path)
+    writer.sync('GateIO', 'ETH_USDT', fetch, START_MS, now_ms)
+
+    reader = FundingRateStore(db_path)
+    assert reader.sync('GateIO', 'ETHUSDT', fetch, START_MS, now_ms + HOUR_MS) == 0
+    assert reader.interval_hours('GateIO', 'ETHUSDT') == 4
+    writer.close()
+    reader.close()
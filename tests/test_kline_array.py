@@ -0,0 +1,69 @@
+import numpy as np
+
+from trade.kline_array import KlineArray
+
+MINUTE_MS = 60 * 1000
+
+
+def rest_kline(open_time, open_price, high, low, close, volume=1.0, trades=1):
+    """Binance REST接口格式（字符串价格，最后一列ignore）"""
+    return [open_time, str(open_price), str(high), str(low), str(close), str(volume), open_time + MINUTE_MS - 1,
+            str(volume * close), trades, str(volume / 2), str(volume * close / 2), '0']
+
+
+def test_from_rows_parses_rest_klines():
+    klines = KlineArray.from_rows([rest_kline(0, 1, 2, 0.5, 1.5), rest_kline(MINUTE_MS, 1.5, 3, 1, 2.5)])
+    assert len(klines) == 2
+    assert klines.open_time.dtype == np.int64
+    assert klines.trades_count.dtype == np.int64
+    assert klines.high.dtype == np.float64
+    assert klines.close.tolist() == [1.5, 2.5]
+    assert klines.close_time.tolist() == [MINUTE_MS - 1, 2 * MINUTE_MS - 1]
+
+
+def test_empty_and_concat():
+    assert len(KlineArray.from_rows([])) == 0
+    assert len(KlineArray.concat([KlineArray.empty(), KlineArray.empty()])) == 0
+
+    first = KlineArray.from_rows([rest_kline(0, 1, 2, 0.5, 1.5)])
+    second = KlineArray.from_rows([rest_kline(MINUTE_MS, 1.5, 3, 1, 2.5)])
+    assert KlineArray.concat([KlineArray.empty(), first]) is first
+    assert KlineArray.concat([first, second]).open_time.tolist() == [0, MINUTE_MS]
+
+
+def test_indexing_returns_kline_arrays():
+    klines = KlineArray.from_rows([rest_kline(i * MINUTE_MS, 1, 2, 0.5, i) for i in range(5)])
+    assert klines[-1].close.tolist() == [4.0]
+    assert klines[1].close.tolist() == [1.0]
+    assert klines[1:3].close.tolist() == [1.0, 2.0]
+
+
+def test_to_db_rows_uses_table_column_order():
+    klines = KlineArray.from_rows([rest_kline(0, 1, 2, 0.5, 1.5, volume=4.0, trades=7)])
+    assert klines.to_db_rows('BTCUSDT') == [
+        ('BTCUSDT', 0, MINUTE_MS - 1, 1.0, 2.0, 0.5, 1.5, 4.0, 6.0, 7, 2.0, 3.0)]
+
+
+def test_range_high_low():
+    klines = KlineArray.from_rows([rest_kline(i * MINUTE_MS, 1, 10 + i, 5 - i, 1) for i in range(5)])
+    assert klines.range_high_low(2 * MINUTE_MS) == (14.0, 1.0)
+    # 不含最新一根
+    assert klines.range_high_low(2 * MINUTE_MS, end_index=len(klines) - 1) == (13.0, 2.0)
+    assert klines.range_high_low(10 * MINUTE_MS) is None
+
+
+def test_aggregate_to_30min():
+    interval_ms = 30 * MINUTE_MS
+    rows = [rest_kline(i * MINUTE_MS, i, i + 1, i - 1, i + 0.5, volume=1.0, trades=2) for i in range(60)]
+    # 缺少第二个周期中间的K线时按实际存在的K线聚合
+    rows = rows[:40] + rows[45:]
+    aggregated = KlineArray.from_rows(rows).aggregate(interval_ms)
+
+    assert aggregated.open_time.tolist() == [0, interval_ms]
+    assert aggregated.close_time.tolist() == [interval_ms - 1, 2 * interval_ms - 1]
+    assert aggregated.open.tolist() == [0.0, 30.0]
+    assert aggregated.high.tolist() == [30.0, 60.0]
+    assert aggregated.low.tolist() == [-1.0, 29.0]
+    assert aggregated.close.tolist() == [29.5, 59.5]
+    assert aggregated.volume.tolist() == [30.0, 25.0]
+    assert aggregated.trades_count.tolist() == [60, 50]
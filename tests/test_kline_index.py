@@ -0,0 +1,92 @@
+import numpy as np
+
+from trade.kline_array import KlineArray
+from trade.kline_index import BUCKET_MS, DAY_MS, RollingHighIndex, SymbolHighIndex
+
+MINUTE_MS = 60 * 1000
+START_MS = 1704067200000  # 2024-01-01 00:00 UTC
+
+
+def random_klines(count, interval_ms=BUCKET_MS, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    high = close + rng.uniform(0, 1, count)
+    low = close - rng.uniform(0, 1, count)
+    open_time = START_MS + np.arange(count) * interval_ms
+    return [[int(t), c, h, l, c, 0, int(t) + interval_ms - 1, 0, 0, 0, 0]
+            for t, h, l, c in zip(open_time, high, low, close)]
+
+
+def brute_force_high_low(klines, cutoff_ms):
+    """不含最新一根K线的区间高低点"""
+    window = [k for k in klines[:-1] if k[0] >= cutoff_ms]
+    if not window:
+        return None
+    return max(k[2] for k in window), min(k[3] for k in window)
+
+
+def test_range_high_low_matches_brute_force():
+    klines = random_klines(20 * 48 + 17)
+    index = SymbolHighIndex()
+    for k in klines:
+        index.add(k[0], k[2], k[3], k[4])
+
+    last_ms = klines[-1][0]
+    for cutoff_ms in (last_ms - 7 * DAY_MS, last_ms - 7 * DAY_MS + 5 * MINUTE_MS, START_MS + 3 * BUCKET_MS,
+                      START_MS - DAY_MS):
+        # 起点不在30分钟边界时，索引按所在分桶的下一个边界开始
+        aligned = -(-cutoff_ms // BUCKET_MS) * BUCKET_MS
+        assert index.range_high_low(cutoff_ms) == brute_force_high_low(klines, aligned)
+
+
+def test_latest_kline_is_replaced_not_folded():
+    index = SymbolHighIndex()
+    index.add(START_MS, 10.0, 9.0, 9.5)
+    index.add(START_MS + MINUTE_MS, 11.0, 9.5, 10.0)
+    # 未收盘K线刷新：最高价回落后不应留在区间统计中
+    index.add(START_MS + MINUTE_MS, 10.5, 9.5, 10.2)
+    assert index.last == (START_MS + MINUTE_MS, 10.5, 9.5, 10.2)
+    assert index.range_high_low(START_MS) == (10.0, 9.0)
+
+
+def test_check_breakouts_per_period():
+    index = RollingHighIndex(max_days=30, periods=(7, 15, 30))
+    last_ms = START_MS + 30 * DAY_MS
+    # 20天前的高点只影响30天区间
+    index.add_kline('BTCUSDT', last_ms - 20 * DAY_MS, 200.0, 90.0, 100.0)
+    index.add_kline('BTCUSDT', last_ms - 3 * DAY_MS, 120.0, 90.0, 100.0)
+    index.add_kline('BTCUSDT', last_ms, 150.0, 140.0, 150.0)
+
+    result = index.check_breakouts('BTCUSDT')
+    assert result['current_price'] == 150.0
+    assert result['breakout_periods'] == [7, 15]
+    assert result['breakouts'][30] == {'is_high': False, 'max_high': 200.0, 'min_low': 90.0}
+
+
+def test_window_is_limited_to_max_days_and_prune_expires_buckets():
+    index = RollingHighIndex(max_days=7, periods=(7, 30))
+    last_ms = START_MS + 30 * DAY_MS
+    index.add_kline('BTCUSDT', START_MS, 500.0, 1.0, 100.0)
+    index.add_kline('BTCUSDT', last_ms - DAY_MS, 120.0, 90.0, 100.0)
+    index.add_kline('BTCUSDT', last_ms, 130.0, 125.0, 130.0)
+
+    # 30天区间被截断到max_days，早于窗口的高点不计入
+    assert index.check_breakouts('BTCUSDT')['breakout_periods'] == [7, 30]
+
+    index.prune()
+    symbol_index = index.symbols['BTCUSDT']
+    assert START_MS - START_MS % BUCKET_MS not in symbol_index.buckets
+    assert START_MS - START_MS % DAY_MS not in symbol_index.days
+    assert index.check_breakouts('BTCUSDT')['breakouts'][7]['max_high'] == 120.0
+
+
+def test_add_klines_accepts_kline_array():
+    klines = random_klines(100, interval_ms=MINUTE_MS)
+    from_rows = RollingHighIndex()
+    from_rows.add_klines('BTCUSDT', klines)
+    from_array = RollingHighIndex()
+    from_array.add_klines('BTCUSDT', KlineArray.from_rows(klines))
+
+    assert from_rows.check_breakouts('BTCUSDT') == from_array.check_breakouts('BTCUSDT')
+    assert from_array.get_current_price('BTCUSDT') == klines[-1][4]
+    assert 'ETHUSDT' not in from_array
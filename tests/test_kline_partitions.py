@@ -0,0 +1,120 @@
+from datetime import datetime
+
+import numpy as np
+
+from trade.kline_partitions import (KLINE_COLUMNS, KlinePartitionManager, next_period, partition_definitions,
+                                    partition_name, period_start, to_ms)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.fetch_sizes = []
+        self._rows = []
+
+    def execute(self, query, args=None):
+        self.conn.queries.append(' '.join(query.split()))
+        if 'information_schema.PARTITIONS' in query:
+            self._rows = list(self.conn.partitions)
+        elif query.lstrip().startswith('SELECT'):
+            self._rows = list(self.conn.kline_rows)
+        else:
+            self._rows = []
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, partitions=(), kline_rows=()):
+        self.partitions = partitions
+        self.kline_rows = kline_rows
+        self.queries = []
+        self.cursors = []
+
+    def cursor(self, cursor=None):
+        self.cursors.append(FakeCursor(self))
+        return self.cursors[-1]
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def get_connection(self):
+        return self.conn
+
+
+def kline_row(symbol, open_time):
+    return (symbol, open_time, open_time + 59999, 1.0, 2.0, 0.5, 1.5, 10.0, 15.0, 3, 4.0, 6.0)
+
+
+def test_partition_naming_and_periods():
+    dt = datetime(2024, 1, 31, 15, 30)
+    assert partition_name(period_start(dt, 'day'), 'day') == 'p20240131'
+    assert partition_name(period_start(dt, 'month'), 'month') == 'p202401'
+    assert next_period(period_start(dt, 'day'), 'day') == datetime(2024, 2, 1)
+    assert next_period(datetime(2024, 12, 1), 'month') == datetime(2025, 1, 1)
+
+
+def test_partition_definitions_cover_range_and_end_with_pmax():
+    definitions = partition_definitions('day', datetime(2024, 2, 28, 12), datetime(2024, 3, 2))
+    assert definitions == [
+        f"PARTITION p20240228 VALUES LESS THAN ({to_ms(datetime(2024, 2, 29))})",
+        f"PARTITION p20240229 VALUES LESS THAN ({to_ms(datetime(2024, 3, 1))})",
+        f"PARTITION p20240301 VALUES LESS THAN ({to_ms(datetime(2024, 3, 2))})",
+        "PARTITION pmax VALUES LESS THAN MAXVALUE",
+    ]
+
+
+def test_drop_partitions_before_only_drops_fully_expired(tmp_path):
+    partitions = [
+        ('p20240101', str(to_ms(datetime(2024, 1, 2)))),
+        ('p20240102', str(to_ms(datetime(2024, 1, 3)))),
+        ('p20240103', str(to_ms(datetime(2024, 1, 4)))),
+        ('pmax', 'MAXVALUE'),
+    ]
+    conn = FakeConnection(partitions=partitions)
+    manager = KlinePartitionManager(FakePool(conn), 'test', str(tmp_path))
+
+    # 截止时间落在p20240102中间，该分区仍有需要保留的数据
+    cutoff_ms = to_ms(datetime(2024, 1, 2, 12))
+    assert manager.drop_partitions_before('kline_data_1min', cutoff_ms, archive=False) == 1
+    assert [q for q in conn.queries if 'DROP PARTITION' in q] == [
+        'ALTER TABLE kline_data_1min DROP PARTITION p20240101']
+
+
+def test_archive_partition_reads_in_chunks(tmp_path):
+    rows = [kline_row('BTCUSDT', 1000 + i * 60000) for i in range(5)]
+    conn = FakeConnection(kline_rows=rows)
+    manager = KlinePartitionManager(FakePool(conn), 'test', str(tmp_path))
+
+    assert manager.archive_partition('kline_data_1min', 'p20240101', fetch_size=2) == 5
+    assert conn.cursors[0].fetch_sizes == [2, 2, 2, 2]
+
+    archive = np.load(tmp_path / 'kline_data_1min' / 'p20240101.npz')
+    assert set(archive.files) == set(KLINE_COLUMNS)
+    assert archive['open_time'].dtype == np.int64
+    assert archive['open_time'].tolist() == [row[1] for row in rows]
+    assert archive['symbol'].tolist() == ['BTCUSDT'] * 5
+
+
+def test_archive_empty_partition_writes_nothing(tmp_path):
+    manager = KlinePartitionManager(FakePool(FakeConnection()), 'test', str(tmp_path))
+    assert manager.archive_partition('kline_data_1min', 'p20240101') == 0
+    assert not (tmp_path / 'kline_data_1min' / 'p20240101.npz').exists()
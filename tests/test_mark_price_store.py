@@ -0,0 +1,73 @@
+import sqlite3
+
+import numpy as np
+
+from trade.mark_price_store import MarkPriceChangeFilter, init_settings_table, load_mark_price_series
+
+
+def row(second, mark=100.0, funding=0.0001, symbol='BTCUSDT'):
+    return (second * 1000, symbol, mark, mark, mark, funding, 1700000000000)
+
+
+def write_batch(change_filter, rows):
+    written = [r for r in rows if change_filter.should_write(r)]
+    change_filter.commit()
+    return written
+
+
+def test_filter_writes_changes_and_keyframes():
+    change_filter = MarkPriceChangeFilter(keyframe_seconds=60)
+    rows = [row(0), row(1), row(2, mark=101.0), row(3, mark=101.0), row(62, mark=101.0), row(63, funding=0.0002)]
+    assert write_batch(change_filter, rows) == [rows[0], rows[2], rows[4], rows[5]]
+
+
+def test_filter_tolerance_ignores_small_price_moves():
+    change_filter = MarkPriceChangeFilter(tolerance=0.01)
+    rows = [row(0), row(1, mark=100.5), row(2, mark=101.5)]
+    assert write_batch(change_filter, rows) == [rows[0], rows[2]]
+
+
+def test_filter_tracks_symbols_independently():
+    change_filter = MarkPriceChangeFilter()
+    rows = [row(0), row(0, symbol='ETHUSDT'), row(1), row(1, symbol='ETHUSDT', mark=99.0)]
+    assert write_batch(change_filter, rows) == [rows[0], rows[1], rows[3]]
+
+
+def test_failed_batch_does_not_advance_filter_state():
+    change_filter = MarkPriceChangeFilter()
+    assert write_batch(change_filter, [row(0)]) == [row(0)]
+
+    # 这一批写入失败：价格变化的行不能被当作已写入
+    assert change_filter.should_write(row(1, mark=101.0))
+    change_filter.rollback()
+
+    assert change_filter.should_write(row(2, mark=101.0))
+
+
+def test_load_series_forward_fills_change_records(tmp_path):
+    db_path = str(tmp_path / 'mark_prices.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE binance_mark_prices (
+            event_time INTEGER NOT NULL, symbol TEXT NOT NULL, mark_price REAL NOT NULL, index_price REAL,
+            estimated_settle_price REAL, funding_rate REAL, next_funding_time INTEGER
+        )
+    ''')
+    init_settings_table(conn, keyframe_seconds=5)
+
+    change_filter = MarkPriceChangeFilter(keyframe_seconds=5)
+    marks = [100.0, 100.0, 100.0, 101.0, 101.0, 101.0, 101.0, 101.0, 101.0, 102.0]
+    full = [row(second, mark) for second, mark in enumerate(marks)]
+    written = write_batch(change_filter, full)
+    assert len(written) < len(full)
+    conn.executemany('INSERT INTO binance_mark_prices VALUES (?, ?, ?, ?, ?, ?, ?)', written)
+    conn.commit()
+    conn.close()
+
+    series = load_mark_price_series('BTCUSDT', 0, 9000, db_path=db_path)
+    np.testing.assert_array_equal(series['time'], np.arange(10) * 1000)
+    np.testing.assert_array_equal(series['mark_price'], marks)
+
+    # 超过关键帧间隔没有数据的秒视为中断
+    series = load_mark_price_series('BTCUSDT', 0, 20000, db_path=db_path)
+    assert np.isnan(series['mark_price'][-1])
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from tools import notification_dispatcher
+from tools.notification_dispatcher import NotificationDispatcher
+
+
+class FakeClock:
+    """替换time.time和asyncio.sleep，限速等待不消耗真实时间"""
+
+    def __init__(self, monkeypatch):
+        self.now = 1_700_000_000.0
+        self.slept = []
+        real_sleep = asyncio.sleep
+
+        async def sleep(seconds, *args, **kwargs):
+            self.slept.append(seconds)
+            self.now += seconds
+            await real_sleep(0)
+
+        monkeypatch.setattr(notification_dispatcher.time, 'time', lambda: self.now)
+        monkeypatch.setattr(notification_dispatcher.asyncio, 'sleep', sleep)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    return FakeClock(monkeypatch)
+
+
+def make_dispatcher(monkeypatch, clock, results=None, **kwargs):
+    """_post按results依次返回（默认全部成功），记录发送时间和内容"""
+    dispatcher = NotificationDispatcher(**kwargs)
+    dispatcher.register_channel('wework', 'https://example.invalid/webhook')
+    posts = []
+    results = list(results or [])
+
+    def post(channel, content):
+        posts.append((clock.now, content))
+        return results.pop(0) if results else True
+
+    monkeypatch.setattr(dispatcher, '_post', post)
+    return dispatcher, posts
+
+
+def test_rate_limit_allows_20_messages_per_minute(monkeypatch, clock):
+    dispatcher, posts = make_dispatcher(monkeypatch, clock)
+    channel = dispatcher._channels['wework']
+
+    async def run():
+        for i in range(25):
+            assert await dispatcher._send_with_retry(channel, f"message {i}")
+
+    asyncio.run(run())
+
+    start = posts[0][0]
+    assert all(sent_at == start for sent_at, _ in posts[:20])
+    assert all(sent_at - start >= 60 for sent_at, _ in posts[20:])
+    assert len(channel.sent_times) <= 20
+
+
+def test_backlog_is_merged_and_oversized_notification_carries_over(monkeypatch, clock):
+    dispatcher, posts = make_dispatcher(monkeypatch, clock, max_content_bytes=250)
+    sent_callbacks = []
+
+    async def run():
+        for i in range(3):
+            dispatcher.submit('wework', f"{i}" * 50, description=f"n{i}",
+                              on_success=lambda i=i: sent_callbacks.append(i))
+        await dispatcher.close(timeout=5)
+
+    asyncio.run(run())
+
+    contents = [content for _, content in posts]
+    # 前两条合并为一条汇总，第三条放不下，留到下一条消息发送
+    assert len(contents) == 2
+    assert contents[0].startswith("📦 **2条通知汇总**")
+    assert "0" * 50 in contents[0] and "1" * 50 in contents[0]
+    assert contents[1] == "2" * 50
+    assert sorted(sent_callbacks) == [0, 1, 2]
+    assert dispatcher.stats['sent'] == 3 and dispatcher.stats['digests'] == 1
+    assert dispatcher._channels['wework'].carry is None
+
+
+def test_failed_send_retries_with_backoff(monkeypatch, clock):
+    dispatcher, posts = make_dispatcher(monkeypatch, clock, results=[False, False, False],
+                                        max_retries=2, backoff_seconds=2.0)
+
+    async def run():
+        dispatcher.submit('wework', "alert", description="alert")
+        await dispatcher.close(timeout=5)
+
+    asyncio.run(run())
+
+    assert len(posts) == 3
+    assert [t - posts[0][0] for t, _ in posts] == [0, 2.0, 6.0]
+    assert dispatcher.stats['retries'] == 2 and dispatcher.stats['failed'] == 1
+
+
+def test_full_queue_drops_new_notifications(monkeypatch, clock):
+    dispatcher, posts = make_dispatcher(monkeypatch, clock, max_queue_size=2)
+
+    async def run():
+        results = [dispatcher.submit('wework', f"n{i}") for i in range(3)]
+        await dispatcher.close(timeout=5)
+        return results
+
+    assert asyncio.run(run()) == [True, True, False]
+    assert dispatcher.stats['dropped'] == 1
+
+
+def test_submit_without_event_loop_sends_directly(monkeypatch, clock):
+    dispatcher, posts = make_dispatcher(monkeypatch, clock)
+    sent = []
+    assert dispatcher.submit('wework', "sync", on_success=lambda: sent.append(True))
+    assert [content for _, content in posts] == ["sync"] and sent == [True]
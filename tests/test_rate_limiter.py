@@ -0,0 +1,39 @@
+import pytest
+
+from tools import rate_limiter
+from tools.rate_limiter import WeightRateLimiter
+
+
+class FakeResponse:
+    def __init__(self, headers, status_code=200):
+        self.headers = headers
+        self.status_code = status_code
+
+
+@pytest.fixture
+def frozen_time(monkeypatch):
+    # 固定在窗口中间，测试过程中不会跨窗口
+    now = 1_700_000_000.5
+    monkeypatch.setattr(rate_limiter.time, 'time', lambda: now)
+    return now
+
+
+def test_used_weight_header_calibrates_minute_window(frozen_time):
+    limiter = WeightRateLimiter(max_weight=2400, safety_ratio=0.8)
+    limiter.update_from_response(FakeResponse({'X-MBX-USED-WEIGHT-1M': '1919'}))
+    assert limiter._reserve(1) == 0
+    assert limiter._reserve(1) > 0
+
+
+def test_per_second_limiter_ignores_minute_weight_header(frozen_time):
+    limiter = WeightRateLimiter(max_weight=10, safety_ratio=1.0, window_seconds=1, header_name=None)
+    limiter.update_from_response(FakeResponse({'X-MBX-USED-WEIGHT-1M': '1200'}))
+
+    assert [limiter._reserve(1) for _ in range(10)] == [0.0] * 10
+    assert limiter._reserve(1) > 0
+
+
+def test_rate_limit_status_blocks_until_retry_after(frozen_time):
+    limiter = WeightRateLimiter(header_name=None)
+    limiter.update_from_response(FakeResponse({'Retry-After': '3'}, status_code=429))
+    assert limiter._reserve(1) == pytest.approx(3)
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from tools.ttl_cache import TTLCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = TTLCache(str(tmp_path / 'cache.sqlite3'), 'products', ttl_seconds=60)
+    yield cache
+    cache.close()
+
+
+def test_get_returns_value_and_freshness(cache):
+    assert cache.get('BTCUSDT') is None
+    cache.set('BTCUSDT', ['pow'])
+    assert cache.get('BTCUSDT') == (['pow'], True)
+
+
+def test_stale_entries_are_still_readable(tmp_path, monkeypatch):
+    cache = TTLCache(str(tmp_path / 'cache.sqlite3'), 'products', ttl_seconds=60)
+    cache.set_many({'BTCUSDT': ['pow'], 'ETHUSDT': ['pos']})
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+    cache.set('ETHUSDT', ['pos', 'layer1'])
+
+    assert cache.get('BTCUSDT') == (['pow'], False)
+    data, stale_keys = cache.load_all()
+    assert data == {'BTCUSDT': ['pow'], 'ETHUSDT': ['pos', 'layer1']}
+    assert stale_keys == {'BTCUSDT'}
+    cache.close()
+
+
+def test_delete_missing_only_touches_own_namespace(tmp_path):
+    db_path = str(tmp_path / 'cache.sqlite3')
+    products = TTLCache(db_path, 'products', ttl_seconds=60)
+    descriptions = TTLCache(db_path, 'symbol_description', ttl_seconds=60)
+    products.set_many({'BTCUSDT': [], 'LUNAUSDT': []})
+    descriptions.set_many({'BTC': 'Bitcoin', 'LUNA': 'Terra'})
+
+    products.delete_missing({'BTCUSDT': []})
+
+    assert products.load_all() == ({'BTCUSDT': []}, set())
+    assert descriptions.load_all()[0] == {'BTC': 'Bitcoin', 'LUNA': 'Terra'}
+    products.close()
+    descriptions.close()
+
+
+def test_cache_is_shared_between_instances(tmp_path):
+    db_path = str(tmp_path / 'cache.sqlite3')
+    writer = TTLCache(db_path, 'products', ttl_seconds=60)
+    writer.set('BTCUSDT', ['pow'])
+    reader = TTLCache(db_path, 'products', ttl_seconds=60)
+    assert reader.get('BTCUSDT') == (['pow'], True)
+    writer.close()
+    reader.close()
@@ -0,0 +1,250 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+
+from tools.logger import logger
+
+
+class PooledConnection:
+    """
+    连接池借出的连接
+
+    用法与 pymysql 连接一致，close() 时归还连接池而不是真正断开；
+    长时间未使用的连接在创建游标前会先 ping，断线时自动重连。
+    """
+
+    def __init__(self, pool: 'MySQLConnectionPool', conn, last_used: float):
+        self._pool = pool
+        self._conn = conn
+        self._last_used = last_used
+        self._released = False
+
+    def cursor(self, cursor=None):
+        if self._released:
+            raise pymysql.err.InterfaceError("连接已归还连接池")
+        if time.time() - self._last_used > self._pool.ping_interval:
+            self._pool._ensure_alive(self)
+        self._last_used = time.time()
+        return self._conn.cursor(self._pool._counting_cursor_class(cursor or self._conn.cursorclass))
+
+    def close(self):
+        """归还连接池"""
+        if not self._released:
+            self._released = True
+            self._pool._release(self._conn)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self):
+        # 调用方异常路径未关闭时，回收时丢弃底层连接，避免占用名额
+        if not getattr(self, '_released', True):
+            self._released = True
+            self._pool._release(self._conn, broken=True)
+
+
+class MySQLConnectionPool:
+    """线程安全的MySQL连接池"""
+
+    def __init__(self, mysql_config: dict, max_size: int = 10, max_overflow: int = 10,
+                 ping_interval: float = 30, max_idle_seconds: float = 600, checkout_timeout: float = 30):
+        """
+        Args:
+            mysql_config: pymysql.connect 参数
+            max_size: 连接池保留的最大空闲连接数
+            max_overflow: 超出max_size后允许临时创建的连接数
+            ping_interval: 连接空闲超过该秒数后，使用前先做健康检查
+            max_idle_seconds: 空闲超过该秒数的连接直接丢弃
+            checkout_timeout: 连接耗尽时等待的最长秒数
+        """
+        self.mysql_config = dict(mysql_config)
+        self.max_size = max_size
+        self.max_overflow = max_overflow
+        self.ping_interval = ping_interval
+        self.max_idle_seconds = max_idle_seconds
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = []  # [(conn, last_used)]
+        self._in_use = 0
+        self._cond = threading.Condition(threading.Lock())
+
+        self._stats = {
+            'created': 0,
+            'checkouts': 0,
+            'reused': 0,
+            'reconnects': 0,
+            'discarded': 0,
+            'waits': 0,
+            'queries': 0,
+        }
+        # {游标类: 统计查询次数的子类}
+        self._cursor_classes = {}
+
+    def _counting_cursor_class(self, cursor_class):
+        """返回cursor_class的子类，每次execute（包括executemany拆分出的每条语句）计入queries"""
+        counting_class = self._cursor_classes.get(cursor_class)
+        if counting_class is None:
+            pool = self
+
+            class CountingCursor(cursor_class):
+                def execute(self, query, args=None):
+                    with pool._cond:
+                        pool._stats['queries'] += 1
+                    return super().execute(query, args)
+
+            counting_class = self._cursor_classes[cursor_class] = CountingCursor
+        return counting_class
+
+    def _connect(self):
+        conn = pymysql.connect(**self.mysql_config)
+        with self._cond:
+            self._stats['created'] += 1
+        return conn
+
+    def get_connection(self) -> PooledConnection:
+        """借出一个连接（连接耗尽时阻塞等待）"""
+        deadline = time.time() + self.checkout_timeout
+        with self._cond:
+            while True:
+                now = time.time()
+                # 丢弃空闲过久的连接
+                while self._idle and now - self._idle[0][1] > self.max_idle_seconds:
+                    stale, _ = self._idle.pop(0)
+                    self._close_quietly(stale)
+                    self._stats['discarded'] += 1
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    self._in_use += 1
+                    self._stats['checkouts'] += 1
+                    self._stats['reused'] += 1
+                    break
+
+                if self._in_use < self.max_size + self.max_overflow:
+                    self._in_use += 1
+                    self._stats['checkouts'] += 1
+                    conn, last_used = None, now
+                    break
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise pymysql.err.OperationalError(
+                        f"等待数据库连接超时（使用中{self._in_use}个）")
+                self._stats['waits'] += 1
+                self._cond.wait(remaining)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+
+        pooled = PooledConnection(self, conn, last_used)
+        if time.time() - last_used > self.ping_interval:
+            self._ensure_alive(pooled)
+        return pooled
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ..."""
+        conn = self.get_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _ensure_alive(self, pooled: PooledConnection):
+        """健康检查，失败时重建底层连接"""
+        try:
+            pooled._conn.ping(reconnect=False)
+        except Exception as e:
+            logger.warning(f"数据库连接失效，重新连接: {str(e)}")
+            self._close_quietly(pooled._conn)
+            pooled._conn = self._connect()
+            with self._cond:
+                self._stats['reconnects'] += 1
+        pooled._last_used = time.time()
+
+    def _release(self, conn, broken: bool = False):
+        """归还连接，结束未提交的事务以便下次使用时读取最新快照"""
+        if not broken:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+
+        with self._cond:
+            self._in_use -= 1
+            if not broken and len(self._idle) < self.max_size:
+                self._idle.append((conn, time.time()))
+                conn = None
+            else:
+                self._stats['discarded'] += 1
+            self._cond.notify()
+
+        if conn is not None:
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        """关闭所有空闲连接（连接池仍可继续使用）"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> dict:
+        """返回连接池统计信息"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['in_use'] = self._in_use
+            stats['idle'] = len(self._idle)
+        return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _config_key(mysql_config: dict) -> tuple:
+    return tuple(sorted((key, repr(value)) for key, value in mysql_config.items()))
+
+
+def get_pool(mysql_config: dict, **pool_kwargs) -> MySQLConnectionPool:
+    """
+    获取进程内共享的连接池（相同连接参数共用一个池）
+
+    Args:
+        mysql_config: pymysql.connect 参数
+        pool_kwargs: 首次创建连接池时使用的参数，参见 MySQLConnectionPool
+    """
+    key = _config_key(mysql_config)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = MySQLConnectionPool(mysql_config, **pool_kwargs)
+        return pool
+
+
+def get_connection(mysql_config: dict) -> PooledConnection:
+    """从共享连接池借出一个连接，用完调用 close() 归还"""
+    return get_pool(mysql_config).get_connection()
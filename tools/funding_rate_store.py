@@ -0,0 +1,200 @@
+"""
+资金费率历史仓库
+
+按 (交易所, 交易对, 结算时间) 在本地SQLite中保存各交易所的历史资金费率，供套利监控、理财扫描和合约扫描共用：
+1. sync() 只请求本地最后一次结算之后的新数据；查询窗口早于已同步范围时补齐更早的部分
+2. 距上次结算不足一个结算周期时不发请求
+3. load() 以NumPy数组返回任意时间窗口的数据
+
+交易对统一为 ETHUSDT 格式，资金费率保存交易所返回的原始小数（不是百分比）。
+fetch 函数负责请求交易所并返回完整的时间范围（需要时自行分页），失败时应抛出异常，
+这样失败的范围不会被记录为已同步。
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from tools.logger import logger
+
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'trade', 'cache',
+                       'funding_rate_history.sqlite3')
+
+HOUR_MS = 60 * 60 * 1000
+
+# fetch(开始毫秒, 结束毫秒) -> [{'fundingTime': 毫秒, 'fundingRate': 原始小数, 'markPrice': 可选}]
+FundingFetcher = Callable[[int, int], List[Dict]]
+
+
+def normalize_symbol(symbol: str) -> str:
+    """ETH/USDT:USDT、ETH_USDT、ETH-USDT-SWAP 统一为 ETHUSDT"""
+    return symbol.split(':')[0].replace('-SWAP', '').replace('/', '').replace('_', '').replace('-', '')
+
+
+class FundingRateStore:
+    """基于SQLite的资金费率历史仓库（线程安全，多个进程可共用同一个文件）"""
+
+    def __init__(self, db_path: str = DB_PATH, busy_timeout: float = 30, max_stale_hours: float = 4,
+                 default_interval_hours: float = 8):
+        """
+        :param db_path: SQLite数据库文件路径
+        :param busy_timeout: 其他进程写入时等待锁的最长秒数
+        :param max_stale_hours: 距上次同步超过该小时数时，即使未到下一次结算也重新检查（结算周期可能被交易所缩短）
+        :param default_interval_hours: 数据不足两条时使用的结算周期
+        """
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.max_stale_ms = int(max_stale_hours * HOUR_MS)
+        self.default_interval_hours = default_interval_hours
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=busy_timeout, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS funding_rate_history (
+                exchange TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                funding_time INTEGER NOT NULL,
+                funding_rate REAL NOT NULL,
+                mark_price REAL,
+                PRIMARY KEY (exchange, symbol, funding_time)
+            )
+        ''')
+        # 每个交易对已同步的时间范围（没有结算的时段也记录，避免重复请求）
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS funding_rate_sync (
+                exchange TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                synced_from INTEGER NOT NULL,
+                synced_to INTEGER NOT NULL,
+                PRIMARY KEY (exchange, symbol)
+            )
+        ''')
+        self._conn.commit()
+        self.stats = {'requests': 0, 'skipped': 0, 'rows': 0, 'errors': 0}
+
+    def _sync_state(self, exchange: str, symbol: str):
+        """返回 (synced_from, synced_to, 最后结算时间, 结算周期毫秒)，没有同步过时返回None"""
+        with self._lock:
+            state = self._conn.execute(
+                'SELECT synced_from, synced_to FROM funding_rate_sync WHERE exchange = ? AND symbol = ?',
+                (exchange, symbol)).fetchone()
+            if state is None:
+                return None
+            times = [row[0] for row in self._conn.execute('''
+                SELECT funding_time FROM funding_rate_history WHERE exchange = ? AND symbol = ?
+                ORDER BY funding_time DESC LIMIT 2
+            ''', (exchange, symbol))]
+        last_time = times[0] if times else None
+        interval = times[0] - times[1] if len(times) == 2 else int(self.default_interval_hours * HOUR_MS)
+        return state[0], state[1], last_time, interval
+
+    def sync(self, exchange: str, symbol: str, fetch: FundingFetcher, since_ms: int,
+             now_ms: Optional[int] = None) -> int:
+        """
+        增量同步一个交易对的资金费率，返回新增的结算条数
+        :param fetch: 请求交易所的函数，见 FundingFetcher
+        :param since_ms: 需要的数据窗口开始时间（毫秒）
+        """
+        symbol = normalize_symbol(symbol)
+        now_ms = now_ms or int(time.time() * 1000)
+        state = self._sync_state(exchange, symbol)
+
+        ranges = []
+        if state is None:
+            ranges.append((since_ms, now_ms))
+        else:
+            synced_from, synced_to, last_time, interval = state
+            if since_ms < synced_from:
+                # 已同步范围包含synced_from本身
+                ranges.append((since_ms, synced_from - 1))
+            start = last_time + 1 if last_time else synced_to
+            next_due = synced_to + self.max_stale_ms
+            if last_time:
+                next_due = min(next_due, last_time + interval)
+            if now_ms >= next_due:
+                ranges.append((start, now_ms))
+
+        if not ranges:
+            with self._lock:
+                self.stats['skipped'] += 1
+            return 0
+
+        added = 0
+        for start, end in ranges:
+            try:
+                rows = fetch(start, end)
+            except Exception as e:
+                with self._lock:
+                    self.stats['errors'] += 1
+                logger.error(f"同步{exchange} {symbol}资金费率失败: {str(e)}")
+                return added
+            added += self.append(exchange, symbol, rows, start, end)
+        return added
+
+    def append(self, exchange: str, symbol: str, rows: List[Dict], synced_from: int, synced_to: int) -> int:
+        """保存一次请求的结果，并把 [synced_from, synced_to] 记录为已同步，返回保存的条数"""
+        symbol = normalize_symbol(symbol)
+        values = [(exchange, symbol, int(row['fundingTime']), float(row['fundingRate']),
+                   float(row['markPrice']) if row.get('markPrice') not in (None, '') else None)
+                  for row in rows if row.get('fundingRate') not in (None, '')]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany('''
+                    INSERT OR REPLACE INTO funding_rate_history (exchange, symbol, funding_time, funding_rate, mark_price)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', values)
+                self._conn.execute('''
+                    INSERT INTO funding_rate_sync (exchange, symbol, synced_from, synced_to) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(exchange, symbol) DO UPDATE SET
+                        synced_from = MIN(synced_from, excluded.synced_from),
+                        synced_to = MAX(synced_to, excluded.synced_to)
+                ''', (exchange, symbol, synced_from, synced_to))
+            self.stats['requests'] += 1
+            self.stats['rows'] += len(values)
+        return len(values)
+
+    def load(self, exchange: str, symbol: str, start_ms: int, end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        读取时间窗口内的资金费率，按结算时间升序
+        :return: {'funding_time': int64毫秒, 'funding_rate': float64原始小数, 'mark_price': float64（没有时为NaN）}
+        """
+        end_ms = end_ms if end_ms is not None else int(time.time() * 1000)
+        with self._lock:
+            rows = self._conn.execute('''
+                SELECT funding_time, funding_rate, mark_price FROM funding_rate_history
+                WHERE exchange = ? AND symbol = ? AND funding_time >= ? AND funding_time <= ?
+                ORDER BY funding_time
+            ''', (exchange, normalize_symbol(symbol), start_ms, end_ms)).fetchall()
+        return {
+            'funding_time': np.array([row[0] for row in rows], dtype=np.int64),
+            'funding_rate': np.array([row[1] for row in rows], dtype=np.float64),
+            'mark_price': np.array([np.nan if row[2] is None else row[2] for row in rows], dtype=np.float64),
+        }
+
+    def history(self, exchange: str, symbol: str, fetch: FundingFetcher, start_ms: int,
+                end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """先增量同步再读取，见 sync() 和 load()"""
+        self.sync(exchange, symbol, fetch, start_ms)
+        return self.load(exchange, symbol, start_ms, end_ms)
+
+    def interval_hours(self, exchange: str, symbol: str) -> float:
+        """根据最近两次结算计算结算周期（小时）"""
+        state = self._sync_state(exchange, normalize_symbol(symbol))
+        if state is None or state[2] is None:
+            return float(self.default_interval_hours)
+        return state[3] / HOUR_MS
+
+    def log_stats(self):
+        """输出同步统计并重置"""
+        logger.info(f"💾 资金费率仓库: 请求 {self.stats['requests']} 次, 本地已是最新跳过 {self.stats['skipped']} 次, "
+                    f"保存 {self.stats['rows']} 条, 失败 {self.stats['errors']} 次")
+        self.stats = {'requests': 0, 'skipped': 0, 'rows': 0, 'errors': 0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,140 @@
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from tools.logger import logger
+
+
+class PooledHTTPSession:
+    """
+    按主机划分的长连接会话
+
+    每个主机（api.binance.com、api.gateio.ws ...）使用独立的 requests.Session 和连接池，
+    同一主机的请求复用已建立的TLS连接（经过代理时尤其明显）。接口与 requests.Session
+    的 get/post/request 一致，并提供：
+    1. 默认超时（调用方未指定timeout时使用）
+    2. 连接错误和 429/5xx 按指数退避重试（只重试GET等幂等请求）
+    3. 每个主机的请求数、新建连接数、连接复用数和耗时统计
+    线程安全，可在线程池中并发使用。
+    """
+
+    def __init__(self, headers: Optional[dict] = None, proxies: Optional[dict] = None, pool_size: int = 10,
+                 timeout=(5, 20), max_retries: int = 3, backoff_factor: float = 0.5,
+                 status_forcelist=(429, 500, 502, 503, 504)):
+        """
+        Args:
+            headers: 所有请求共用的请求头
+            proxies: 代理配置
+            pool_size: 每个主机保持的最大连接数
+            timeout: 默认超时（秒），可以是 (连接超时, 读取超时)
+            max_retries: 最大重试次数
+            backoff_factor: 退避系数，第n次重试前等待 backoff_factor * 2^(n-1) 秒
+            status_forcelist: 需要重试的HTTP状态码
+        """
+        self.headers = requests.structures.CaseInsensitiveDict(headers or {})
+        self.proxies = dict(proxies or {})
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retry = Retry(total=max_retries, backoff_factor=backoff_factor, status_forcelist=status_forcelist,
+                           raise_on_status=False, respect_retry_after_header=True)
+
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        # {主机: {'requests', 'errors', 'seconds', 'max_seconds'}}
+        self._latency: Dict[str, Dict[str, float]] = {}
+
+    def _session_for(self, host: str) -> requests.Session:
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    session.headers.update(self.headers)
+                    session.proxies.update(self.proxies)
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=self.retry)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._sessions[host] = session
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        host = urlsplit(url).netloc
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self._session_for(host).request(method, url, **kwargs)
+            failed = False
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stats = self._latency.setdefault(host, {'requests': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+                stats['requests'] += 1
+                stats['errors'] += failed
+                stats['seconds'] += elapsed
+                stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    @staticmethod
+    def _connection_counts(session: requests.Session):
+        """从urllib3连接池统计 (新建连接数, 发出的请求数)，包括经过代理的连接池"""
+        created = sent = 0
+        for adapter in set(session.adapters.values()):
+            managers = [adapter.poolmanager] + list(adapter.proxy_manager.values())
+            for manager in managers:
+                if manager is None:
+                    continue
+                for key in list(manager.pools.keys()):
+                    pool = manager.pools.get(key)
+                    if pool is not None:
+                        created += pool.num_connections
+                        sent += pool.num_requests
+        return created, sent
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """每个主机的请求数、错误数、新建连接数、复用次数、平均/最大耗时"""
+        with self._lock:
+            latency = {host: dict(stats) for host, stats in self._latency.items()}
+            sessions = dict(self._sessions)
+
+        result = {}
+        for host, stats in latency.items():
+            created, sent = self._connection_counts(sessions[host]) if host in sessions else (0, 0)
+            result[host] = {
+                'requests': stats['requests'],
+                'errors': stats['errors'],
+                'connections': created,
+                'reused': max(0, sent - created),
+                'avg_ms': round(stats['seconds'] / stats['requests'] * 1000, 1) if stats['requests'] else 0,
+                'max_ms': round(stats['max_seconds'] * 1000, 1),
+            }
+        return result
+
+    def log_stats(self):
+        """输出各主机的连接复用和耗时统计"""
+        stats = self.stats()
+        if not stats:
+            return
+        lines = ["🌐 HTTP连接统计:"]
+        for host, item in sorted(stats.items(), key=lambda x: x[1]['requests'], reverse=True):
+            lines.append(f"  {host}: 请求 {item['requests']} 次, 失败 {item['errors']} 次, 新建连接 {item['connections']} 个, "
+                         f"复用 {item['reused']} 次, 平均 {item['avg_ms']}ms, 最大 {item['max_ms']}ms")
+        logger.info("\n".join(lines))
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
@@ -0,0 +1,242 @@
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+import requests
+
+from tools.logger import logger
+
+# 企业微信markdown消息内容最大长度（字节）
+WEWORK_MAX_CONTENT_BYTES = 4096
+
+
+class _Notification:
+    __slots__ = ('content', 'description', 'on_success')
+
+    def __init__(self, content: str, description: str, on_success: Optional[Callable[[], None]]):
+        self.content = content
+        self.description = description
+        self.on_success = on_success
+
+
+class _Channel:
+    """单个webhook通道：有界队列 + 发送时间窗口"""
+
+    def __init__(self, name: str, webhook_url: str, proxies: Optional[dict], rate_limit_per_minute: int,
+                 max_queue_size: int):
+        self.name = name
+        self.webhook_url = webhook_url
+        self.proxies = proxies
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.sent_times = deque()
+        # 上一批放不下、留到下一批发送的通知
+        self.carry: Optional[_Notification] = None
+        self.worker: Optional[asyncio.Task] = None
+
+
+class NotificationDispatcher:
+    """
+    后台异步通知分发器（企业微信群机器人）
+
+    调用方只把消息放入有界队列，立即返回；每个通道一个后台协程负责发送：
+    1. 按通道限速（企业微信机器人每分钟最多20条）
+    2. 队列中积压多条消息时合并为一条汇总消息发送
+    3. 发送失败按指数退避重试
+    4. 发送成功后在线程中执行回调（如保存通知文件），不阻塞事件循环
+    """
+
+    def __init__(self, max_queue_size: int = 1000, max_retries: int = 3, backoff_seconds: float = 2.0,
+                 timeout: float = 10, max_content_bytes: int = WEWORK_MAX_CONTENT_BYTES):
+        """
+        Args:
+            max_queue_size: 每个通道队列的最大长度，队列满时丢弃新消息
+            max_retries: 发送失败后的最大重试次数
+            backoff_seconds: 首次重试前等待的秒数，之后每次翻倍
+            timeout: 单次请求超时（秒）
+            max_content_bytes: 合并消息的最大字节数
+        """
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.max_content_bytes = max_content_bytes
+
+        self._channels: Dict[str, _Channel] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.stats = {'queued': 0, 'sent': 0, 'digests': 0, 'retries': 0, 'failed': 0, 'dropped': 0}
+
+    def register_channel(self, name: str, webhook_url: str, proxies: Optional[dict] = None,
+                         rate_limit_per_minute: int = 20):
+        """注册一个webhook通道"""
+        self._channels[name] = _Channel(name, webhook_url, proxies, rate_limit_per_minute, self.max_queue_size)
+
+    def submit(self, channel: str, content: str, description: str = '',
+               on_success: Optional[Callable[[], None]] = None) -> bool:
+        """
+        提交一条通知（不等待发送）
+
+        可在事件循环内或其他线程中调用；没有运行中的事件循环时直接同步发送。
+
+        Args:
+            channel: 通道名称
+            content: markdown消息内容
+            description: 日志中显示的通知描述
+            on_success: 发送成功后在线程中执行的回调
+
+        Returns:
+            bool: 是否已放入队列（或同步发送成功）
+        """
+        notification = _Notification(content, description, on_success)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is not None:
+            self._loop = loop
+            return self._enqueue(channel, notification)
+
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._enqueue, channel, notification)
+            return True
+
+        # 没有事件循环（同步脚本调用），退化为直接发送
+        channel_obj = self._channels[channel]
+        if self._post(channel_obj, content):
+            self.stats['sent'] += 1
+            if on_success:
+                on_success()
+            return True
+        self.stats['failed'] += 1
+        return False
+
+    def _enqueue(self, channel: str, notification: _Notification) -> bool:
+        channel_obj = self._channels[channel]
+        if channel_obj.worker is None or channel_obj.worker.done():
+            channel_obj.worker = asyncio.get_running_loop().create_task(self._run_channel(channel_obj))
+
+        try:
+            channel_obj.queue.put_nowait(notification)
+            self.stats['queued'] += 1
+            return True
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            logger.warning(f"通知队列已满({self.max_queue_size})，丢弃通知: {notification.description}")
+            return False
+
+    def _take_batch(self, channel: _Channel, first: _Notification) -> list:
+        """从队列中取出可以合并到一条消息中的通知"""
+        batch = [first]
+        size = len(first.content.encode('utf-8'))
+        while not channel.queue.empty():
+            notification = channel.queue.get_nowait()
+            notification_size = len(notification.content.encode('utf-8')) + 64
+            if size + notification_size > self.max_content_bytes:
+                channel.carry = notification
+                break
+            batch.append(notification)
+            size += notification_size
+        return batch
+
+    @staticmethod
+    def _build_digest(batch: list) -> str:
+        header = f"📦 **{len(batch)}条通知汇总**"
+        return "\n\n".join([header] + [notification.content for notification in batch])
+
+    async def _wait_for_rate_limit(self, channel: _Channel):
+        """等待到通道的分钟发送配额可用"""
+        while True:
+            now = time.time()
+            while channel.sent_times and now - channel.sent_times[0] >= 60:
+                channel.sent_times.popleft()
+            if len(channel.sent_times) < channel.rate_limit_per_minute:
+                return
+            await asyncio.sleep(60 - (now - channel.sent_times[0]) + 0.1)
+
+    def _post(self, channel: _Channel, content: str) -> bool:
+        """发送一条markdown消息，返回是否成功"""
+        payload = {
+            "msgtype": "markdown",
+            "markdown": {
+                "content": content
+            }
+        }
+        response = requests.post(channel.webhook_url, json=payload, proxies=channel.proxies, timeout=self.timeout)
+        if response.status_code != 200:
+            logger.error(f"❌ 发送通知失败，状态码: {response.status_code}")
+            return False
+        result = response.json()
+        if result.get('errcode') != 0:
+            logger.error(f"❌ 发送通知失败: {result}")
+            return False
+        return True
+
+    async def _send_with_retry(self, channel: _Channel, content: str) -> bool:
+        delay = self.backoff_seconds
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_rate_limit(channel)
+            channel.sent_times.append(time.time())
+            try:
+                if await asyncio.to_thread(self._post, channel, content):
+                    return True
+            except Exception as e:
+                logger.error(f"❌ 发送通知异常: {str(e)}")
+
+            if attempt < self.max_retries:
+                self.stats['retries'] += 1
+                await asyncio.sleep(delay)
+                delay *= 2
+        return False
+
+    async def _run_channel(self, channel: _Channel):
+        """通道后台发送协程"""
+        while True:
+            if channel.carry is not None:
+                first, channel.carry = channel.carry, None
+            else:
+                first = await channel.queue.get()
+            # 先等到有发送配额再取批次，限速期间积压的通知会合并为一条
+            await self._wait_for_rate_limit(channel)
+            batch = self._take_batch(channel, first)
+            try:
+                content = first.content if len(batch) == 1 else self._build_digest(batch)
+                descriptions = ', '.join(notification.description for notification in batch)
+
+                if await self._send_with_retry(channel, content):
+                    self.stats['sent'] += len(batch)
+                    if len(batch) > 1:
+                        self.stats['digests'] += 1
+                        logger.info(f"✅ 成功发送{len(batch)}条合并通知到企业微信群: {descriptions}")
+                    else:
+                        logger.info(f"✅ 成功发送{descriptions}到企业微信群")
+
+                    for notification in batch:
+                        if notification.on_success:
+                            try:
+                                await asyncio.to_thread(notification.on_success)
+                            except Exception as e:
+                                logger.error(f"通知发送后回调失败: {str(e)}")
+                else:
+                    self.stats['failed'] += len(batch)
+                    logger.error(f"❌ 重试{self.max_retries}次后仍发送失败: {descriptions}")
+            finally:
+                for _ in batch:
+                    channel.queue.task_done()
+
+    async def close(self, timeout: float = 30):
+        """等待队列中的通知发送完成（最多timeout秒），然后停止后台协程"""
+        workers = [channel for channel in self._channels.values() if channel.worker and not channel.worker.done()]
+        if workers:
+            try:
+                await asyncio.wait_for(asyncio.gather(*(channel.queue.join() for channel in workers)), timeout)
+            except asyncio.TimeoutError:
+                pending = sum(channel.queue.qsize() + (channel.carry is not None) for channel in workers)
+                logger.warning(f"等待通知发送超时，{pending}条通知未发送")
+            for channel in workers:
+                channel.worker.cancel()
+
+        logger.info(f"📨 通知分发统计: {self.stats}")
@@ -0,0 +1,158 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+from tools.logger import logger
+
+# 共享内存文件（Linux下位于 /dev/shm，不落盘）
+SNAPSHOT_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+SNAPSHOT_PATH = os.path.join(SNAPSHOT_DIR, 'binance_premium_index.snapshot')
+SNAPSHOT_SIZE = 4 * 1024 * 1024
+
+# 头部: 序号（写入过程中为奇数）、更新时间（秒）、数据长度
+_HEADER = struct.Struct('<QdI')
+
+# 快照超过该秒数未更新视为过期，调用方应改用REST
+DEFAULT_MAX_AGE_SECONDS = 5
+
+
+class PremiumIndexPublisher:
+    """
+    Binance全市场标记价格/资金费率的最新值快照（写入端）
+
+    由 trade/binance_websocket.py 在收到 !markPrice@arr@1s 推送后更新，
+    以JSON写入共享内存文件，其他进程通过 get_premium_index 读取。
+    使用序号锁（seqlock）：写入前后各递增一次序号，读取方发现序号变化或为奇数时重读。
+    """
+
+    def __init__(self, path: str = SNAPSHOT_PATH, size: int = SNAPSHOT_SIZE):
+        self.path = path
+        self.size = size
+        # {symbol: 与REST premiumIndex接口相同字段的最新值}
+        self.latest: Dict[str, Dict[str, Any]] = {}
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        # 接着上次进程的序号继续递增，避免读取方把新快照当成已缓存的旧快照
+        seq = struct.unpack_from('<Q', self._mm, 0)[0]
+        self._seq = seq + seq % 2
+
+    def update(self, data_list: list):
+        """合并一条markPriceUpdate数组推送并发布快照"""
+        for item in data_list:
+            symbol = item.get('s')
+            if not symbol:
+                continue
+            self.latest[symbol] = {
+                'symbol': symbol,
+                'markPrice': item.get('p'),
+                'indexPrice': item.get('i'),
+                'estimatedSettlePrice': item.get('P'),
+                'lastFundingRate': item.get('r'),
+                'nextFundingTime': item.get('T'),
+                'time': item.get('E'),
+            }
+        self.publish()
+
+    def publish(self):
+        payload = json.dumps(self.latest, separators=(',', ':')).encode('utf-8')
+        if _HEADER.size + len(payload) > self.size:
+            logger.error(f"标记价格快照过大({len(payload)}字节)，未发布")
+            return
+
+        # 序号置为奇数表示正在写入
+        self._seq += 1
+        self._mm[0:8] = struct.pack('<Q', self._seq)
+        self._mm[_HEADER.size:_HEADER.size + len(payload)] = payload
+        self._seq += 1
+        self._mm[0:_HEADER.size] = _HEADER.pack(self._seq, time.time(), len(payload))
+
+    def close(self):
+        """停止发布（保留文件，读取方会因为更新时间过期而回退到REST）"""
+        self._mm.close()
+
+
+class _SnapshotReader:
+    """快照读取端（按序号缓存解析结果，快照未变化时直接返回）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._retry_at = 0.0
+        self._cached_seq = None
+        self._cached: Dict[str, Dict[str, Any]] = {}
+
+    def _open(self) -> bool:
+        if self._mm is not None:
+            return True
+        # 文件不存在（行情进程未运行）时，10秒内不再尝试
+        if time.time() < self._retry_at:
+            return False
+        try:
+            with open(self.path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return True
+        except (OSError, ValueError):
+            self._retry_at = time.time() + 10
+            return False
+
+    def read(self, max_age: float) -> Optional[Dict[str, Dict[str, Any]]]:
+        """返回 {symbol: 最新值}，快照不存在或过期时返回None"""
+        if not self._open():
+            return None
+
+        for _ in range(10):
+            seq, updated_at, length = _HEADER.unpack_from(self._mm, 0)
+            if seq == 0 or time.time() - updated_at > max_age:
+                # 行情进程可能已停止或重建了文件，稍后重新打开
+                self._mm.close()
+                self._mm = None
+                self._retry_at = time.time() + 10
+                return None
+            if seq % 2:
+                continue
+            if seq == self._cached_seq:
+                return self._cached
+
+            payload = self._mm[_HEADER.size:_HEADER.size + length]
+            if struct.unpack_from('<Q', self._mm, 0)[0] != seq:
+                continue
+            try:
+                self._cached = json.loads(payload)
+            except ValueError:
+                continue
+            self._cached_seq = seq
+            return self._cached
+        return None
+
+
+_reader = _SnapshotReader(SNAPSHOT_PATH)
+
+
+def get_premium_index(symbol: Optional[str] = None, max_age: float = DEFAULT_MAX_AGE_SECONDS):
+    """
+    从本机快照读取Binance合约的标记价格和资金费率（字段与REST接口 /fapi/v1/premiumIndex 相同，数值可能为字符串）
+
+    Args:
+        symbol: 交易对，None表示返回全部
+        max_age: 快照允许的最大延迟（秒）
+
+    Returns:
+        指定symbol时返回该交易对的字典，否则返回 {symbol: 字典}；
+        快照不可用、过期或没有该交易对时返回None，调用方应回退到REST
+    """
+    snapshot = _reader.read(max_age)
+    if snapshot is None:
+        return None
+    if symbol is None:
+        return snapshot
+    return snapshot.get(symbol)
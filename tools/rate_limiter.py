@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from tools.logger import logger
+
+
+class WeightRateLimiter:
+    """
+    基于请求权重的限速器（Binance IP权重限制）
+
+    本地按分钟窗口累计已申请的权重，并用响应头 X-MBX-USED-WEIGHT-1M 校准
+    服务端实际使用量；超过安全阈值时等待到下一个分钟窗口。线程安全，
+    可同时用于协程（acquire）和线程（acquire_sync）。
+    """
+
+    def __init__(self, max_weight: int = 2400, safety_ratio: float = 0.8, window_seconds: int = 60,
+                 header_name: Optional[str] = 'X-MBX-USED-WEIGHT-1M'):
+        """
+        Args:
+            max_weight: 每个窗口允许的最大权重（Binance合约为2400/分钟）
+            safety_ratio: 安全比例，使用量达到 max_weight * safety_ratio 时开始等待
+            window_seconds: 权重窗口长度（秒）
+            header_name: 返回已用权重的响应头，None表示不读取（窗口与响应头的统计周期不一致时）
+        """
+        self.max_weight = max_weight
+        self.limit = int(max_weight * safety_ratio)
+        self.window_seconds = window_seconds
+        self.header_name = header_name
+
+        self._lock = threading.Lock()
+        self._window_start = self._current_window()
+        self._used_weight = 0
+        self._blocked_until = 0.0
+
+        # 统计信息
+        self.total_weight = 0
+        self.total_wait_seconds = 0.0
+        self.max_used_weight = 0
+
+    def _current_window(self) -> float:
+        now = time.time()
+        return now - now % self.window_seconds
+
+    def _roll_window(self):
+        window_start = self._current_window()
+        if window_start != self._window_start:
+            self._window_start = window_start
+            self._used_weight = 0
+
+    def _reserve(self, weight: int) -> float:
+        """尝试预占权重，返回需要等待的秒数（0表示已预占成功）"""
+        with self._lock:
+            now = time.time()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+
+            self._roll_window()
+            if self._used_weight + weight > self.limit and self._used_weight > 0:
+                return self._window_start + self.window_seconds - now + 0.05
+
+            self._used_weight += weight
+            self.total_weight += weight
+            self.max_used_weight = max(self.max_used_weight, self._used_weight)
+            return 0.0
+
+    async def acquire(self, weight: int = 1):
+        """协程中申请权重，超限时异步等待"""
+        while True:
+            wait_seconds = self._reserve(weight)
+            if wait_seconds <= 0:
+                return
+            self.total_wait_seconds += wait_seconds
+            logger.debug(f"请求权重接近上限({self._used_weight}/{self.limit})，等待{wait_seconds:.2f}秒")
+            await asyncio.sleep(wait_seconds)
+
+    def acquire_sync(self, weight: int = 1):
+        """线程中申请权重，超限时阻塞等待"""
+        while True:
+            wait_seconds = self._reserve(weight)
+            if wait_seconds <= 0:
+                return
+            self.total_wait_seconds += wait_seconds
+            time.sleep(wait_seconds)
+
+    def update_from_response(self, response):
+        """根据响应头校准已用权重，遇到429/418时暂停到Retry-After之后"""
+        headers = getattr(response, 'headers', None) or {}
+        used = headers.get(self.header_name) if self.header_name else None
+
+        with self._lock:
+            self._roll_window()
+            if used is not None:
+                try:
+                    used_weight = int(used)
+                    # 服务端统计包含其他进程的请求，以较大值为准
+                    if used_weight > self._used_weight:
+                        self._used_weight = used_weight
+                        self.max_used_weight = max(self.max_used_weight, used_weight)
+                except ValueError:
+                    pass
+
+            status_code = getattr(response, 'status_code', 200)
+            if status_code in (418, 429):
+                retry_after = headers.get('Retry-After')
+                try:
+                    delay = float(retry_after) if retry_after else self.window_seconds
+                except ValueError:
+                    delay = self.window_seconds
+                self._blocked_until = max(self._blocked_until, time.time() + delay)
+                logger.warning(f"触发请求频率限制(状态码{status_code})，暂停{delay:.0f}秒")
+
+    def requests_hook(self, response, *args, **kwargs):
+        """requests.Session 响应钩子"""
+        self.update_from_response(response)
+        return response
+
+    def attach_to_session(self, session):
+        """将限速器挂到 requests.Session 上，自动读取每个响应的权重头"""
+        session.hooks.setdefault('response', []).append(self.requests_hook)
+
+    @property
+    def used_weight(self) -> int:
+        with self._lock:
+            self._roll_window()
+            return self._used_weight
+
+    def stats(self) -> dict:
+        """返回限速统计"""
+        return {
+            'total_weight': self.total_weight,
+            'max_used_weight': self.max_used_weight,
+            'total_wait_seconds': round(self.total_wait_seconds, 2),
+        }
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tools.logger import logger
+
+
+class ScanMetrics:
+    """
+    扫描周期的分阶段计时和计数
+
+    每个阶段记录每次耗时，扫描结束时输出 p50/p95/p99、最慢的交易对和各项计数，
+    并写入Prometheus文本格式文件（可由node_exporter的textfile collector采集）。
+    线程安全，可在协程和 asyncio.to_thread 的线程中同时使用。
+    """
+
+    def __init__(self, prefix: str = 'scanner', quantiles: Tuple[float, ...] = (0.5, 0.95, 0.99)):
+        """
+        Args:
+            prefix: Prometheus指标名前缀
+            quantiles: 输出的分位数
+        """
+        self.prefix = prefix
+        self.quantiles = quantiles
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """开始新的扫描周期"""
+        with self._lock:
+            self.started_at = time.time()
+            # {阶段: [耗时, ...]}
+            self.durations: Dict[str, List[float]] = {}
+            # {阶段: {交易对: 累计耗时}}
+            self.symbol_seconds: Dict[str, Dict[str, float]] = {}
+            # {计数名: 值}
+            self.counters: Dict[str, float] = {}
+
+    def record(self, stage: str, seconds: float, symbol: Optional[str] = None):
+        """记录一次阶段耗时，指定交易对时同时累计到该阶段下的交易对"""
+        with self._lock:
+            self.durations.setdefault(stage, []).append(seconds)
+            if symbol is not None:
+                symbols = self.symbol_seconds.setdefault(stage, {})
+                symbols[symbol] = symbols.get(symbol, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage: str, symbol: Optional[str] = None):
+        """with metrics.stage('kline_fetch', symbol): ...（也可以包住await）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, symbol)
+
+    def incr(self, name: str, value: float = 1):
+        """累加计数"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name: str, value: float):
+        """设置计数的当前值"""
+        with self._lock:
+            self.counters[name] = value
+
+    def stage_summary(self) -> List[Dict[str, float]]:
+        """每个阶段的次数、总耗时、分位数和最大值（按总耗时降序）"""
+        with self._lock:
+            durations = {stage: np.array(values) for stage, values in self.durations.items()}
+
+        rows = []
+        for stage, values in durations.items():
+            row = {'stage': stage, 'count': len(values), 'total': float(values.sum()), 'max': float(values.max())}
+            for quantile, value in zip(self.quantiles, np.quantile(values, self.quantiles)):
+                row[f"p{quantile * 100:g}"] = float(value)
+            rows.append(row)
+        return sorted(rows, key=lambda row: row['total'], reverse=True)
+
+    def worst_symbols(self, stage: str, top: int = 5) -> List[Tuple[str, float]]:
+        """某个阶段累计耗时最长的交易对"""
+        with self._lock:
+            items = list(self.symbol_seconds.get(stage, {}).items())
+        return sorted(items, key=lambda item: item[1], reverse=True)[:top]
+
+    def log_summary(self, top: int = 5):
+        """输出本轮扫描的分阶段耗时汇总表"""
+        quantile_names = [f"p{quantile * 100:g}" for quantile in self.quantiles]
+        header = f"{'阶段':<20}{'次数':>8}{'总耗时':>10}" + ''.join(f"{name:>10}" for name in quantile_names) + f"{'最大':>10}"
+        lines = [f"⏱️ 扫描耗时统计（周期 {time.time() - self.started_at:.1f}秒）:", header]
+        worst_lines = []
+        for row in self.stage_summary():
+            lines.append(f"{row['stage']:<20}{row['count']:>8}{row['total']:>10.2f}"
+                         + ''.join(f"{row[name]:>10.3f}" for name in quantile_names)
+                         + f"{row['max']:>10.3f}")
+            worst = self.worst_symbols(row['stage'], top)
+            if worst:
+                worst_lines.append(f"  {row['stage']}: " + ', '.join(f"{symbol}({seconds:.2f}s)" for symbol, seconds in worst))
+
+        if worst_lines:
+            lines.append("最慢的交易对:")
+            lines.extend(worst_lines)
+
+        with self._lock:
+            counters = dict(self.counters)
+        if counters:
+            lines.append("计数: " + ', '.join(f"{name}={value:g}" for name, value in sorted(counters.items())))
+
+        logger.info("\n".join(lines))
+
+    def to_prometheus(self, top: int = 5) -> str:
+        """生成Prometheus文本格式"""
+        metric = f"{self.prefix}_stage_seconds"
+        lines = [f"# HELP {metric} Per-stage duration of the last scan cycle.",
+                 f"# TYPE {metric} summary"]
+        rows = self.stage_summary()
+        for row in rows:
+            for quantile in self.quantiles:
+                lines.append(f'{metric}{{stage="{row["stage"]}",quantile="{quantile:g}"}} '
+                             f'{row[f"p{quantile * 100:g}"]:.6f}')
+            lines.append(f'{metric}_sum{{stage="{row["stage"]}"}} {row["total"]:.6f}')
+            lines.append(f'{metric}_count{{stage="{row["stage"]}"}} {row["count"]}')
+
+        symbol_metric = f"{self.prefix}_symbol_seconds"
+        lines.extend([f"# HELP {symbol_metric} Time spent on the slowest symbols per stage in the last scan cycle.",
+                      f"# TYPE {symbol_metric} gauge"])
+        for row in rows:
+            for symbol, seconds in self.worst_symbols(row['stage'], top):
+                lines.append(f'{symbol_metric}{{stage="{row["stage"]}",symbol="{symbol}"}} {seconds:.6f}')
+
+        with self._lock:
+            counters = dict(self.counters)
+        for name, value in sorted(counters.items()):
+            counter_metric = f"{self.prefix}_{name}"
+            lines.extend([f"# TYPE {counter_metric} gauge", f"{counter_metric} {value:g}"])
+
+        cycle_metric = f"{self.prefix}_cycle_seconds"
+        lines.extend([f"# TYPE {cycle_metric} gauge", f"{cycle_metric} {time.time() - self.started_at:.6f}",
+                      f"# TYPE {self.prefix}_last_scan_timestamp_seconds gauge",
+                      f"{self.prefix}_last_scan_timestamp_seconds {time.time():.0f}"])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, file_path: str):
+        """写入Prometheus文本文件（先写临时文件再改名，采集时不会读到半个文件）"""
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            tmp_path = f"{file_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            logger.error(f"写入指标文件{file_path}失败: {str(e)}")
@@ -0,0 +1,74 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from tools.logger import logger
+
+
+class TickerSnapshot:
+    """
+    交易所全市场行情快照
+
+    一次请求交易所的全部交易对行情（all-tickers接口），按交易对索引，ttl秒内的查询直接使用快照，
+    替代逐个交易对请求价格。每个交易对的行情格式：
+        {'price': 最新价, 'bid': 买一价, 'ask': 卖一价, 'volume': 24小时成交额(USDT), 'funding_rate': 资金费率}
+    交易所未提供的字段为None。交易对统一为 ETHUSDT 格式。
+    线程安全，快照过期时只有一个线程去刷新；刷新失败时继续使用旧快照，并在ttl后再重试。
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Dict[str, Dict[str, Any]]], ttl: float = 10):
+        """
+        Args:
+            name: 快照名称（用于日志），如 "Binance现货"
+            loader: 请求并解析全部行情的函数，返回 {交易对: 行情}，失败时抛出异常
+            ttl: 快照有效秒数
+        """
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+
+        self._tickers: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'refreshes': 0, 'errors': 0}
+
+    def _expired(self) -> bool:
+        return time.time() - self._loaded_at >= self.ttl
+
+    def tickers(self) -> Dict[str, Dict[str, Any]]:
+        """返回 {交易对: 行情}，过期时先刷新"""
+        if self._expired():
+            with self._lock:
+                if self._expired():
+                    self._refresh()
+        return self._tickers
+
+    def _refresh(self):
+        start = time.time()
+        try:
+            tickers = self.loader()
+            if not tickers:
+                raise ValueError("返回的行情为空")
+            self._tickers = tickers
+            self.stats['refreshes'] += 1
+            logger.debug(f"刷新{self.name}行情快照: {len(tickers)} 个交易对, 耗时 {time.time() - start:.2f}秒")
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"刷新{self.name}行情快照失败，继续使用 {len(self._tickers)} 个交易对的旧数据: {str(e)}")
+        # 失败时同样等待ttl后再重试，避免每次查询都请求交易所
+        self._loaded_at = time.time()
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """查询一个交易对的行情，没有该交易对时返回None"""
+        tickers = self.tickers()
+        self.stats['lookups'] += 1
+        return tickers.get(symbol)
+
+    def price(self, symbol: str) -> float:
+        """查询一个交易对的最新价，没有该交易对时返回0"""
+        ticker = self.get(symbol)
+        return ticker['price'] if ticker and ticker['price'] else 0
+
+    def invalidate(self):
+        """使快照立即过期，下次查询时重新请求"""
+        self._loaded_at = 0.0
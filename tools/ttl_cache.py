@@ -0,0 +1,121 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from tools.logger import logger
+
+
+class TTLCache:
+    """
+    基于SQLite的按键过期缓存
+
+    每个条目单独记录写入时间，过期条目仍然可以读取（由调用方在后台刷新），
+    适合代币信息这类变化缓慢、获取较慢的元数据。数据库使用WAL模式，
+    多个扫描进程可以同时读写同一个缓存文件。值以JSON保存。
+    """
+
+    def __init__(self, db_path: str, namespace: str, ttl_seconds: float, busy_timeout: float = 30):
+        """
+        Args:
+            db_path: SQLite数据库文件路径
+            namespace: 缓存命名空间（同一文件中区分不同类型的数据）
+            ttl_seconds: 条目有效期（秒）
+            busy_timeout: 其他进程写入时等待锁的最长秒数
+        """
+        self.db_path = db_path
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=busy_timeout, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                cache_key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (namespace, cache_key)
+            )
+        ''')
+        self._conn.commit()
+
+    def is_fresh(self, updated_at: float) -> bool:
+        return time.time() - updated_at < self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """
+        读取一个条目
+
+        Returns:
+            Optional[Tuple[Any, bool]]: (值, 是否未过期)，不存在时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, updated_at FROM cache_entries WHERE namespace = ? AND cache_key = ?',
+                (self.namespace, key)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), self.is_fresh(row[1])
+
+    def load_all(self) -> Tuple[Dict[str, Any], Set[str]]:
+        """
+        读取命名空间下的所有条目（包括已过期的）
+
+        Returns:
+            Tuple[Dict, Set]: ({key: value}, 已过期的key集合)
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT cache_key, value, updated_at FROM cache_entries WHERE namespace = ?',
+                (self.namespace,)).fetchall()
+
+        data = {}
+        stale_keys = set()
+        for key, value, updated_at in rows:
+            try:
+                data[key] = json.loads(value)
+            except ValueError:
+                continue
+            if not self.is_fresh(updated_at):
+                stale_keys.add(key)
+        return data, stale_keys
+
+    def set(self, key: str, value: Any):
+        """写入一个条目"""
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Any]):
+        """在一个事务中写入多个条目"""
+        if not items:
+            return
+        now = time.time()
+        rows = [(self.namespace, key, json.dumps(value, ensure_ascii=False), now) for key, value in items.items()]
+        try:
+            with self._lock:
+                with self._conn:
+                    self._conn.executemany('''
+                        INSERT OR REPLACE INTO cache_entries (namespace, cache_key, value, updated_at)
+                        VALUES (?, ?, ?, ?)
+                    ''', rows)
+        except sqlite3.Error as e:
+            logger.error(f"写入缓存{self.namespace}失败: {str(e)}")
+
+    def delete_missing(self, keys: Iterable[str]):
+        """删除不在keys中的条目（全量刷新后清理已下架的数据）"""
+        keep = set(keys)
+        with self._lock:
+            existing = [row[0] for row in self._conn.execute(
+                'SELECT cache_key FROM cache_entries WHERE namespace = ?', (self.namespace,))]
+            removed = [(self.namespace, key) for key in existing if key not in keep]
+            if removed:
+                with self._conn:
+                    self._conn.executemany(
+                        'DELETE FROM cache_entries WHERE namespace = ? AND cache_key = ?', removed)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
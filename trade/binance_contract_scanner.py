@@ -25,6 +25,7 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
 from tools.logger import logger
+from tools.funding_rate_store import FundingRateStore
 from config import binance_api_key, binance_api_secret, proxies, project_root
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
@@ -74,6 +75,9 @@ class BinanceContractScanner:
         self.price_volatility_threshold = price_volatility_threshold
         self.min_leverage = min_leverage
         self.days_to_analyze = days_to_analyze
+        
+        # 资金费率历史仓库（与其他扫描器和套利监控共用）
+        self.funding_store = FundingRateStore()
         self.exchange_name = "BINANCE"  # 交易所名称
         
         logger.info(f"Binance合约扫描器初始化完成")
@@ -218,9 +222,38 @@ class BinanceContractScanner:
         #
         # return 8.0  # 默认8小时
 
+    def _fetch_funding_rates(self, symbol: str, start_ms: int, end_ms: int, max_pages: int = 20) -> List[Dict]:
+        """
+        分页获取 [start_ms, end_ms] 内的资金费率，供资金费率仓库增量同步，失败或超过页数上限时抛出异常
+        
+        Args:
+            symbol: 交易对符号
+            start_ms: 开始时间（毫秒）
+            end_ms: 结束时间（毫秒）
+            max_pages: 最多请求的页数
+            
+        Returns:
+            List[Dict]: [{'fundingTime': 毫秒, 'fundingRate': 资金费率, 'markPrice': 标记价格}]
+        """
+        history = []
+        for _ in range(max_pages):
+            funding_rates_data = self.client.futures_funding_rate(
+                symbol=symbol,
+                startTime=start_ms,
+                endTime=end_ms,
+                limit=1000
+            )
+            history.extend({'fundingTime': int(rate['fundingTime']), 'fundingRate': rate['fundingRate'],
+                            'markPrice': rate.get('markPrice')} for rate in funding_rates_data)
+            if len(funding_rates_data) < 1000:
+                return history
+            start_ms = int(funding_rates_data[-1]['fundingTime']) + 1
+        # 达到页数上限时返回部分数据会被仓库记录为已同步，缺失的部分不会再获取
+        raise Exception(f"{symbol}资金费率超过{max_pages}页仍未取完，放弃本次同步以免记录不完整的范围")
+
     def get_funding_rate_history(self, symbol: str, days: int = 30) -> Optional[List[float]]:
         """
-        获取交易对的资金费率历史数据
+        获取交易对的资金费率历史数据（来自本地资金费率仓库，只增量请求新的结算记录）
         
         Args:
             symbol: 交易对符号
@@ -230,27 +263,22 @@ class BinanceContractScanner:
             List[float]: 资金费率列表，如果获取失败返回None
         """
         try:
-            # 计算开始时间（资金费率每8小时一次）
-            end_time = datetime.now()
-            start_time = end_time - timedelta(days=days)
+            # 计算开始时间
+            since = int((datetime.now() - timedelta(days=days)).timestamp() * 1000)
             
-            # 获取资金费率历史
-            funding_rates_data = self.client.futures_funding_rate(
-                symbol=symbol,
-                startTime=int(start_time.timestamp() * 1000),
-                endTime=int(end_time.timestamp() * 1000),
-                limit=days * 3 + 10  # 每天3次，多获取一些
-            )
+            # 增量同步后从本地读取
+            data = self.funding_store.history('Binance', symbol,
+                                              lambda start, end: self._fetch_funding_rates(symbol, start, end), since)
             
-            if not funding_rates_data:
+            if len(data['funding_rate']) == 0:
                 logger.warning(f"{symbol}: 无资金费率数据")
                 return None
             
             # 计算结算周期
-            self.funding_interval_hours = self.get_funding_rate_interval(funding_rates_data)
+            self.funding_interval_hours = self.funding_store.interval_hours('Binance', symbol)
             
             # 提取资金费率
-            rates = [float(rate['fundingRate']) for rate in funding_rates_data]
+            rates = data['funding_rate'].tolist()
             logger.debug(f"{symbol}: 获取到{len(rates)}个资金费率数据点，结算周期{self.funding_interval_hours:.1f}小时")
             return rates
             
@@ -461,6 +489,7 @@ class BinanceContractScanner:
                 logger.info(f"已处理 {i}/{total_count} 个交易对，找到 {len(qualified_symbols)} 个符合条件的交易对")
         
         logger.info(f"扫描完成! 总共分析了 {total_count} 个交易对，找到 {len(qualified_symbols)} 个符合条件的交易对")
+        self.funding_store.log_stats()
         return qualified_symbols
 
     def generate_report(self, qualified_symbols: List[Dict[str, Any]]):
@@ -28,6 +28,7 @@ from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import binance_api_key, binance_api_secret
 from high_yield.exchange import ExchangeAPI
+from tools.premium_index_snapshot import get_premium_index
 
 # 配置日志
 logging.basicConfig(
@@ -132,8 +133,13 @@ class BinanceFutureScanner:
         logger.info("获取所有合约的当前资金费率...")
         
         try:
-            url = "https://fapi.binance.com/fapi/v1/premiumIndex"
-            data = self.api_request(url)
+            # 优先读取行情进程维护的本机快照，不可用或过期时再请求REST
+            snapshot = get_premium_index()
+            if snapshot is not None:
+                data = list(snapshot.values())
+            else:
+                url = "https://fapi.binance.com/fapi/v1/premiumIndex"
+                data = self.api_request(url)
             
             if data:
                 # 构建资金费率字典 {symbol: funding_rate}
@@ -28,6 +28,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from tools.logger import logger
 from config import binance_api_key, binance_api_secret, proxies, fundingrate_auto_skip
 from tools.proxy import get_proxy_ip
+from tools.premium_index_snapshot import get_premium_index
 from high_yield.exchange import ExchangeAPI
 
 import logging
@@ -108,13 +109,16 @@ class BinancePositionFetcher:
     def get_binance_futures_funding_rate(self, token):
         """获取币安合约资金费率"""
         try:
-            url = f"https://fapi.binance.com/fapi/v1/premiumIndex?symbol={token}"
-            response = requests.get(url, proxies=proxies)
-            if response.status_code != 200 and response.text.find('Invalid symbol') == -1:
-                logger.debug(f"binance get {token} future failed, url: {url}, status: {response.status_code}, response: {response.text}")
-                return {}
-            
-            data = response.json()
+            # 优先读取行情进程维护的本机快照，不可用或过期时再请求REST
+            data = get_premium_index(token)
+            if data is None:
+                url = f"https://fapi.binance.com/fapi/v1/premiumIndex?symbol={token}"
+                response = requests.get(url, proxies=proxies)
+                if response.status_code != 200 and response.text.find('Invalid symbol') == -1:
+                    logger.debug(f"binance get {token} future failed, url: {url}, status: {response.status_code}, response: {response.text}")
+                    return {}
+
+                data = response.json()
             if not self.binance_funding_info:
                 self.get_binance_funding_info()
             
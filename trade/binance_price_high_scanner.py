@@ -28,6 +28,10 @@ Binance价格高点扫描器 (混合K线版本)
 - 初始化: python binance_price_high_scanner.py --init
 - 扫描: python binance_price_high_scanner.py
 - 交易: python binance_price_high_scanner.py --trade
+- 循环: python binance_price_high_scanner.py --interval 5  (进程常驻，复用内存索引)
+- 流式: python binance_price_high_scanner.py --stream  (订阅1分钟K线流，K线收盘即检查)
+- 分区: python binance_price_high_scanner.py --partition  (将已有K线表改为按天/按月分区，一次性操作)
+- 回测: python binance_price_high_scanner.py --backtest --backtest-days 60  (用数据库K线回放突破卖空策略)
 
 通知内容包含：
 - 当前价格和突破区间信息
@@ -44,28 +48,47 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from tools.logger import logger
+from tools.rate_limiter import WeightRateLimiter
+from tools.db_pool import get_pool
+from tools.notification_dispatcher import NotificationDispatcher
+from tools.ttl_cache import TTLCache
+from tools.scan_metrics import ScanMetrics
+from trade.kline_index import RollingHighIndex
+from trade.kline_array import KlineArray
+from trade.breakout_backtester import BreakoutBacktester
+from trade.kline_partitions import KlinePartitionManager
 from config import binance_api_key, binance_api_secret, proxies, project_root, mysql_config
 from binance.client import Client
+from binance import AsyncClient, BinanceSocketManager
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 import logging
 import requests
-import pickle
 import argparse
 import asyncio
+import contextlib
+import numpy as np
 import ccxt.pro as ccxtpro
-import pymysql
 
 # 设置日志级别
 logger.setLevel(logging.INFO)
 
+# --init 初始化断点在system_status中的键前缀
+BACKFILL_CHECKPOINT_PREFIX = 'kline_init:'
+
+# 盈亏批量更新时每条 UPDATE ... CASE 语句包含的记录数
+PNL_UPDATE_BATCH_SIZE = 500
+
 
 class BinancePriceHighScanner:
     """Binance价格高点扫描器"""
 
     def __init__(self, api_key: str = None, api_secret: str = None, days_to_analyze: int = 30,
-                 enable_trading: bool = False):
+                 enable_trading: bool = False, kline_batch_size: int = 1000, scan_concurrency: int = 10):
         """
         初始化Binance客户端
         
@@ -74,6 +97,8 @@ class BinancePriceHighScanner:
             api_secret: Binance API Secret
             days_to_analyze: 分析历史天数
             enable_trading: 是否启用自动交易功能
+            kline_batch_size: K线批量写入时每批的行数
+            scan_concurrency: 扫描时并发分析的交易对数量
         """
         self.client = Client(
             api_key or binance_api_key,
@@ -81,9 +106,20 @@ class BinancePriceHighScanner:
             requests_params={'proxies': proxies}
         )
 
+        # 请求权重限速（读取响应头X-MBX-USED-WEIGHT-1M校准，合约IP限制2400/分钟）
+        self.weight_limiter = WeightRateLimiter(max_weight=2400)
+        self.weight_limiter.attach_to_session(self.client.session)
+
+        # 并发分析的交易对数量
+        self.scan_concurrency = max(1, scan_concurrency)
+
         # 企业微信群机器人webhook
         self.webhook_url = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=43c4c655-b144-4e1f-b054-4b3a9e2caf26"
 
+        # 后台通知分发（企业微信机器人限速20条/分钟，积压时合并发送）
+        self.notifier = NotificationDispatcher()
+        self.notifier.register_channel('wework', self.webhook_url, proxies=proxies, rate_limit_per_minute=20)
+
         # 分析天数
         self.days_to_analyze = days_to_analyze
 
@@ -121,28 +157,71 @@ class BinancePriceHighScanner:
 
         # MySQL数据库配置
         self.mysql_config = mysql_config
+        # 共享连接池（并发分析时每个线程各自借出连接）
+        self.db_pool = get_pool(self.mysql_config, max_size=max(10, scan_concurrency))
+
+        # K线批量写入配置（按批次多行插入）
+        self.kline_batch_size = max(1, kline_batch_size)
+        self.kline_ingest_stats = {'inserted': 0, 'duplicates': 0}
+        # --init 初始化统计（获取的K线根数）
+        self.backfill_stats = {'candles': 0}
+
+        # K线表分区管理（1分钟按天、30分钟按月分区，过期分区归档后整体删除）
+        self.partition_manager = KlinePartitionManager(
+            self.db_pool, self.mysql_config['database'], os.path.join(project_root, 'trade/archive'))
+        # 30分钟K线保留的月数
+        self.kline_30min_retention_months = 12
+
         self.init_trading_db()  # 总是初始化数据库，用于存储价格数据
 
         # 当前价格缓存 {symbol: price}
         self.current_prices = {}
 
-        # 缓存文件路径
-        self.token_info_cache = os.path.join(self.cache_dir, 'token_info_cache.pkl')
-        self.symbol_description_cache = os.path.join(self.cache_dir, 'symbol_description_cache.pkl')
-        self.products_cache = os.path.join(self.cache_dir, 'products_cache.pkl')
+        # 用户数据流平仓订单监听任务（启动时先用REST对账一次，之后由推送实时更新）
+        self.order_listener_task: Optional[asyncio.Task] = None
+        # 推送到达时尚未写入数据库的订单终态 {order_id: (close_order_status, close_price, 收到时间)}
+        self.unmatched_close_order_updates: Dict[str, Tuple[str, float, float]] = {}
+        # 本进程提交或对账时见过的平仓订单ID，用于区分推送中的开仓单
+        self.close_order_ids: set = set()
+
+        # 本轮扫描的K线库存缓存 {symbol: {...}}，None表示未加载（回退到逐个交易对查询）
+        self.kline_inventory: Optional[Dict[str, Dict[str, Any]]] = None
+
+        # 常驻内存的滚动高低点索引（首次扫描时从数据库加载，之后由新K线增量更新）
+        self.high_index = RollingHighIndex(max_days=self.days_to_analyze)
 
         # 缓存过期时间（1天）
         self.cache_expire_hours = 24
 
-        # 加载缓存数据
-        self.token_info_data = self.load_cache_with_expiry(self.token_info_cache)
-        self.symbol_description_data = self.load_cache_with_expiry(self.symbol_description_cache)
-        self.products_data = self.load_cache_with_expiry(self.products_cache)
+        # 元数据缓存（SQLite按条目过期，多个扫描进程共享；过期条目先返回旧值，再在后台刷新）
+        metadata_cache_db = os.path.join(self.cache_dir, 'metadata_cache.sqlite3')
+        cache_ttl = self.cache_expire_hours * 3600
+        self.token_info_store = TTLCache(metadata_cache_db, 'token_info', cache_ttl)
+        self.symbol_description_store = TTLCache(metadata_cache_db, 'symbol_description', cache_ttl)
+        self.products_store = TTLCache(metadata_cache_db, 'products', cache_ttl)
+
+        # 加载缓存数据（包括已过期的条目）
+        self.token_info_data, self.stale_token_info = self.token_info_store.load_all()
+        self.symbol_description_data, stale_descriptions = self.symbol_description_store.load_all()
+        self.products_data, stale_products = self.products_store.load_all()
+        self.symbol_description_stale = bool(stale_descriptions)
+        self.products_stale = bool(stale_products)
+
+        # 后台刷新过期元数据的线程池，以及正在刷新的键（避免重复刷新）
+        self.metadata_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='metadata-refresh')
+        self._refreshing_metadata: set = set()
+        self._refreshing_lock = threading.Lock()
+        self.metadata_prefetch_task: Optional[asyncio.Task] = None
 
         # 资金费率信息缓存（包含结算周期）
         self.funding_info_data = {}
         self._load_funding_info()
 
+        # 分阶段耗时和计数（每轮扫描结束时输出汇总表并写入Prometheus文本文件）
+        self.scan_metrics = ScanMetrics(prefix='price_high_scanner')
+        self.metrics_file = os.path.join(project_root, 'trade/metrics/price_high_scanner.prom')
+        self._metrics_baseline = self._metrics_counters()
+
         logger.info(
             f"Binance价格高点扫描器初始化完成 (1分钟K线版本)，分析天数: {self.days_to_analyze}天，自动交易: {'启用' if self.enable_trading else '禁用'}")
 
@@ -176,7 +255,7 @@ class BinancePriceHighScanner:
     def init_trading_db(self):
         """初始化交易记录数据库"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
 
             # 创建交易记录表
@@ -208,10 +287,10 @@ class BinancePriceHighScanner:
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
             ''')
 
-            # 创建1分钟K线数据表（当天数据）
-            cursor.execute('''
+            # 创建1分钟K线数据表（当天数据，按天分区）
+            cursor.execute(f'''
                 CREATE TABLE IF NOT EXISTS kline_data_1min (
-                    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+                    id BIGINT NOT NULL AUTO_INCREMENT,
                     symbol VARCHAR(50) NOT NULL,
                     open_time BIGINT NOT NULL,
                     close_time BIGINT NOT NULL,
@@ -225,15 +304,17 @@ class BinancePriceHighScanner:
                     taker_buy_base_volume DECIMAL(20,8) NOT NULL,
                     taker_buy_quote_volume DECIMAL(20,8) NOT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (id, open_time),
                     UNIQUE KEY unique_kline_1min (symbol, open_time),
                     INDEX idx_open_time_1min (open_time)
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                {self.partition_manager.partition_clause('kline_data_1min', datetime.now() - timedelta(days=1))}
             ''')
 
-            # 创建30分钟K线数据表（历史数据）
-            cursor.execute('''
+            # 创建30分钟K线数据表（历史数据，按月分区）
+            cursor.execute(f'''
                 CREATE TABLE IF NOT EXISTS kline_data_30min (
-                    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+                    id BIGINT NOT NULL AUTO_INCREMENT,
                     symbol VARCHAR(50) NOT NULL,
                     open_time BIGINT NOT NULL,
                     close_time BIGINT NOT NULL,
@@ -247,9 +328,12 @@ class BinancePriceHighScanner:
                     taker_buy_base_volume DECIMAL(20,8) NOT NULL,
                     taker_buy_quote_volume DECIMAL(20,8) NOT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (id, open_time),
                     UNIQUE KEY unique_kline_30min (symbol, open_time),
                     INDEX idx_open_time_1min (open_time)
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                {self.partition_manager.partition_clause(
+                    'kline_data_30min', datetime.now() - timedelta(days=self.days_to_analyze + 1))}
             ''')
 
             # 创建系统状态表（记录跨天处理状态）
@@ -264,66 +348,115 @@ class BinancePriceHighScanner:
 
             conn.commit()
             conn.close()
+
+            # 已是分区表时补齐未来的分区
+            for table in ('kline_data_1min', 'kline_data_30min'):
+                self.partition_manager.ensure_future_partitions(table)
+
             logger.info(f"MySQL数据库初始化完成: {self.mysql_config['host']}:{self.mysql_config['port']}/{self.mysql_config['database']}")
 
         except Exception as e:
             logger.error(f"MySQL数据库初始化失败: {str(e)}")
 
-    def save_kline_data(self, symbol: str, klines: List[List], interval: str = '1min') -> bool:
+    @staticmethod
+    def _kline_to_row(symbol: str, kline: List) -> Tuple:
+        """将Binance API格式的K线转换为数据库插入行"""
+        return (
+            symbol,
+            int(kline[0]),          # open_time
+            int(kline[6]),          # close_time
+            float(kline[1]),        # open_price
+            float(kline[2]),        # high_price
+            float(kline[3]),        # low_price
+            float(kline[4]),        # close_price
+            float(kline[5]),        # volume
+            float(kline[7]),        # quote_volume
+            int(kline[8]),          # trades_count
+            float(kline[9]),        # taker_buy_base_volume
+            float(kline[10])        # taker_buy_quote_volume
+        )
+
+    def bulk_save_kline_data(self, symbol: str, klines, interval: str = '1min') -> Tuple[int, int]:
         """
-        保存K线数据到数据库
-        
+        批量保存K线数据到数据库（多行INSERT IGNORE，复用连接）
+
         Args:
             symbol: 交易对符号
-            klines: K线数据列表
+            klines: K线数据列表（Binance API格式）或KlineArray
             interval: K线间隔 ('1min' 或 '30min')
-            
+
         Returns:
-            bool: 是否保存成功
+            Tuple[int, int]: (新插入条数, 重复跳过条数)
         """
-        try:
-            if not klines:
-                return False
-
-            # 根据间隔选择表名
-            table_name = 'kline_data_1min' if interval == '1min' else 'kline_data_30min'
+        if not klines:
+            return 0, 0
 
-            conn = pymysql.connect(**self.mysql_config)
-            cursor = conn.cursor()
+        # 根据间隔选择表名
+        table_name = 'kline_data_1min' if interval == '1min' else 'kline_data_30min'
 
-            saved_count = 0
+        if isinstance(klines, KlineArray):
+            rows = klines.to_db_rows(symbol)
+        else:
+            rows = []
             for kline in klines:
                 try:
-                    cursor.execute(f'''
-                        INSERT IGNORE INTO {table_name} 
-                        (symbol, open_time, close_time, open_price, high_price, low_price, 
-                         close_price, volume, quote_volume, trades_count, 
-                         taker_buy_base_volume, taker_buy_quote_volume)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ''', (
-                        symbol,
-                        int(kline[0]),          # open_time
-                        int(kline[6]),          # close_time
-                        float(kline[1]),        # open_price
-                        float(kline[2]),        # high_price
-                        float(kline[3]),        # low_price
-                        float(kline[4]),        # close_price
-                        float(kline[5]),        # volume
-                        float(kline[7]),        # quote_volume
-                        int(kline[8]),          # trades_count
-                        float(kline[9]),        # taker_buy_base_volume
-                        float(kline[10])        # taker_buy_quote_volume
-                    ))
-                    if cursor.rowcount > 0:
-                        saved_count += 1
+                    rows.append(self._kline_to_row(symbol, kline))
                 except Exception as e:
-                    logger.debug(f"插入{interval}K线数据失败 (可能重复): {str(e)}")
+                    logger.debug(f"跳过格式异常的{interval}K线数据: {str(e)}")
+
+        if not rows:
+            return 0, 0
 
+        conn = self.db_pool.get_connection()
+        cursor = conn.cursor()
+
+        inserted_count = 0
+        try:
+            # executemany会将INSERT ... VALUES改写为多行VALUES，每批一次往返
+            for i in range(0, len(rows), self.kline_batch_size):
+                batch = rows[i:i + self.kline_batch_size]
+                cursor.executemany(f'''
+                    INSERT IGNORE INTO {table_name} 
+                    (symbol, open_time, close_time, open_price, high_price, low_price, 
+                     close_price, volume, quote_volume, trades_count, 
+                     taker_buy_base_volume, taker_buy_quote_volume)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ''', batch)
+                inserted_count += max(cursor.rowcount, 0)
             conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
             conn.close()
 
-            if saved_count > 0:
-                logger.debug(f"保存{symbol}的{saved_count}条新{interval}K线数据")
+        duplicate_count = len(rows) - inserted_count
+        self.kline_ingest_stats['inserted'] += inserted_count
+        self.kline_ingest_stats['duplicates'] += duplicate_count
+
+        return inserted_count, duplicate_count
+
+    def save_kline_data(self, symbol: str, klines, interval: str = '1min') -> bool:
+        """
+        保存K线数据到数据库
+        
+        Args:
+            symbol: 交易对符号
+            klines: K线数据列表（Binance API格式）或KlineArray
+            interval: K线间隔 ('1min' 或 '30min')
+            
+        Returns:
+            bool: 是否保存成功
+        """
+        try:
+            if klines is None or len(klines) == 0:
+                return False
+
+            inserted_count, duplicate_count = self.bulk_save_kline_data(symbol, klines, interval)
+
+            if inserted_count > 0:
+                logger.debug(f"保存{symbol}的{inserted_count}条新{interval}K线数据，跳过{duplicate_count}条重复数据")
             
             return True
 
@@ -331,7 +464,7 @@ class BinancePriceHighScanner:
             logger.error(f"保存{symbol}{interval}K线数据失败: {str(e)}")
             return False
 
-    def get_kline_data_from_db(self, symbol: str, days: int = 30) -> List[List]:
+    def get_kline_data_from_db(self, symbol: str, days: int = 30) -> KlineArray:
         """
         从数据库获取K线数据（混合查询：历史30分钟+当天1分钟）
         
@@ -340,10 +473,10 @@ class BinancePriceHighScanner:
             days: 获取天数
             
         Returns:
-            List[List]: K线数据列表，格式与Binance API返回的格式一致
+            KlineArray: 按时间升序的列式K线数据
         """
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
 
             # 获取当天开始时间（00:00:00）
@@ -353,66 +486,113 @@ class BinancePriceHighScanner:
             # 计算历史数据开始时间
             start_time = int((datetime.now() - timedelta(days=days)).timestamp() * 1000)
 
-            all_klines = []
-
             # 1. 获取历史30分钟K线数据（今天00:00之前）
             cursor.execute('''
                 SELECT open_time, open_price, high_price, low_price, close_price, volume,
                        close_time, quote_volume, trades_count, taker_buy_base_volume, 
-                       taker_buy_quote_volume, '0'
+                       taker_buy_quote_volume
                 FROM kline_data_30min 
                 WHERE symbol = %s AND open_time >= %s AND open_time < %s
                 ORDER BY open_time ASC
             ''', (symbol, start_time, today_start_ms))
 
-            historical_results = cursor.fetchall()
+            historical_klines = KlineArray.from_rows(cursor.fetchall())
             
             # 2. 获取当天1分钟K线数据（今天00:00之后）
             cursor.execute('''
                 SELECT open_time, open_price, high_price, low_price, close_price, volume,
                        close_time, quote_volume, trades_count, taker_buy_base_volume, 
-                       taker_buy_quote_volume, '0'
+                       taker_buy_quote_volume
                 FROM kline_data_1min 
                 WHERE symbol = %s AND open_time >= %s
                 ORDER BY open_time ASC
             ''', (symbol, today_start_ms))
 
-            today_results = cursor.fetchall()
+            today_klines = KlineArray.from_rows(cursor.fetchall())
             conn.close()
 
             # 合并历史数据和当天数据
-            all_results = list(historical_results) + list(today_results)
-
-            # 转换为Binance API格式的列表
-            klines = []
-            for row in all_results:
-                kline = [
-                    row[0],     # open_time
-                    str(row[1]), # open_price
-                    str(row[2]), # high_price
-                    str(row[3]), # low_price
-                    str(row[4]), # close_price
-                    str(row[5]), # volume
-                    row[6],     # close_time
-                    str(row[7]), # quote_volume
-                    row[8],     # trades_count
-                    str(row[9]), # taker_buy_base_volume
-                    str(row[10]), # taker_buy_quote_volume
-                    row[11]     # ignore
-                ]
-                klines.append(kline)
-
-            logger.debug(f"从数据库获取{symbol}的{len(klines)}条混合K线数据（{days}天）: 历史30分钟{len(historical_results)}条，当天1分钟{len(today_results)}条")
+            klines = KlineArray.concat([historical_klines, today_klines])
+
+            logger.debug(f"从数据库获取{symbol}的{len(klines)}条混合K线数据（{days}天）: 历史30分钟{len(historical_klines)}条，当天1分钟{len(today_klines)}条")
             return klines
 
         except Exception as e:
             logger.error(f"从数据库获取{symbol}K线数据失败: {str(e)}")
-            return []
+            return KlineArray.empty()
+
+    def load_kline_inventory(self) -> bool:
+        """
+        一次查询获取所有交易对的K线库存，缓存到本轮扫描结束
+
+        每个交易对记录30分钟/1分钟K线的数量、首末开盘时间和覆盖率，
+        供数据检查、K线开始时间和补数决策直接查字典使用。
+
+        Returns:
+            bool: 是否加载成功
+        """
+        try:
+            conn = self.db_pool.get_connection()
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT '30min', symbol, COUNT(*), MIN(open_time), MAX(open_time)
+                FROM kline_data_30min GROUP BY symbol
+                UNION ALL
+                SELECT '1min', symbol, COUNT(*), MIN(open_time), MAX(open_time)
+                FROM kline_data_1min GROUP BY symbol
+            ''')
+            results = cursor.fetchall()
+            conn.close()
+
+            inventory = {}
+            for interval, symbol, count, first_time, last_time in results:
+                item = inventory.setdefault(symbol, {
+                    'count_30min': 0, 'first_30min': None, 'last_30min': None,
+                    'count_1min': 0, 'first_1min': None, 'last_1min': None,
+                })
+                item[f'count_{interval}'] = int(count)
+                item[f'first_{interval}'] = int(first_time)
+                item[f'last_{interval}'] = int(last_time)
+
+            for item in inventory.values():
+                item['count'] = item['count_30min'] + item['count_1min']
+                firsts = [t for t in (item['first_30min'], item['first_1min']) if t is not None]
+                lasts = [t for t in (item['last_30min'], item['last_1min']) if t is not None]
+                item['first_open_time'] = min(firsts)
+                item['last_open_time'] = max(lasts)
+                # 覆盖率 = 实际条数 / 首末时间之间应有的条数
+                for interval, interval_ms in (('30min', 30 * 60 * 1000), ('1min', 60 * 1000)):
+                    count = item[f'count_{interval}']
+                    if count:
+                        expected = (item[f'last_{interval}'] - item[f'first_{interval}']) // interval_ms + 1
+                        item[f'coverage_{interval}'] = count / expected
+                    else:
+                        item[f'coverage_{interval}'] = 0.0
+
+            self.kline_inventory = inventory
+
+            now_ms = int(time.time() * 1000)
+            stale_count = sum(1 for item in inventory.values() if now_ms - item['last_open_time'] > 30 * 60 * 1000)
+            gap_count = sum(1 for item in inventory.values()
+                            if item['count_30min'] and item['coverage_30min'] < 0.99)
+            logger.info(f"📦 K线库存: {len(inventory)}个交易对, 超过30分钟未更新{stale_count}个, "
+                        f"30分钟K线存在缺口{gap_count}个")
+            return True
+
+        except Exception as e:
+            logger.error(f"获取K线库存失败: {str(e)}")
+            self.kline_inventory = None
+            return False
 
     def get_kline_data_count(self, symbol: str) -> int:
         """获取数据库中某个交易对的K线数据数量（30分钟+1分钟）"""
+        if self.kline_inventory is not None:
+            item = self.kline_inventory.get(symbol)
+            return item['count'] if item else 0
+
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             # 获取30分钟K线数量
@@ -436,6 +616,24 @@ class BinancePriceHighScanner:
             logger.error(f"获取{symbol}K线数据数量失败: {str(e)}")
             return 0
 
+    def get_last_1min_open_time(self, symbol: str) -> Optional[int]:
+        """获取交易对最后一根1分钟K线的开盘时间（毫秒），没有1分钟K线时返回None"""
+        if self.kline_inventory is not None:
+            item = self.kline_inventory.get(symbol)
+            return item['last_1min'] if item else None
+
+        try:
+            conn = self.db_pool.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT MAX(open_time) FROM kline_data_1min WHERE symbol = %s', (symbol,))
+            result = cursor.fetchone()
+            conn.close()
+            return int(result[0]) if result and result[0] is not None else None
+
+        except Exception as e:
+            logger.error(f"获取{symbol}最后一根1分钟K线时间失败: {str(e)}")
+            return None
+
     def get_kline_start_time(self, symbol: str) -> Optional[datetime]:
         """
         获取交易对在数据库中第一根K线的时间
@@ -446,8 +644,15 @@ class BinancePriceHighScanner:
         Returns:
             datetime: 第一根K线的时间，如果没有数据则返回None
         """
+        if self.kline_inventory is not None:
+            item = self.kline_inventory.get(symbol)
+            if item:
+                return datetime.fromtimestamp(item['first_open_time'] / 1000)
+            logger.warning(f"{symbol} 没有找到K线数据")
+            return None
+
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             # 查询30分钟K线中的最早时间
@@ -497,7 +702,7 @@ class BinancePriceHighScanner:
     def get_system_status(self, status_key: str) -> Optional[str]:
         """获取系统状态"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             cursor.execute('SELECT status_value FROM system_status WHERE status_key = %s', (status_key,))
@@ -513,7 +718,7 @@ class BinancePriceHighScanner:
     def set_system_status(self, status_key: str, status_value: str) -> bool:
         """设置系统状态"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -535,6 +740,9 @@ class BinancePriceHighScanner:
         """
         将指定日期的1分钟K线数据转换为30分钟K线数据
         
+        所有交易对在一条 INSERT ... SELECT 中完成聚合：按 (symbol, 30分钟桶) 分组求
+        最高/最低/成交量累加，开盘价和收盘价通过桶内首末K线的唯一键关联取得。
+        
         Args:
             target_date: 目标日期
             
@@ -548,130 +756,54 @@ class BinancePriceHighScanner:
             
             start_ms = int(date_start.timestamp() * 1000)
             end_ms = int(date_end.timestamp() * 1000)
+            bucket_ms = 30 * 60 * 1000
             
             logger.info(f"开始转换{target_date.strftime('%Y-%m-%d')}的1分钟K线数据为30分钟K线...")
+            convert_start = time.time()
             
-            # 获取所有有1分钟数据的交易对
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
-            
+
             cursor.execute('''
-                SELECT DISTINCT symbol FROM kline_data_1min 
-                WHERE open_time >= %s AND open_time < %s
-            ''', (start_ms, end_ms))
-            
-            symbols = [row[0] for row in cursor.fetchall()]
-            logger.info(f"需要转换{len(symbols)}个交易对的数据")
-            
-            converted_count = 0
-            
-            for symbol in symbols:
-                try:
-                    # 获取该交易对当天的1分钟数据
-                    cursor.execute('''
-                        SELECT open_time, open_price, high_price, low_price, close_price, volume,
-                               close_time, quote_volume, trades_count, taker_buy_base_volume, 
-                               taker_buy_quote_volume
-                        FROM kline_data_1min 
-                        WHERE symbol = %s AND open_time >= %s AND open_time < %s
-                        ORDER BY open_time ASC
-                    ''', (symbol, start_ms, end_ms))
-                    
-                    minute_data = cursor.fetchall()
-                    
-                    if not minute_data:
-                        continue
-                    
-                    # 按30分钟分组聚合数据
-                    aggregated_klines = self._aggregate_klines_to_30min(minute_data, date_start)
-                    
-                    if aggregated_klines:
-                        # 保存30分钟K线数据
-                        success = self.save_kline_data(symbol, aggregated_klines, '30min')
-                        if success:
-                            converted_count += 1
-                            logger.debug(f"成功转换{symbol}的{len(aggregated_klines)}条30分钟K线数据")
-                        
-                except Exception as e:
-                    logger.error(f"转换{symbol}数据失败: {str(e)}")
-                    continue
-            
+                INSERT IGNORE INTO kline_data_30min
+                (symbol, open_time, close_time, open_price, high_price, low_price,
+                 close_price, volume, quote_volume, trades_count,
+                 taker_buy_base_volume, taker_buy_quote_volume)
+                SELECT g.symbol, g.bucket, g.bucket + %s - 1, o.open_price, g.high_price, g.low_price,
+                       c.close_price, g.volume, g.quote_volume, g.trades_count,
+                       g.taker_buy_base_volume, g.taker_buy_quote_volume
+                FROM (
+                    SELECT symbol,
+                           %s + FLOOR((open_time - %s) / %s) * %s AS bucket,
+                           MIN(open_time) AS first_time,
+                           MAX(open_time) AS last_time,
+                           MAX(high_price) AS high_price,
+                           MIN(low_price) AS low_price,
+                           SUM(volume) AS volume,
+                           SUM(quote_volume) AS quote_volume,
+                           SUM(trades_count) AS trades_count,
+                           SUM(taker_buy_base_volume) AS taker_buy_base_volume,
+                           SUM(taker_buy_quote_volume) AS taker_buy_quote_volume
+                    FROM kline_data_1min
+                    WHERE open_time >= %s AND open_time < %s
+                    GROUP BY symbol, bucket
+                ) g
+                JOIN kline_data_1min o ON o.symbol = g.symbol AND o.open_time = g.first_time
+                JOIN kline_data_1min c ON c.symbol = g.symbol AND c.open_time = g.last_time
+            ''', (bucket_ms, start_ms, start_ms, bucket_ms, bucket_ms, start_ms, end_ms))
+
+            inserted_count = cursor.rowcount
+            conn.commit()
             conn.close()
             
-            logger.info(f"✅ {target_date.strftime('%Y-%m-%d')}数据转换完成，成功转换{converted_count}个交易对")
+            logger.info(f"✅ {target_date.strftime('%Y-%m-%d')}数据转换完成，新增{inserted_count}条30分钟K线，"
+                        f"耗时{time.time() - convert_start:.1f}秒")
             return True
             
         except Exception as e:
             logger.error(f"转换{target_date.strftime('%Y-%m-%d')}数据失败: {str(e)}")
             return False
 
-    def _aggregate_klines_to_30min(self, minute_data: List, date_start: datetime) -> List[List]:
-        """
-        将1分钟K线数据聚合为30分钟K线数据
-        
-        Args:
-            minute_data: 1分钟K线数据
-            date_start: 日期开始时间
-            
-        Returns:
-            List[List]: 30分钟K线数据列表
-        """
-        try:
-            aggregated = []
-            
-            # 按30分钟分组
-            for hour in range(24):
-                for minute_group in [0, 30]:  # 每小时的0分和30分开始
-                    group_start = date_start.replace(hour=hour, minute=minute_group)
-                    group_end = group_start + timedelta(minutes=30)
-                    
-                    group_start_ms = int(group_start.timestamp() * 1000)
-                    group_end_ms = int(group_end.timestamp() * 1000)
-                    
-                    # 筛选该30分钟内的数据
-                    group_data = [
-                        row for row in minute_data 
-                        if group_start_ms <= row[0] < group_end_ms
-                    ]
-                    
-                    if not group_data:
-                        continue
-                    
-                    # 聚合数据
-                    open_price = float(group_data[0][1])  # 第一根的开盘价
-                    high_price = max(float(row[2]) for row in group_data)  # 最高价
-                    low_price = min(float(row[3]) for row in group_data)   # 最低价
-                    close_price = float(group_data[-1][4])  # 最后一根的收盘价
-                    volume = sum(float(row[5]) for row in group_data)  # 成交量累加
-                    quote_volume = sum(float(row[7]) for row in group_data)  # 成交额累加
-                    trades_count = sum(int(row[8]) for row in group_data)  # 交易笔数累加
-                    taker_buy_base_volume = sum(float(row[9]) for row in group_data)  # 主动买入成交量累加
-                    taker_buy_quote_volume = sum(float(row[10]) for row in group_data)  # 主动买入成交额累加
-                    
-                    # 构造30分钟K线数据
-                    kline_30min = [
-                        group_start_ms,                    # open_time
-                        str(open_price),                   # open_price
-                        str(high_price),                   # high_price
-                        str(low_price),                    # low_price
-                        str(close_price),                  # close_price
-                        str(volume),                       # volume
-                        group_end_ms - 1,                  # close_time
-                        str(quote_volume),                 # quote_volume
-                        trades_count,                      # trades_count
-                        str(taker_buy_base_volume),        # taker_buy_base_volume
-                        str(taker_buy_quote_volume),       # taker_buy_quote_volume
-                        '0'                                # ignore
-                    ]
-                    
-                    aggregated.append(kline_30min)
-            
-            return aggregated
-            
-        except Exception as e:
-            logger.error(f"聚合K线数据失败: {str(e)}")
-            return []
-
     async def clean_daily_1min_data(self, target_date: datetime) -> bool:
         """
         清理指定日期的1分钟K线数据
@@ -689,14 +821,18 @@ class BinancePriceHighScanner:
             
             start_ms = int(date_start.timestamp() * 1000)
             end_ms = int(date_end.timestamp() * 1000)
+
+            # 分区表：归档并删除目标日期之前的整天分区，同时预建未来分区
+            if self.partition_manager.is_partitioned('kline_data_1min'):
+                self.partition_manager.ensure_future_partitions('kline_data_1min')
+                dropped = self.partition_manager.drop_partitions_before('kline_data_1min', start_ms)
+                logger.info(f"✅ 清理{target_date.strftime('%Y-%m-%d')}之前的1分钟K线数据，删除{dropped}个分区")
+                return True
             
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
 
-            """
-                WHERE open_time >= %s AND open_time < %s
-            """
-            # 清除昨天以前的, 这样最少可以保持1天的数据
+            # 未分区的旧表：清除昨天以前的, 这样最少可以保持1天的数据
             cursor.execute('''
                 DELETE FROM kline_data_1min 
                 WHERE open_time < %s
@@ -713,6 +849,34 @@ class BinancePriceHighScanner:
             logger.error(f"清理{target_date.strftime('%Y-%m-%d')}之前的的1分钟数据失败: {str(e)}")
             return False
 
+    async def clean_expired_30min_data(self) -> bool:
+        """
+        归档并删除超过保留月数的30分钟K线分区（仅分区表）
+
+        Returns:
+            bool: 是否清理成功
+        """
+        try:
+            if not self.partition_manager.is_partitioned('kline_data_30min'):
+                return True
+
+            self.partition_manager.ensure_future_partitions('kline_data_30min')
+
+            cutoff = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            for _ in range(self.kline_30min_retention_months):
+                cutoff = (cutoff - timedelta(days=1)).replace(day=1)
+            self.partition_manager.drop_partitions_before('kline_data_30min', int(cutoff.timestamp() * 1000))
+            return True
+
+        except Exception as e:
+            logger.error(f"清理过期30分钟K线分区失败: {str(e)}")
+            return False
+
+    def partition_kline_tables(self) -> bool:
+        """将现有的K线表改为分区表（一次性迁移）"""
+        results = [self.partition_manager.partition_table(table) for table in ('kline_data_1min', 'kline_data_30min')]
+        return all(results)
+
     async def check_and_handle_day_change(self) -> bool:
         """
         检查并处理跨天情况
@@ -762,6 +926,9 @@ class BinancePriceHighScanner:
                     logger.error(f"❌ {current.strftime('%Y-%m-%d')}数据转换失败")
                 
                 current += timedelta(days=1)
+
+            # 30分钟K线按月分区，超过保留期的分区归档后删除
+            await self.clean_expired_30min_data()
             
             # 更新最后处理日期
             self.set_system_status('last_processed_date', current_date)
@@ -776,7 +943,7 @@ class BinancePriceHighScanner:
     def get_latest_trade_record(self, symbol: str) -> Optional[Dict[str, Any]]:
         """获取某个交易对的最新未平仓交易记录"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -805,7 +972,7 @@ class BinancePriceHighScanner:
     def save_trade_record(self, symbol: str, open_price: float, quantity: float, order_id: str = None) -> bool:
         """保存交易记录"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -840,7 +1007,7 @@ class BinancePriceHighScanner:
             bool: 是否更新成功
         """
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -870,7 +1037,7 @@ class BinancePriceHighScanner:
     def remove_trade_record(self, symbol: str) -> bool:
         """删除交易对的所有交易记录"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
 
             cursor.execute('DELETE FROM trading_records WHERE symbol = %s', (symbol,))
@@ -891,7 +1058,7 @@ class BinancePriceHighScanner:
     def get_all_traded_symbols(self) -> List[str]:
         """获取所有有交易记录的交易对"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             cursor.execute('SELECT DISTINCT symbol FROM trading_records')
@@ -907,7 +1074,7 @@ class BinancePriceHighScanner:
     def get_open_traded_symbols(self) -> List[str]:
         """获取所有有未平仓交易记录的交易对"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             cursor.execute('SELECT DISTINCT symbol FROM trading_records WHERE close_order_status = %s', ('OPEN',))
@@ -923,7 +1090,7 @@ class BinancePriceHighScanner:
     def update_symbol_to_closed_status(self, symbol: str) -> bool:
         """将交易对的所有未平仓记录更新为已平仓状态"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -946,10 +1113,134 @@ class BinancePriceHighScanner:
             logger.error(f"更新{symbol}交易记录状态失败: {str(e)}")
             return False
 
-    async def check_and_update_close_orders(self):
-        """检查并更新所有OPEN状态的平仓订单状态"""
+    def update_close_order_status(self, close_order_id: str, close_order_status: str, close_price: float) -> int:
+        """
+        按平仓订单ID更新仍为OPEN状态的交易记录（用户数据流推送使用）
+
+        Returns:
+            int: 更新的记录数
+        """
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                UPDATE trading_records
+                SET close_price = %s,
+                    close_order_status = %s,
+                    close_time = %s
+                WHERE close_order_id = %s AND close_order_status = %s
+            ''', (close_price, close_order_status, datetime.now(), close_order_id, 'OPEN'))
+
+            updated_count = cursor.rowcount
+            conn.commit()
+            conn.close()
+            return updated_count
+
+        except Exception as e:
+            logger.error(f"更新平仓订单{close_order_id}状态失败: {str(e)}")
+            return 0
+
+    def _handle_order_update(self, order: Dict[str, Any]):
+        """处理用户数据流推送的订单更新（ORDER_TRADE_UPDATE），只关心成交和取消的终态"""
+        order_id = order.get('id')
+        status = order.get('status')
+        if not order_id or status not in ('closed', 'canceled'):
+            return
+
+        if status == 'closed':
+            close_order_status, close_price = 'FILLED', float(order.get('average') or order.get('price') or 0)
+        else:
+            # 取消订单没有成交价格
+            close_order_status, close_price = 'CANCELLED', 0.0
+
+        if self.update_close_order_status(order_id, close_order_status, close_price) > 0:
+            self.unmatched_close_order_updates.pop(order_id, None)
+            if close_order_status == 'FILLED':
+                logger.info(f"✅ {order.get('symbol')} 平仓订单已成交: {order_id}, 成交价格: {close_price}")
+            else:
+                logger.info(f"❌ {order.get('symbol')} 平仓订单已取消: {order_id}")
+        elif self._is_close_order(order):
+            # 平仓单刚提交、记录还未写入；下次检查时再尝试匹配
+            self.unmatched_close_order_updates[order_id] = (close_order_status, close_price, time.time())
+
+    def _is_close_order(self, order: Dict[str, Any]) -> bool:
+        """订单是否为平仓单：已知的平仓订单ID，或减仓方向的订单（开仓单不需要补写）"""
+        if order.get('id') in self.close_order_ids or order.get('reduceOnly'):
+            return True
+        info = order.get('info') or {}
+        position_side = info.get('ps') or info.get('positionSide')
+        return (position_side, order.get('side')) in (('SHORT', 'buy'), ('LONG', 'sell'))
+
+    async def _resubscribe_and_reconcile(self) -> List[Dict[str, Any]]:
+        """重连后先发出订阅，再用REST对账断线期间终结的订单，返回订阅收到的第一批订单更新"""
+        watch = asyncio.ensure_future(self.binance_trading.watch_orders())
+        try:
+            # 让订阅请求先发出
+            await asyncio.sleep(0)
+            await self._reconcile_close_orders()
+            return await watch
+        finally:
+            if not watch.done():
+                watch.cancel()
+
+    async def _watch_close_orders(self):
+        """
+        常驻监听合约用户数据流的订单更新，平仓订单成交或取消时立即更新交易记录
+
+        断线重连时重新订阅并用REST对账一次，补上断线期间终结的订单。
+        """
+        logger.info("📡 开始监听用户数据流订单更新")
+        reconnected = False
+        while True:
+            try:
+                if reconnected:
+                    orders = await self._resubscribe_and_reconcile()
+                    reconnected = False
+                else:
+                    orders = await self.binance_trading.watch_orders()
+                for order in orders:
+                    await asyncio.to_thread(self._handle_order_update, order)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"用户数据流订单监听异常，5秒后重连: {str(e)}")
+                await asyncio.sleep(5)
+                reconnected = True
+
+    async def check_and_update_close_orders(self, listen: bool = True):
+        """
+        检查并更新所有OPEN状态的平仓订单状态
+
+        首次调用时先启动用户数据流监听，再用REST对账一次（两条路径的更新是幂等的，
+        对账期间终结的订单由推送补上）；监听运行期间不再逐个轮询订单，
+        只补写推送先于交易记录到达的订单。
+
+        Args:
+            listen: 是否启动用户数据流监听（一次性任务可关闭）
+        """
+        if self.order_listener_task and not self.order_listener_task.done():
+            for close_order_id, (close_order_status, close_price, received_time) in \
+                    list(self.unmatched_close_order_updates.items()):
+                if self.update_close_order_status(close_order_id, close_order_status, close_price) > 0:
+                    logger.info(f"已补写平仓订单{close_order_id}状态: {close_order_status}")
+                    self.unmatched_close_order_updates.pop(close_order_id, None)
+                elif time.time() - received_time > 3600:
+                    # 超过1小时仍未匹配，视为不属于本系统的平仓订单
+                    self.unmatched_close_order_updates.pop(close_order_id, None)
+            return
+
+        if listen:
+            self.order_listener_task = asyncio.create_task(self._watch_close_orders())
+            # 让监听任务先发出订阅请求
+            await asyncio.sleep(0)
+
+        await self._reconcile_close_orders()
+
+    async def _reconcile_close_orders(self):
+        """用REST逐个查询OPEN状态的平仓订单，与交易所对账"""
+        try:
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
 
             # 获取所有有平仓订单但状态为OPEN的记录
@@ -966,6 +1257,7 @@ class BinancePriceHighScanner:
                 logger.debug("没有需要检查的平仓订单")
                 return
 
+            self.close_order_ids.update(close_order_id for _, _, close_order_id in results)
             updated_count = 0
             for symbol, open_order_id, close_order_id in results:
                 try:
@@ -1008,7 +1300,7 @@ class BinancePriceHighScanner:
     def _get_total_trade_records_count(self) -> int:
         """获取数据库中的交易记录总数"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
             
             cursor.execute('SELECT COUNT(*) FROM trading_records')
@@ -1060,60 +1352,90 @@ class BinancePriceHighScanner:
         self.current_prices[symbol] = current_price
         logger.debug(f"保存{symbol}当前价格: ${current_price:.6f}")
 
-    def update_trade_pnl(self, symbol: str, current_price: float) -> bool:
-        """更新交易记录的盈亏信息（仅更新该交易对的未平仓交易记录）"""
-        try:
-            conn = pymysql.connect(**self.mysql_config)
-            cursor = conn.cursor()
-
-            # 获取该交易对的所有未平仓交易记录
-            cursor.execute('''
-                SELECT id, open_price, quantity, direction
-                FROM trading_records 
-                WHERE symbol = %s AND close_order_status = %s
-                ORDER BY order_time DESC
-            ''', (symbol, 'OPEN'))
-
-            results = cursor.fetchall()
-            if not results:
-                conn.close()
-                return False
-
-            updated_count = 0
-            total_pnl = 0.0
+    def bulk_update_trade_pnl(self, prices: Dict[str, float], symbol: Optional[str] = None,
+                              batch_size: int = PNL_UPDATE_BATCH_SIZE) -> Tuple[int, float]:
+        """
+        批量更新未平仓交易记录的盈亏信息
 
-            # 更新每一条交易记录
-            for record in results:
-                record_id, open_price, quantity, direction = record
+        一次读取所有未平仓记录，用NumPy按当前价格向量化计算涨跌幅和盈亏，
+        再在同一个事务中用 UPDATE ... CASE 分批写回。
 
-                # 计算价格涨跌百分比
-                price_change_percent = ((current_price - float(open_price)) / float(open_price)) * 100
+        Args:
+            prices: 当前价格 {symbol: price}
+            symbol: 只更新该交易对的记录，默认更新全部
+            batch_size: 每条UPDATE语句更新的记录数
 
-                # 计算盈亏额（考虑交易方向）
-                if direction == 'SHORT':
-                    # 卖空：价格下跌为盈利
-                    pnl_amount = (float(open_price) - current_price) * float(quantity)
-                else:
-                    # 做多：价格上涨为盈利
-                    pnl_amount = (current_price - float(open_price)) * float(quantity)
+        Returns:
+            Tuple[int, float]: (更新的记录数, 总盈亏)
+        """
+        conn = self.db_pool.get_connection()
+        try:
+            cursor = conn.cursor()
 
-                # 更新记录
+            if symbol:
                 cursor.execute('''
-                    UPDATE trading_records 
-                    SET current_price = %s, 
-                        price_change_percent = %s, 
-                        pnl_amount = %s, 
-                        price_update_time = %s
-                    WHERE id = %s
-                ''', (current_price, price_change_percent, pnl_amount, datetime.now(), record_id))
+                    SELECT id, symbol, open_price, quantity, direction
+                    FROM trading_records
+                    WHERE symbol = %s AND close_order_status = %s
+                ''', (symbol, 'OPEN'))
+            else:
+                cursor.execute('''
+                    SELECT id, symbol, open_price, quantity, direction
+                    FROM trading_records
+                    WHERE close_order_status = %s
+                ''', ('OPEN',))
+            results = cursor.fetchall()
 
-                if cursor.rowcount > 0:
-                    updated_count += 1
-                    total_pnl += pnl_amount
+            records = [record for record in results if record[1] in prices]
+            if not records:
+                return 0, 0.0
+
+            ids, symbols, open_prices, quantities, directions = zip(*records)
+            open_price = np.array(open_prices, dtype=np.float64)
+            quantity = np.array(quantities, dtype=np.float64)
+            current_price = np.array([prices[s] for s in symbols], dtype=np.float64)
+            # 卖空：价格下跌为盈利；做多：价格上涨为盈利
+            sign = np.where(np.array(directions) == 'SHORT', -1.0, 1.0)
+
+            # 计算价格涨跌百分比和盈亏额
+            price_change_percent = (current_price - open_price) / open_price * 100
+            pnl_amount = (current_price - open_price) * quantity * sign
+
+            update_time = datetime.now()
+            rows = list(zip(ids, current_price.tolist(), price_change_percent.tolist(), pnl_amount.tolist()))
+            batch_size = max(1, batch_size)
+            for i in range(0, len(rows), batch_size):
+                batch = rows[i:i + batch_size]
+                case_sql = ' '.join(['WHEN %s THEN %s'] * len(batch))
+                params = []
+                for column in (1, 2, 3):
+                    for row in batch:
+                        params.extend((row[0], row[column]))
+                params.append(update_time)
+                params.extend(row[0] for row in batch)
+
+                cursor.execute(f'''
+                    UPDATE trading_records
+                    SET current_price = CASE id {case_sql} END,
+                        price_change_percent = CASE id {case_sql} END,
+                        pnl_amount = CASE id {case_sql} END,
+                        price_update_time = %s
+                    WHERE id IN ({', '.join(['%s'] * len(batch))})
+                ''', params)
 
             conn.commit()
+            return len(rows), float(pnl_amount.sum())
+
+        finally:
             conn.close()
 
+    def update_trade_pnl(self, symbol: str, current_price: float) -> bool:
+        """更新交易记录的盈亏信息（仅更新该交易对的未平仓交易记录）"""
+        try:
+            updated_count, total_pnl = self.bulk_update_trade_pnl({symbol: current_price}, symbol=symbol)
+            if updated_count == 0:
+                return False
+
             logger.debug(f"更新{symbol}盈亏信息: 更新{updated_count}条记录, 总盈亏${total_pnl:.2f}")
             return True
 
@@ -1122,20 +1444,18 @@ class BinancePriceHighScanner:
             return False
 
     def update_all_trade_pnl(self):
-        """更新所有未平仓交易记录的盈亏信息"""
+        """更新所有未平仓交易记录的盈亏信息（一次读取、一个事务批量写回）"""
         try:
             open_traded_symbols = self.get_open_traded_symbols()
-            updated_count = 0
-
             for symbol in open_traded_symbols:
-                if symbol in self.current_prices:
-                    current_price = self.current_prices[symbol]
-                    if self.update_trade_pnl(symbol, current_price):
-                        updated_count += 1
-                else:
+                if symbol not in self.current_prices:
                     logger.warning(f"未找到{symbol}的当前价格数据")
 
-            logger.info(f"完成盈亏更新: 更新了{updated_count}个未平仓交易对的盈亏信息")
+            updated_count, total_pnl = self.bulk_update_trade_pnl(self.current_prices)
+            priced_count = sum(1 for symbol in open_traded_symbols if symbol in self.current_prices)
+
+            logger.info(f"完成盈亏更新: 更新了{priced_count}个未平仓交易对的盈亏信息"
+                        f"（{updated_count}条记录, 总盈亏${total_pnl:.2f}）")
 
         except Exception as e:
             logger.error(f"批量更新盈亏信息失败: {str(e)}")
@@ -1143,7 +1463,7 @@ class BinancePriceHighScanner:
     def get_all_trade_pnl_summary(self) -> Dict[str, Any]:
         """获取所有未平仓交易对的盈亏汇总"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -1195,7 +1515,7 @@ class BinancePriceHighScanner:
     def get_symbol_aggregated_pnl_summary(self) -> Dict[str, Any]:
         """获取按交易对合并的未平仓盈亏汇总"""
         try:
-            conn = pymysql.connect(**self.mysql_config)
+            conn = self.db_pool.get_connection()
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -1255,47 +1575,62 @@ class BinancePriceHighScanner:
             logger.error(f"获取按交易对合并的盈亏汇总失败: {str(e)}")
             return {'symbol_positions': [], 'total_pnl': 0.0, 'profitable_symbols': 0, 'losing_symbols': 0}
 
-    def load_cache_with_expiry(self, cache_file: str) -> Dict:
-        """加载带过期时间的缓存数据"""
-        try:
-            if os.path.exists(cache_file):
-                with open(cache_file, 'rb') as f:
-                    cache_data = pickle.load(f)
-
-                # 检查缓存格式和过期时间
-                if isinstance(cache_data, dict) and 'timestamp' in cache_data and 'data' in cache_data:
-                    cache_time = datetime.fromtimestamp(cache_data['timestamp'])
-                    current_time = datetime.now()
-
-                    # 检查是否过期
-                    if (current_time - cache_time).total_seconds() < self.cache_expire_hours * 3600:
-                        logger.info(f"加载有效缓存: {cache_file}，缓存时间: {cache_time.strftime('%Y-%m-%d %H:%M:%S')}")
-                        return cache_data['data']
-                    else:
-                        logger.info(f"缓存已过期: {cache_file}，将重新获取数据")
-                        return {}
-                else:
-                    # 旧格式缓存，清除重新获取
-                    logger.info(f"旧格式缓存: {cache_file}，将重新获取数据")
-                    return {}
-        except Exception as e:
-            logger.warning(f"加载缓存文件 {cache_file} 失败: {str(e)}")
-        return {}
+    def _refresh_in_background(self, refresh_key: str, func, *args):
+        """在后台线程中刷新过期的元数据（同一个键同时只刷新一次）"""
+        with self._refreshing_lock:
+            if refresh_key in self._refreshing_metadata:
+                return
+            self._refreshing_metadata.add(refresh_key)
 
-    def save_cache_with_expiry(self, cache_file: str, data: Dict):
-        """保存带过期时间的缓存数据"""
-        try:
-            cache_data = {
-                'timestamp': time.time(),
-                'data': data
-            }
-            with open(cache_file, 'wb') as f:
-                pickle.dump(cache_data, f)
-            logger.debug(f"缓存已保存: {cache_file}")
-        except Exception as e:
-            logger.error(f"保存缓存文件 {cache_file} 失败: {str(e)}")
+        def run():
+            try:
+                func(*args)
+            except Exception as e:
+                logger.warning(f"后台刷新{refresh_key}失败: {str(e)}")
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing_metadata.discard(refresh_key)
+
+        self.metadata_refresh_executor.submit(run)
+
+    async def prefetch_metadata(self, symbols: List[str]):
+        """
+        并发预取所有缺失的代币信息，并在后台刷新过期的条目
+
+        Args:
+            symbols: 合约交易对列表
+        """
+        base_assets = [symbol.replace('USDT', '') for symbol in symbols]
+        missing = [base_asset for base_asset in base_assets if base_asset not in self.token_info_data]
+
+        # 过期条目继续使用旧值，后台刷新
+        for base_asset in base_assets:
+            if base_asset in self.stale_token_info:
+                self._refresh_in_background(f"token_info:{base_asset}", self._refresh_token_info, base_asset)
+        if not self.symbol_description_data or self.symbol_description_stale:
+            self._refresh_in_background('symbol_description', self._refresh_symbol_descriptions)
+        if not self.products_data or self.products_stale:
+            self._refresh_in_background('products', self._refresh_products)
+
+        if not missing:
+            return
 
+        logger.info(f"📥 并发预取{len(missing)}个代币信息...")
+        start_time = time.time()
+        semaphore = asyncio.Semaphore(self.scan_concurrency)
 
+        async def fetch_one(base_asset: str):
+            async with semaphore:
+                return base_asset, await asyncio.to_thread(self._fetch_token_info, base_asset)
+
+        results = await asyncio.gather(*(fetch_one(base_asset) for base_asset in missing))
+        fetched = {}
+        for base_asset, info in results:
+            info.pop('failed', None)
+            fetched[base_asset] = info
+        self.token_info_data.update(fetched)
+        await asyncio.to_thread(self.token_info_store.set_many, fetched)
+        logger.info(f"✅ 代币信息预取完成: {len(fetched)}个, 耗时{time.time() - start_time:.1f}秒")
 
     def get_all_futures_symbols(self) -> List[str]:
         """
@@ -1324,6 +1659,17 @@ class BinancePriceHighScanner:
 
 
 
+    @staticmethod
+    def _klines_request_weight(limit: int) -> int:
+        """合约K线接口的请求权重（按limit分档）"""
+        if limit < 100:
+            return 1
+        if limit < 500:
+            return 2
+        if limit <= 1000:
+            return 5
+        return 10
+
     def get_recent_klines(self, symbol: str, minutes: int = 10) -> Optional[List[List]]:
         """
         获取最近几分钟的1分钟K线数据
@@ -1360,27 +1706,80 @@ class BinancePriceHighScanner:
             logger.error(f"获取{symbol}最近{minutes}分钟K线数据失败: {str(e)}")
             return None
 
-    async def initialize_kline_data(self, symbol: str) -> bool:
+    @staticmethod
+    def _backfill_checkpoint_key(date_str: str, symbol: str, range_name: str) -> str:
+        """初始化断点在system_status中的键，如 kline_init:20240101:BTCUSDT:1min"""
+        return f"{BACKFILL_CHECKPOINT_PREFIX}{date_str}:{symbol}:{range_name}"
+
+    def _load_backfill_checkpoints(self, date_str: str) -> Dict[str, Dict[str, int]]:
+        """
+        一次读取当天所有交易对的初始化断点，并清理之前日期的断点
+
+        Returns:
+            Dict: {symbol: {'30min': 已完成到的时间戳, '1min': 已完成到的时间戳}}
+        """
+        checkpoints = {}
+        try:
+            conn = self.db_pool.get_connection()
+            cursor = conn.cursor()
+
+            prefix = f"{BACKFILL_CHECKPOINT_PREFIX}{date_str}:"
+            cursor.execute('''
+                DELETE FROM system_status
+                WHERE status_key LIKE %s AND status_key NOT LIKE %s
+            ''', (f"{BACKFILL_CHECKPOINT_PREFIX}%", f"{prefix}%"))
+            conn.commit()
+
+            cursor.execute('''
+                SELECT status_key, status_value FROM system_status WHERE status_key LIKE %s
+            ''', (f"{prefix}%",))
+            for status_key, status_value in cursor.fetchall():
+                symbol, range_name = status_key[len(prefix):].rsplit(':', 1)
+                checkpoints.setdefault(symbol, {})[range_name] = int(status_value)
+
+            conn.close()
+
+        except Exception as e:
+            logger.error(f"读取K线初始化断点失败: {str(e)}")
+
+        return checkpoints
+
+    async def _fetch_klines_page(self, symbol: str, interval: str, start_ms: int, end_ms: int,
+                                 limit: int = 1500) -> List[List]:
+        """按权重限速获取一页K线（在线程中执行阻塞的REST请求）"""
+        await self.weight_limiter.acquire(self._klines_request_weight(limit))
+        return await asyncio.to_thread(
+            self.client.futures_klines,
+            symbol=symbol,
+            interval=interval,
+            startTime=start_ms,
+            endTime=end_ms,
+            limit=limit
+        )
+
+    async def initialize_kline_data(self, symbol: str, checkpoints: Optional[Dict[str, int]] = None) -> bool:
         """
         初始化某个交易对的混合K线数据（历史30分钟+当天1分钟）
         
         Args:
             symbol: 交易对符号
+            checkpoints: 该交易对当天的初始化断点 {'30min': 时间戳, '1min': 时间戳}，已完成的区间不再重复获取
             
         Returns:
             bool: 是否初始化成功
         """
         try:
             logger.info(f"开始初始化{symbol}的混合K线数据...")
+            checkpoints = checkpoints or {}
             
             # 获取当天开始时间
             today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
             
             # 1. 初始化历史30分钟K线数据（30天前到今天00:00）
-            success_30min = await self._initialize_30min_klines(symbol, today_start)
+            success_30min = await self._initialize_30min_klines(symbol, today_start, checkpoints.get('30min'))
             
             # 2. 初始化当天1分钟K线数据（今天00:00到现在）
-            success_1min = await self._initialize_today_1min_klines(symbol, today_start)
+            success_1min = await self._initialize_today_1min_klines(symbol, today_start, checkpoints.get('1min'))
             
             if success_30min and success_1min:
                 logger.info(f"✅ {symbol}混合K线数据初始化完成")
@@ -1393,28 +1792,28 @@ class BinancePriceHighScanner:
             logger.error(f"初始化{symbol}混合K线数据失败: {str(e)}")
             return False
 
-    async def _initialize_30min_klines(self, symbol: str, today_start: datetime) -> bool:
+    async def _initialize_30min_klines(self, symbol: str, today_start: datetime,
+                                       checkpoint: Optional[int] = None) -> bool:
         """初始化历史30分钟K线数据"""
         try:
+            end_ms = int(today_start.timestamp() * 1000)
+            if checkpoint is not None and checkpoint >= end_ms:
+                logger.debug(f"{symbol}历史30分钟K线已初始化，跳过")
+                return True
+
             logger.info(f"初始化{symbol}的历史30分钟K线数据...")
             
-            # 30天的30分钟K线 = 30 * 24 * 2 = 1440条数据
-            end_time = today_start
-            start_time = end_time - timedelta(days=30)
-            
-            # 获取30分钟K线数据
-            klines = self.client.futures_klines(
-                symbol=symbol,
-                interval=Client.KLINE_INTERVAL_30MINUTE,
-                startTime=int(start_time.timestamp() * 1000),
-                endTime=int(end_time.timestamp() * 1000),
-                limit=1500  # 30分钟K线数据量较小，一次可以获取完
-            )
+            # 30天的30分钟K线 = 30 * 24 * 2 = 1440条数据，一次可以获取完
+            start_ms = int((today_start - timedelta(days=30)).timestamp() * 1000)
+            klines = await self._fetch_klines_page(symbol, Client.KLINE_INTERVAL_30MINUTE, start_ms, end_ms)
             
             if klines:
                 # 保存到30分钟K线表
-                success = self.save_kline_data(symbol, klines, '30min')
+                success = await asyncio.to_thread(self.save_kline_data, symbol, klines, '30min')
                 if success:
+                    self.backfill_stats['candles'] += len(klines)
+                    await asyncio.to_thread(self.set_system_status, self._backfill_checkpoint_key(
+                        today_start.strftime('%Y%m%d'), symbol, '30min'), str(end_ms))
                     logger.info(f"✅ {symbol}历史30分钟K线初始化完成，保存{len(klines)}条数据")
                     return True
             
@@ -1425,57 +1824,44 @@ class BinancePriceHighScanner:
             logger.error(f"初始化{symbol}历史30分钟K线失败: {str(e)}")
             return False
 
-    async def _initialize_today_1min_klines(self, symbol: str, today_start: datetime) -> bool:
-        """初始化当天1分钟K线数据"""
+    async def _initialize_today_1min_klines(self, symbol: str, today_start: datetime,
+                                            checkpoint: Optional[int] = None) -> bool:
+        """初始化当天1分钟K线数据（从断点继续，每页完成后更新断点）"""
         try:
-            logger.info(f"初始化{symbol}的当天1分钟K线数据...")
-            
-            # 当天的1分钟K线数据
-            end_time = datetime.now()
-            
-            # 计算当天已过去的分钟数
-            minutes_today = int((end_time - today_start).total_seconds() / 60)
+            today_start_ms = int(today_start.timestamp() * 1000)
+            now_ms = int(time.time() * 1000)
+            # 当前未收盘的分钟不计入断点
+            closed_ms = now_ms - now_ms % 60000
+            start_ms = max(today_start_ms, checkpoint or 0)
             
-            if minutes_today <= 0:
-                logger.info(f"当天刚开始，{symbol}无1分钟数据需要初始化")
+            if start_ms >= closed_ms:
+                logger.debug(f"{symbol}当天1分钟K线无需初始化")
                 return True
+
+            logger.info(f"初始化{symbol}的当天1分钟K线数据...")
+            checkpoint_key = self._backfill_checkpoint_key(today_start.strftime('%Y%m%d'), symbol, '1min')
             
             # 分批获取当天的1分钟数据
             batch_size = 1500
-            batches = (minutes_today + batch_size - 1) // batch_size
+            batch_ms = batch_size * 60000
             total_saved = 0
             
-            for batch in range(batches):
-                try:
-                    # 计算当前批次的时间范围
-                    start_minutes = batch * batch_size
-                    end_minutes = min(start_minutes + batch_size, minutes_today)
-                    
-                    batch_start = today_start + timedelta(minutes=start_minutes)
-                    batch_end = today_start + timedelta(minutes=end_minutes)
-                    
-                    # 获取1分钟K线数据
-                    klines = self.client.futures_klines(
-                        symbol=symbol,
-                        interval=Client.KLINE_INTERVAL_1MINUTE,
-                        startTime=int(batch_start.timestamp() * 1000),
-                        endTime=int(batch_end.timestamp() * 1000),
-                        limit=batch_size
-                    )
-                    
-                    if klines:
-                        # 保存到1分钟K线表
-                        success = self.save_kline_data(symbol, klines, '1min')
-                        if success:
-                            total_saved += len(klines)
-                            logger.debug(f"{symbol}当天1分钟K线第{batch + 1}/{batches}批次: 保存{len(klines)}条数据")
-                    
-                    # 避免API限制
-                    await asyncio.sleep(0.2)
-                    
-                except Exception as e:
-                    logger.error(f"初始化{symbol}当天1分钟K线第{batch + 1}批次失败: {str(e)}")
-                    continue
+            while start_ms < now_ms:
+                batch_end_ms = min(start_ms + batch_ms, now_ms)
+                klines = await self._fetch_klines_page(symbol, Client.KLINE_INTERVAL_1MINUTE,
+                                                       start_ms, batch_end_ms, batch_size)
+                
+                if klines:
+                    # 保存到1分钟K线表，失败时保留断点，下次从这一页重新开始
+                    if not await asyncio.to_thread(self.save_kline_data, symbol, klines, '1min'):
+                        return False
+                    total_saved += len(klines)
+                    self.backfill_stats['candles'] += len(klines)
+                
+                watermark = min(batch_end_ms, closed_ms)
+                if watermark > start_ms:
+                    await asyncio.to_thread(self.set_system_status, checkpoint_key, str(watermark))
+                start_ms = batch_end_ms
             
             logger.info(f"✅ {symbol}当天1分钟K线初始化完成，保存{total_saved}条数据")
             return True
@@ -1485,7 +1871,13 @@ class BinancePriceHighScanner:
             return False
 
     async def initialize_all_kline_data(self):
-        """初始化所有交易对的K线数据"""
+        """
+        初始化所有交易对的K线数据
+
+        多个交易对并发初始化，请求频率由共享的权重限速器控制；每个交易对的
+        30分钟/1分钟区间完成后在system_status中记录断点，中断后重新运行时
+        只获取未完成的部分。
+        """
         logger.info("🚀 开始初始化所有交易对的K线数据...")
         
         # 获取所有合约符号
@@ -1494,30 +1886,72 @@ class BinancePriceHighScanner:
             logger.error("❌ 未获取到合约交易对，初始化终止")
             return
         
-        logger.info(f"📊 需要初始化 {len(symbols)} 个合约交易对的K线数据...")
-        
-        initialized_count = 0
-        
-        for i, symbol in enumerate(symbols, 1):
-            try:
-                logger.info(f"[{i}/{len(symbols)}] 初始化 {symbol}...")
-                
-                # 检查是否已有数据
-                existing_count = self.get_kline_data_count(symbol)
-                if existing_count > 0:
-                    logger.info(f"⏭️ {symbol}已有{existing_count}条K线数据，跳过初始化")
-                    continue
-                
-                # 初始化K线数据
-                success = await self.initialize_kline_data(symbol)
-                if success:
-                    initialized_count += 1
-                
-            except Exception as e:
-                logger.error(f"❌ 初始化{symbol}时发生错误: {str(e)}")
-                continue
-        
-        logger.info(f"✅ K线数据初始化完成! 成功初始化了 {initialized_count} 个交易对")
+        logger.info(f"📊 需要初始化 {len(symbols)} 个合约交易对的K线数据（并发数: {self.scan_concurrency}）...")
+
+        # 一次查询获取已有数据的交易对和当天的初始化断点，逐个检查时直接查字典
+        self.load_kline_inventory()
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        today_start_ms = int(today_start.timestamp() * 1000)
+        date_str = today_start.strftime('%Y%m%d')
+        checkpoints = self._load_backfill_checkpoints(date_str)
+        if checkpoints:
+            logger.info(f"📌 发现{len(checkpoints)}个交易对的初始化断点，从断点继续")
+
+        self.backfill_stats = {'candles': 0}
+        backfill_start = time.time()
+        semaphore = asyncio.Semaphore(self.scan_concurrency)
+        finished = 0
+
+        async def backfill_one(i: int, symbol: str) -> str:
+            """初始化单个交易对，返回 'initialized' / 'skipped' / 'failed'"""
+            nonlocal finished
+            async with semaphore:
+                try:
+                    symbol_checkpoints = checkpoints.get(symbol)
+
+                    # 没有断点但已有当天1分钟K线的交易对视为已初始化（由扫描持续更新）；
+                    # 只有历史数据时（例如保存30分钟K线后、写入断点前中断）仍需补齐当天的1分钟K线
+                    if not symbol_checkpoints:
+                        last_1min = self.get_last_1min_open_time(symbol)
+                        if last_1min is not None and last_1min >= today_start_ms:
+                            logger.info(f"⏭️ {symbol}已有当天1分钟K线数据，跳过初始化")
+                            return 'skipped'
+
+                    logger.info(f"[{i}/{len(symbols)}] 初始化 {symbol}...")
+                    success = await self.initialize_kline_data(symbol, symbol_checkpoints)
+                    return 'initialized' if success else 'failed'
+
+                except Exception as e:
+                    logger.error(f"❌ 初始化{symbol}时发生错误: {str(e)}")
+                    return 'failed'
+
+                finally:
+                    finished += 1
+                    if finished % 50 == 0:
+                        elapsed = max(time.time() - backfill_start, 1e-6)
+                        logger.info(f"⏳ 初始化进度 {finished}/{len(symbols)}, 已获取{self.backfill_stats['candles']}根K线, "
+                                    f"{self.backfill_stats['candles'] / elapsed:.0f}根/秒")
+
+        results = await asyncio.gather(*(backfill_one(i, symbol) for i, symbol in enumerate(symbols, 1)))
+
+        elapsed = max(time.time() - backfill_start, 1e-6)
+        limiter_stats = self.weight_limiter.stats()
+        logger.info(f"✅ K线数据初始化完成! 成功初始化了 {results.count('initialized')} 个交易对, "
+                    f"跳过{results.count('skipped')}个, 失败{results.count('failed')}个")
+        logger.info(f"⏱️ 获取{self.backfill_stats['candles']}根K线, 耗时{elapsed:.1f}秒, "
+                    f"{self.backfill_stats['candles'] / elapsed:.0f}根/秒, 请求权重 {limiter_stats['total_weight']}, "
+                    f"限速等待 {limiter_stats['total_wait_seconds']}秒")
+        if results.count('failed'):
+            logger.warning("⚠️ 部分交易对初始化失败，重新运行 --init 将从断点继续")
+        self._log_kline_ingest_stats()
+
+    def _minutes_to_refresh(self, symbol: str, default_minutes: int = 30, max_minutes: int = 1440) -> int:
+        """根据K线库存中最后一根K线的时间，决定本次需要拉取的1分钟K线数量"""
+        item = self.kline_inventory.get(symbol) if self.kline_inventory else None
+        if not item:
+            return default_minutes
+        behind_minutes = int((time.time() * 1000 - item['last_open_time']) // 60000) + 2
+        return max(default_minutes, min(behind_minutes, max_minutes))
 
     async def update_kline_data(self, symbol: str, minutes: int=30) -> bool:
         """
@@ -1531,14 +1965,20 @@ class BinancePriceHighScanner:
             bool: 是否更新成功
         """
         try:
-            # 获取最近指定分钟的1分钟K线数据
-            klines = self.get_recent_klines(symbol, minutes=minutes)
+            # 获取最近指定分钟的1分钟K线数据（按权重限速，在线程中执行阻塞的REST请求）
+            with self.scan_metrics.stage('kline_fetch', symbol):
+                await self.weight_limiter.acquire(self._klines_request_weight(minutes + 5))
+                klines = await asyncio.to_thread(self.get_recent_klines, symbol, minutes)
             
             if not klines:
                 return False
             
+            # 同步更新内存中的滚动高点索引
+            self.high_index.add_klines(symbol, klines)
+
             # 保存到1分钟K线表（自动去重）
-            success = self.save_kline_data(symbol, klines, '1min')
+            with self.scan_metrics.stage('kline_save', symbol):
+                success = await asyncio.to_thread(self.save_kline_data, symbol, klines, '1min')
             
             if success:
                 logger.debug(f"更新{symbol}的最新1分钟K线数据")
@@ -1549,12 +1989,12 @@ class BinancePriceHighScanner:
             logger.error(f"更新{symbol}1分钟K线数据失败: {str(e)}")
             return False
 
-    def check_price_breakouts(self, klines: List[List]) -> Dict[str, Any]:
+    def check_price_breakouts(self, klines: KlineArray) -> Dict[str, Any]:
         """
         检查最后一根K线价格是否为多个时间区间的最高点（混合K线版本）
         
         Args:
-            klines: 混合K线数据列表（历史30分钟K线 + 当天1分钟K线）
+            klines: 混合K线数据（历史30分钟K线 + 当天1分钟K线），按时间升序
             
         Returns:
             Dict: 包含当前价格和各时间区间突破信息的字典
@@ -1569,7 +2009,10 @@ class BinancePriceHighScanner:
                 }
             }
         """
-        if not klines or len(klines) == 0:
+        if klines is not None and not isinstance(klines, KlineArray):
+            klines = KlineArray.from_rows(klines)
+
+        if klines is None or len(klines) == 0:
             return {
                 'current_price': 0.0,
                 'has_breakout': False,
@@ -1578,8 +2021,8 @@ class BinancePriceHighScanner:
             }
 
         # 获取最后一根K线的收盘价和时间戳
-        current_price = float(klines[-1][4])  # 索引4是收盘价
-        current_time_ms = int(klines[-1][0])  # 索引0是开盘时间戳
+        current_price = float(klines.close[-1])
+        current_time_ms = int(klines.open_time[-1])
         current_time = datetime.fromtimestamp(current_time_ms / 1000)
 
         # 计算各时间区间的截止时间戳
@@ -1592,18 +2035,15 @@ class BinancePriceHighScanner:
         breakouts = {}
         breakout_periods = []
         has_breakout = False
+        last_index = len(klines) - 1
 
         for days, cutoff_time in periods_time.items():
             cutoff_time_ms = int(cutoff_time.timestamp() * 1000)
             
-            # 筛选指定时间区间内的K线（排除最后一根K线）
-            period_klines = []
-            for kline in klines[:-1]:  # 排除最后一根K线
-                kline_time_ms = int(kline[0])
-                if kline_time_ms >= cutoff_time_ms:
-                    period_klines.append(kline)
+            # 指定时间区间内的高低点（排除最后一根K线）
+            high_low = klines.range_high_low(cutoff_time_ms, end_index=last_index)
 
-            if not period_klines:
+            if high_low is None:
                 breakouts[days] = {
                     'is_high': False,
                     'max_high': 0.0,
@@ -1611,32 +2051,20 @@ class BinancePriceHighScanner:
                 }
                 continue
 
-            # 提取该时间区间的高点和低点价格
-            high_prices = [float(kline[2]) for kline in period_klines]  # 索引2是高点价格
-            low_prices = [float(kline[3]) for kline in period_klines]   # 索引3是低点价格
+            max_high, min_low = high_low
 
-            if high_prices and low_prices:
-                max_high = max(high_prices)
-                min_low = min(low_prices)
+            # 检查当前价格是否等于或超过该时间区间的最高点
+            is_high = current_price >= max_high
 
-                # 检查当前价格是否等于或超过该时间区间的最高点
-                is_high = current_price >= max_high
-
-                breakouts[days] = {
-                    'is_high': is_high,
-                    'max_high': max_high,
-                    'min_low': min_low
-                }
+            breakouts[days] = {
+                'is_high': is_high,
+                'max_high': max_high,
+                'min_low': min_low
+            }
 
-                if is_high:
-                    breakout_periods.append(days)
-                    has_breakout = True
-            else:
-                breakouts[days] = {
-                    'is_high': False,
-                    'max_high': 0.0,
-                    'min_low': 0.0
-                }
+            if is_high:
+                breakout_periods.append(days)
+                has_breakout = True
 
         return {
             'current_price': current_price,
@@ -1701,10 +2129,34 @@ class BinancePriceHighScanner:
         Returns:
             Dict: 代币信息
         """
-        # 检查缓存
+        # 检查缓存，过期条目先返回旧值并在后台刷新
         if base_asset in self.token_info_data:
+            if base_asset in self.stale_token_info:
+                self._refresh_in_background(f"token_info:{base_asset}", self._refresh_token_info, base_asset)
+            return self.token_info_data[base_asset]
+
+        return self._refresh_token_info(base_asset)
+
+    def _refresh_token_info(self, base_asset: str) -> Dict[str, Any]:
+        """重新获取代币信息并写入缓存（获取失败时保留已有的旧值）"""
+        with self.scan_metrics.stage('token_info_http', base_asset):
+            info = self._fetch_token_info(base_asset)
+        if info.get('failed') and base_asset in self.token_info_data:
             return self.token_info_data[base_asset]
+        info.pop('failed', None)
+
+        self.token_info_data[base_asset] = info
+        self.stale_token_info.discard(base_asset)
+        self.token_info_store.set(base_asset, info)
+        return info
+
+    def _fetch_token_info(self, base_asset: str) -> Dict[str, Any]:
+        """
+        从Binance获取代币详细信息
 
+        Returns:
+            Dict: 代币信息，获取失败时返回带 failed 标记的默认值
+        """
         try:
             url = f"https://www.binance.com/bapi/apex/v1/friendly/apex/marketing/web/token-info?symbol={base_asset}"
 
@@ -1762,10 +2214,6 @@ class BinancePriceHighScanner:
                 else:
                     info['repo_update_time_str'] = 'Unknown'
 
-                # 缓存数据
-                self.token_info_data[base_asset] = info
-                self.save_cache_with_expiry(self.token_info_cache, self.token_info_data)
-
                 return info
 
         except Exception as e:
@@ -1788,13 +2236,11 @@ class BinancePriceHighScanner:
             'twitter_last_update': 0,
             'twitter_last_update_str': 'Unknown',
             'repo_update_time': 0,
-            'repo_update_time_str': 'Unknown'
+            'repo_update_time_str': 'Unknown',
+            'failed': True
         }
 
-        # 缓存默认值以避免重复请求
-        self.token_info_data[base_asset] = default_info
-        self.save_cache_with_expiry(self.token_info_cache, self.token_info_data)
-
+        # 获取失败返回默认值（没有旧值时同样写入缓存，避免重复请求）
         return default_info
 
     def get_symbol_description(self, symbol: str) -> str:
@@ -1809,31 +2255,16 @@ class BinancePriceHighScanner:
         """
         # 检查缓存
         if symbol in self.symbol_description_data:
+            if self.symbol_description_stale:
+                self._refresh_in_background('symbol_description', self._refresh_symbol_descriptions)
             return self.symbol_description_data[symbol]
 
         try:
-            # 如果缓存为空，一次性获取所有描述
+            # 如果缓存为空，一次性获取所有描述；缓存过期时先使用旧值，后台刷新
             if not self.symbol_description_data:
-                url = "https://bin.bnbstatic.com/api/i18n/-/web/cms/en/symbol-description"
-
-                response = requests.get(url, proxies=proxies, timeout=10)
-                response.raise_for_status()
-
-                data = response.json()
-
-                # 解析所有符号描述
-                if isinstance(data, dict):
-                    for key, value in data.items():
-                        if isinstance(value, str):
-                            # 提取符号名（通常格式为symbol_desc_XXX）
-                            if key.startswith('symbol_desc_'):
-                                symbol_name = key.replace('symbol_desc_', '')
-                                self.symbol_description_data[symbol_name] = value
-
-                # 保存缓存
-                self.save_cache_with_expiry(self.symbol_description_cache, self.symbol_description_data)
-
-                logger.info(f"获取到{len(self.symbol_description_data)}个符号描述")
+                self._refresh_symbol_descriptions()
+            elif self.symbol_description_stale:
+                self._refresh_in_background('symbol_description', self._refresh_symbol_descriptions)
 
             # 从缓存中获取描述
             return self.symbol_description_data.get(symbol.replace('USDT', ''), f"No description for {symbol}")
@@ -1842,6 +2273,38 @@ class BinancePriceHighScanner:
             logger.error(f"获取{symbol}描述失败: {str(e)}")
             return f"Failed to get description for {symbol}"
 
+    def _refresh_symbol_descriptions(self):
+        """一次性获取所有符号描述并写入缓存"""
+        url = "https://bin.bnbstatic.com/api/i18n/-/web/cms/en/symbol-description"
+
+        response = requests.get(url, proxies=proxies, timeout=10)
+        response.raise_for_status()
+
+        data = response.json()
+
+        # 解析所有符号描述
+        descriptions = {}
+        if isinstance(data, dict):
+            for key, value in data.items():
+                if isinstance(value, str):
+                    # 提取符号名（通常格式为symbol_desc_XXX）
+                    if key.startswith('symbol_desc_'):
+                        symbol_name = key.replace('symbol_desc_', '')
+                        descriptions[symbol_name] = value
+
+        if not descriptions:
+            # 接口异常时保留上一次的完整数据，等下次再刷新，避免清空缓存
+            logger.warning(f"符号描述接口返回空数据，继续使用缓存中的{len(self.symbol_description_data)}条描述")
+            return
+
+        # 保存缓存
+        self.symbol_description_store.set_many(descriptions)
+        self.symbol_description_store.delete_missing(descriptions)
+        self.symbol_description_data = descriptions
+        self.symbol_description_stale = False
+
+        logger.info(f"获取到{len(descriptions)}个符号描述")
+
     def get_symbol_tags(self, symbol: str) -> List[str]:
         """
         获取合约标签（带缓存）
@@ -1854,39 +2317,57 @@ class BinancePriceHighScanner:
         """
         # 检查缓存
         if symbol in self.products_data:
+            if self.products_stale:
+                self._refresh_in_background('products', self._refresh_products)
             return self.products_data[symbol]
 
         try:
-            # 如果缓存为空，一次性获取所有产品数据
+            # 如果缓存为空，一次性获取所有产品数据；缓存过期时先使用旧值，后台刷新
             if not self.products_data:
-                url = "https://www.binance.com/bapi/asset/v2/public/asset-service/product/get-products"
+                self._refresh_products()
+            elif self.products_stale:
+                self._refresh_in_background('products', self._refresh_products)
 
-                response = requests.get(url, proxies=proxies, timeout=15)
-                response.raise_for_status()
+            # 从缓存中获取标签
+            return self.products_data.get(symbol, [])
 
-                data = response.json()
+        except Exception as e:
+            logger.error(f"获取{symbol}标签失败: {str(e)}")
+            return []
 
-                if data.get('success') and data.get('data'):
-                    products = data['data']
+    def _refresh_products(self):
+        """一次性获取所有产品标签数据并写入缓存"""
+        url = "https://www.binance.com/bapi/asset/v2/public/asset-service/product/get-products"
 
-                    for product in products:
-                        product_symbol = product.get('s', '')
-                        tags = product.get('tags', [])
+        response = requests.get(url, proxies=proxies, timeout=15)
+        response.raise_for_status()
 
-                        if product_symbol:
-                            self.products_data[product_symbol] = tags
+        data = response.json()
 
-                # 保存缓存
-                self.save_cache_with_expiry(self.products_cache, self.products_data)
+        products_data = {}
+        if isinstance(data, dict) and data.get('success') and data.get('data'):
+            products = data['data']
 
-                logger.info(f"获取到{len(self.products_data)}个产品标签数据")
+            for product in products:
+                product_symbol = product.get('s', '')
+                tags = product.get('tags', [])
 
-            # 从缓存中获取标签
-            return self.products_data.get(symbol, [])
+                if product_symbol:
+                    products_data[product_symbol] = tags
 
-        except Exception as e:
-            logger.error(f"获取{symbol}标签失败: {str(e)}")
-            return []
+        if not products_data:
+            # 接口异常时保留上一次的完整数据，等下次再刷新，避免清空缓存
+            message = data.get('message') if isinstance(data, dict) else None
+            logger.warning(f"产品标签接口返回空数据({message})，继续使用缓存中的{len(self.products_data)}条标签")
+            return
+
+        # 保存缓存
+        self.products_store.set_many(products_data)
+        self.products_store.delete_missing(products_data)
+        self.products_data = products_data
+        self.products_stale = False
+
+        logger.info(f"获取到{len(products_data)}个产品标签数据")
 
     def send_wework_notification(self, symbol: str, analysis_data: Dict[str, Any]):
         """
@@ -1985,33 +2466,14 @@ class BinancePriceHighScanner:
             message_lines = [line for line in message_lines if line is not None and line != ""]
             message_content = "\n".join(message_lines)
 
-            # 准备请求数据
-            payload = {
-                "msgtype": "markdown",
-                "markdown": {
-                    "content": message_content
-                }
-            }
-
-            # 发送请求
-            response = requests.post(
-                self.webhook_url,
-                json=payload,
-                proxies=proxies,
-                timeout=10
+            # 放入通知队列，由后台协程发送，发送成功后保存到文件
+            self.notifier.submit(
+                'wework',
+                message_content,
+                description=f"{symbol}突破通知",
+                on_success=partial(self.save_notification_to_file, symbol, message_content, analysis_data)
             )
 
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('errcode') == 0:
-                    logger.info(f"✅ 成功发送{symbol}突破通知到企业微信群")
-                    # 保存通知内容到文件
-                    self.save_notification_to_file(symbol, message_content, analysis_data)
-                else:
-                    logger.error(f"❌ 发送{symbol}通知失败: {result}")
-            else:
-                logger.error(f"❌ 发送{symbol}通知失败，状态码: {response.status_code}")
-
         except Exception as e:
             logger.error(f"❌ 发送{symbol}企业微信通知失败: {str(e)}")
 
@@ -2115,33 +2577,15 @@ class BinancePriceHighScanner:
             message_lines = [line for line in message_lines if line is not None and line != ""]
             message_content = "\n".join(message_lines)
 
-            # 准备请求数据
-            payload = {
-                "msgtype": "markdown",
-                "markdown": {
-                    "content": message_content
-                }
-            }
-
-            # 发送请求
-            response = requests.post(
-                self.webhook_url,
-                json=payload,
-                proxies=proxies,
-                timeout=10
+            # 放入通知队列，由后台协程发送，发送成功后保存到文件
+            self.notifier.submit(
+                'wework',
+                message_content,
+                description=f"{symbol}过滤通知",
+                on_success=partial(self.save_filtered_notification_to_file, symbol, message_content, analysis_data,
+                                   filter_reason)
             )
 
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('errcode') == 0:
-                    logger.info(f"✅ 成功发送{symbol}过滤通知到企业微信群")
-                    # 保存过滤通知到文件
-                    self.save_filtered_notification_to_file(symbol, message_content, analysis_data, filter_reason)
-                else:
-                    logger.error(f"❌ 发送{symbol}过滤通知失败: {result}")
-            else:
-                logger.error(f"❌ 发送{symbol}过滤通知失败，状态码: {response.status_code}")
-
         except Exception as e:
             logger.error(f"❌ 发送{symbol}过滤企业微信通知失败: {str(e)}")
 
@@ -2211,7 +2655,7 @@ class BinancePriceHighScanner:
                 # 获取上次交易记录来计算价格涨幅
                 latest_records = []
                 try:
-                    conn = pymysql.connect(**self.mysql_config)
+                    conn = self.db_pool.get_connection()
                     cursor = conn.cursor()
                     cursor.execute("""
                         SELECT open_price FROM trading_records 
@@ -2243,33 +2687,14 @@ class BinancePriceHighScanner:
             message_lines = [line for line in message_lines if line is not None and line != ""]
             message_content = "\n".join(message_lines)
 
-            # 准备请求数据
-            payload = {
-                "msgtype": "markdown",
-                "markdown": {
-                    "content": message_content
-                }
-            }
-
-            # 发送请求
-            response = requests.post(
-                self.webhook_url,
-                json=payload,
-                proxies=proxies,
-                timeout=10
+            # 放入通知队列，由后台协程发送，发送成功后保存到文件
+            self.notifier.submit(
+                'wework',
+                message_content,
+                description=f"{symbol}交易通知",
+                on_success=partial(self.save_trading_notification_to_file, symbol, message_content, order_details, analysis_data)
             )
 
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('errcode') == 0:
-                    logger.info(f"✅ 成功发送{symbol}交易通知到企业微信群")
-                    # 保存交易通知到文件
-                    self.save_trading_notification_to_file(symbol, message_content, order_details, analysis_data)
-                else:
-                    logger.error(f"❌ 发送{symbol}交易通知失败: {result}")
-            else:
-                logger.error(f"❌ 发送{symbol}交易通知失败，状态码: {response.status_code}")
-
         except Exception as e:
             logger.error(f"❌ 发送{symbol}交易企业微信通知失败: {str(e)}")
 
@@ -2574,6 +2999,7 @@ class BinancePriceHighScanner:
 
                             if close_order and close_order.get('id'):
                                 close_order_id = close_order.get('id')
+                                self.close_order_ids.add(close_order_id)
                                 logger.info(f"🎯 止盈限价单提交成功: {symbol}")
                                 logger.info(f"止盈订单ID: {close_order_id}")
                                 logger.info(f"止盈价格: ${take_profit_price:.6f}")
@@ -2681,30 +3107,53 @@ class BinancePriceHighScanner:
             logger.error(f"❌ {symbol} {error_msg}")
             return False, error_msg
 
-    async def analyze_symbol(self, symbol: str) -> bool:
+    async def analyze_symbol(self, symbol: str, new_klines: Optional[List[List]] = None) -> bool:
         """
         分析单个交易对
         
         Args:
             symbol: 交易对符号
+            new_klines: 已通过WebSocket收到的新K线（此时不再通过REST拉取，入库由写入任务负责）
             
         Returns:
             bool: 是否发现价格突破
         """
+        with self.scan_metrics.stage('analyze_symbol', symbol):
+            return await self._analyze_symbol(symbol, new_klines)
+
+    async def _analyze_symbol(self, symbol: str, new_klines: Optional[List[List]] = None) -> bool:
+        """analyze_symbol 的实现（外层负责计时）"""
         try:
             logger.debug(f"分析交易对: {symbol}")
 
-            # 先更新最新的K线数据
-            await self.update_kline_data(symbol)
+            # 索引中已有该交易对的历史数据时，无需再从数据库读取
+            use_index = self.high_index.seeded and symbol in self.high_index
 
-            # 从数据库获取30天的1分钟K线数据
-            klines = self.get_kline_data_from_db(symbol, days=self.days_to_analyze)
-            if not klines:
-                logger.warning(f"{symbol}: 数据库中没有K线数据")
-                return False
+            if new_klines is None:
+                # 先更新最新的K线数据（距上次更新较久时多拉取，补齐缺口）
+                await self.update_kline_data(symbol, minutes=self._minutes_to_refresh(symbol))
+            else:
+                self.high_index.add_klines(symbol, new_klines)
+
+            if use_index:
+                # 检查多个时间区间的价格突破（内存索引）
+                with self.scan_metrics.stage('breakout_check', symbol):
+                    breakout_result = self.high_index.check_breakouts(symbol)
+            else:
+                # 从数据库获取30天的混合K线数据
+                with self.scan_metrics.stage('kline_db_read', symbol):
+                    klines = await asyncio.to_thread(self.get_kline_data_from_db, symbol, self.days_to_analyze)
+                if len(klines) == 0:
+                    logger.warning(f"{symbol}: 数据库中没有K线数据")
+                    return False
+
+                # 补充到索引中，后续扫描直接使用内存数据
+                if self.high_index.seeded:
+                    self.high_index.add_klines(symbol, klines)
 
-            # 检查多个时间区间的价格突破
-            breakout_result = self.check_price_breakouts(klines)
+                # 检查多个时间区间的价格突破
+                with self.scan_metrics.stage('breakout_check', symbol):
+                    breakout_result = self.check_price_breakouts(klines)
 
             current_price = breakout_result['current_price']
 
@@ -2723,11 +3172,13 @@ class BinancePriceHighScanner:
             base_asset = symbol.replace('USDT', '')
 
             # 获取补充信息
-            funding_rate_info = await self.get_funding_rate_info(symbol)
-            token_info = self.get_token_info(base_asset)
-            description = self.get_symbol_description(base_asset)
-            tags = self.get_symbol_tags(symbol)
-            kline_start_time = self.get_kline_start_time(symbol)
+            with self.scan_metrics.stage('funding_rate', symbol):
+                funding_rate_info = await self.get_funding_rate_info(symbol)
+            with self.scan_metrics.stage('metadata', symbol):
+                token_info = await asyncio.to_thread(self.get_token_info, base_asset)
+                description = await asyncio.to_thread(self.get_symbol_description, base_asset)
+                tags = await asyncio.to_thread(self.get_symbol_tags, symbol)
+                kline_start_time = self.get_kline_start_time(symbol)
 
             # 组合分析数据
             analysis_data = {
@@ -2742,12 +3193,15 @@ class BinancePriceHighScanner:
             }
 
             # 发送通知
-            self.send_wework_notification(symbol, analysis_data)
+            with self.scan_metrics.stage('notification', symbol):
+                self.send_wework_notification(symbol, analysis_data)
+            self.scan_metrics.incr('breakouts')
 
             # 如果启用了交易功能，检查并执行交易
             if self.enable_trading:
                 try:
-                    trade_executed, reason = await self.check_and_execute_trade(symbol, analysis_data)
+                    with self.scan_metrics.stage('trade', symbol):
+                        trade_executed, reason = await self.check_and_execute_trade(symbol, analysis_data)
                     if trade_executed:
                         logger.info(f"💰 {symbol} 交易执行成功: {reason}")
                     else:
@@ -2772,59 +3226,86 @@ class BinancePriceHighScanner:
 
         # 首先检查并处理跨天情况
         logger.info("🔍 检查跨天处理...")
-        day_change_success = await self.check_and_handle_day_change()
+        with self.scan_metrics.stage('day_change'):
+            day_change_success = await self.check_and_handle_day_change()
         if not day_change_success:
             logger.warning("⚠️ 跨天处理失败，但继续执行扫描")
 
+        # 首次扫描时加载滚动高点索引，之后的扫描不再读取历史K线
+        if not self.high_index.seeded:
+            logger.info("📥 加载滚动高点索引...")
+            with self.scan_metrics.stage('index_seed'):
+                self.high_index.seed_from_db(self.db_pool)
+
         # 检查并更新平仓订单状态
         logger.info("🔍 检查平仓订单状态...")
-        await self.check_and_update_close_orders()
+        with self.scan_metrics.stage('close_orders'):
+            await self.check_and_update_close_orders()
 
         # 记录扫描开始时的交易记录数量（用于计算新增交易数）
         initial_trade_count = 0
         if self.enable_trading:
             logger.info("🧹 清理交易记录...")
-            await self.clean_trade_records()
+            with self.scan_metrics.stage('clean_trade_records'):
+                await self.clean_trade_records()
             # 获取扫描开始时的交易记录数量
             initial_trade_count = self._get_total_trade_records_count()
 
         # 获取所有合约符号
-        symbols = self.get_all_futures_symbols()
+        with self.scan_metrics.stage('fetch_symbols'):
+            symbols = self.get_all_futures_symbols()
         if not symbols:
             logger.error("❌ 未获取到合约交易对，扫描终止")
+            self._report_scan_metrics()
             return
 
-        logger.info(f"📊 开始扫描 {len(symbols)} 个合约交易对...")
+        # 本轮扫描的K线库存（一次查询，替代逐个交易对的COUNT查询）
+        with self.scan_metrics.stage('kline_inventory'):
+            self.load_kline_inventory()
 
-        found_count = 0
-        processed_count = 0
-        no_data_count = 0
+        # 后台预取缺失的代币信息，不阻塞扫描
+        if self.metadata_prefetch_task is None or self.metadata_prefetch_task.done():
+            self.metadata_prefetch_task = asyncio.create_task(self.prefetch_metadata(symbols))
 
-        for i, symbol in enumerate(symbols, 1):
-            try:
-                logger.info(f"📈 [{i}/{len(symbols)}] 正在分析 {symbol}...")
+        logger.info(f"📊 开始扫描 {len(symbols)} 个合约交易对（并发数: {self.scan_concurrency}）...")
+
+        scan_start = time.time()
+        semaphore = asyncio.Semaphore(self.scan_concurrency)
+
+        async def scan_one(i: int, symbol: str) -> str:
+            """分析单个交易对，返回 'found' / 'processed' / 'no_data' / 'error'"""
+            async with semaphore:
+                try:
+                    logger.info(f"📈 [{i}/{len(symbols)}] 正在分析 {symbol}...")
 
-                # 检查数据库中是否有K线数据
-                kline_count = self.get_kline_data_count(symbol)
-                if kline_count == 0:
-                    logger.warning(f"⚠️ {symbol} 数据库中无K线数据，请先运行初始化")
-                    no_data_count += 1
-                    continue
+                    # 检查数据库中是否有K线数据
+                    kline_count = self.get_kline_data_count(symbol)
+                    if kline_count == 0:
+                        logger.warning(f"⚠️ {symbol} 数据库中无K线数据，请先运行初始化")
+                        return 'no_data'
 
-                # 分析交易对
-                is_breakthrough = await self.analyze_symbol(symbol)
+                    # 分析交易对（请求频率由权重限速器控制）
+                    is_breakthrough = await self.analyze_symbol(symbol)
+                    return 'found' if is_breakthrough else 'processed'
 
-                if is_breakthrough:
-                    found_count += 1
+                except Exception as e:
+                    logger.error(f"❌ 处理{symbol}时发生错误: {str(e)}")
+                    return 'error'
 
-                processed_count += 1
+        with self.scan_metrics.stage('analyze_all'):
+            results = await asyncio.gather(*(scan_one(i, symbol) for i, symbol in enumerate(symbols, 1)))
 
-                # 避免API限制，添加短暂延迟
-                await asyncio.sleep(0.1)  # 缩短延迟，因为每次只获取10分钟数据
+        found_count = results.count('found')
+        processed_count = found_count + results.count('processed')
+        no_data_count = results.count('no_data')
+        self.scan_metrics.set('symbols_processed', processed_count)
+        self.scan_metrics.set('symbols_no_data', no_data_count)
+        self.scan_metrics.set('symbols_error', results.count('error'))
 
-            except Exception as e:
-                logger.error(f"❌ 处理{symbol}时发生错误: {str(e)}")
-                continue
+        limiter_stats = self.weight_limiter.stats()
+        logger.info(f"⏱️ 交易对分析耗时 {time.time() - scan_start:.1f}秒, 请求权重 {limiter_stats['total_weight']}, "
+                    f"分钟峰值 {limiter_stats['max_used_weight']}/{self.weight_limiter.max_weight}, "
+                    f"限速等待 {limiter_stats['total_wait_seconds']}秒")
 
         # 计算本次扫描期间执行的交易数量
         final_trade_count = self._get_total_trade_records_count() if self.enable_trading else 0
@@ -2835,9 +3316,201 @@ class BinancePriceHighScanner:
             logger.warning(f"⚠️ {no_data_count} 个交易对缺少K线数据，请使用 --init 参数进行初始化")
         if self.enable_trading:
             logger.info(f"💰 执行了 {new_trades_count} 笔交易")
+        self._log_kline_ingest_stats()
+
+        # 清理索引中超出分析天数的分桶
+        self.high_index.prune()
 
         # 更新并显示盈亏信息（不需要重新获取价格，使用扫描过程中的价格数据）
-        await self.update_pnl_only(fetch_prices=False)
+        with self.scan_metrics.stage('pnl_update'):
+            await self.update_pnl_only(fetch_prices=False)
+
+        self._report_scan_metrics()
+
+    @staticmethod
+    def _stream_kline_to_list(k: Dict[str, Any]) -> List:
+        """将WebSocket kline事件中的K线转换为Binance REST接口格式"""
+        return [
+            k['t'],     # open_time
+            k['o'],     # open_price
+            k['h'],     # high_price
+            k['l'],     # low_price
+            k['c'],     # close_price
+            k['v'],     # volume
+            k['T'],     # close_time
+            k['q'],     # quote_volume
+            k['n'],     # trades_count
+            k['V'],     # taker_buy_base_volume
+            k['Q'],     # taker_buy_quote_volume
+            '0'         # ignore
+        ]
+
+    async def _consume_kline_stream(self, bsm: BinanceSocketManager, symbols: List[str],
+                                    pending_klines: Dict[str, List[List]], analysis_queue: asyncio.Queue):
+        """
+        订阅一组交易对的<symbol>@kline_1m组合流，K线收盘时交给分析队列检查突破
+
+        接收循环只负责解析和入队，不等待分析完成，避免分析耗时导致WebSocket消息积压。
+
+        Args:
+            bsm: WebSocket管理器
+            symbols: 本连接订阅的交易对
+            pending_klines: 待批量写入数据库的已收盘K线 {symbol: [kline, ...]}
+            analysis_queue: 待分析的已收盘K线队列 (symbol, kline)
+        """
+        streams = [f"{symbol.lower()}@kline_1m" for symbol in symbols]
+
+        while True:
+            try:
+                async with bsm.futures_multiplex_socket(streams) as stream:
+                    logger.info(f"📡 已订阅 {len(streams)} 个1分钟K线流")
+                    while True:
+                        res = await stream.recv()
+                        data = res.get('data', {}) if isinstance(res, dict) else {}
+                        k = data.get('k')
+                        if not k:
+                            if isinstance(res, dict) and res.get('e') == 'error':
+                                raise Exception(f"K线流返回错误: {res}")
+                            continue
+
+                        # 只处理已收盘的K线
+                        if not k.get('x'):
+                            continue
+
+                        symbol = data.get('s') or k.get('s')
+                        kline = self._stream_kline_to_list(k)
+                        pending_klines.setdefault(symbol, []).append(kline)
+                        analysis_queue.put_nowait((symbol, kline))
+                        self.stream_stats['closed_klines'] += 1
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"K线流连接异常，5秒后重连: {str(e)}")
+                await asyncio.sleep(5)
+
+    async def _analyze_stream_klines(self, analysis_queue: asyncio.Queue):
+        """分析队列的工作协程，流式模式启动scan_concurrency个，与扫描模式的并发数一致"""
+        while True:
+            symbol, kline = await analysis_queue.get()
+            try:
+                if await self.analyze_symbol(symbol, new_klines=[kline]):
+                    self.stream_stats['breakouts'] += 1
+            except Exception as e:
+                logger.error(f"❌ 分析{symbol}的K线流数据时发生错误: {str(e)}")
+            finally:
+                analysis_queue.task_done()
+
+    async def _save_pending_klines(self, pending_klines: Dict[str, List[List]]):
+        """将待写入的K线逐个交易对入库，写入失败的K线放回pending_klines等下次重试"""
+        for symbol in list(pending_klines):
+            klines = pending_klines.pop(symbol)
+            with self.scan_metrics.stage('kline_save', symbol):
+                saved = await asyncio.to_thread(self.save_kline_data, symbol, klines, '1min')
+            if not saved:
+                # 写入期间可能收到了新的K线，旧K线放在前面保持时间顺序
+                pending_klines[symbol] = klines + pending_klines.get(symbol, [])
+                logger.warning(f"{symbol}: {len(klines)}根K线写入失败，下次写入时重试")
+
+    async def _flush_stream_klines(self, pending_klines: Dict[str, List[List]], flush_seconds: float,
+                                   metrics_seconds: float = 300):
+        """定期将收到的已收盘K线批量写入数据库，处理跨天，并按metrics_seconds间隔输出耗时统计"""
+        last_date = datetime.now().strftime('%Y-%m-%d')
+        last_metrics_report = time.time()
+
+        while True:
+            await asyncio.sleep(flush_seconds)
+
+            await self._save_pending_klines(pending_klines)
+
+            if time.time() - last_metrics_report >= metrics_seconds:
+                self._report_scan_metrics()
+                last_metrics_report = time.time()
+
+            current_date = datetime.now().strftime('%Y-%m-%d')
+            if current_date != last_date:
+                await self.check_and_handle_day_change()
+                self.high_index.prune()
+                self._log_kline_ingest_stats()
+                logger.info(f"📡 K线流统计: 收盘K线 {self.stream_stats['closed_klines']} 根, "
+                            f"价格突破 {self.stream_stats['breakouts']} 次")
+                last_date = current_date
+
+    async def run_stream(self, flush_seconds: float = 5.0, streams_per_connection: int = 200):
+        """
+        WebSocket流式模式：订阅所有合约的1分钟K线，K线收盘即检查突破
+
+        Args:
+            flush_seconds: 已收盘K线批量写入数据库的间隔（秒）
+            streams_per_connection: 每个WebSocket连接订阅的流数量（Binance单连接上限200）
+        """
+        # 先执行一次完整扫描：处理跨天、补齐REST数据并加载内存索引
+        await self.run_scan()
+
+        symbols = self.get_all_futures_symbols()
+        if not symbols:
+            logger.error("❌ 未获取到合约交易对，流式模式终止")
+            return
+
+        client = await AsyncClient.create(
+            api_key=binance_api_key,
+            api_secret=binance_api_secret,
+            https_proxy=proxies.get('https')
+        )
+        bsm = BinanceSocketManager(client)
+
+        self.stream_stats = {'closed_klines': 0, 'breakouts': 0}
+        pending_klines: Dict[str, List[List]] = {}
+        analysis_queue: asyncio.Queue = asyncio.Queue()
+
+        tasks = [asyncio.create_task(self._flush_stream_klines(pending_klines, flush_seconds))]
+        tasks.extend(asyncio.create_task(self._analyze_stream_klines(analysis_queue))
+                     for _ in range(self.scan_concurrency))
+        connection_count = 0
+        for i in range(0, len(symbols), streams_per_connection):
+            tasks.append(asyncio.create_task(
+                self._consume_kline_stream(bsm, symbols[i:i + streams_per_connection], pending_klines,
+                                           analysis_queue)))
+            connection_count += 1
+
+        logger.info(f"📡 流式模式启动: {len(symbols)} 个交易对, {connection_count} 个WebSocket连接, "
+                    f"{self.scan_concurrency} 个分析协程")
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # 写入剩余的K线
+            await self._save_pending_klines(pending_klines)
+            await client.close_connection()
+
+    def run_backtest(self, days: int = 60):
+        """
+        用数据库中的K线回测突破卖空策略，按参数组合和交易对输出报告
+
+        Args:
+            days: 回测加载的历史天数（需要包含突破区间本身的天数）
+        """
+        logger.info(f"🧪 开始回测最近{days}天的价格突破卖空策略...")
+
+        # 市值排名过滤使用缓存中的当前排名（无缓存时不过滤）
+        token_ranks = {base_asset: info.get('market_rank', 0) for base_asset, info in self.token_info_data.items()}
+        backtester = BreakoutBacktester(
+            self.db_pool,
+            leverage=self.leverage,
+            margin_amount=self.margin_amount,
+            min_launch_days=self.min_launch_days,
+            token_ranks=token_ranks or None,
+            max_market_rank=self.max_market_rank
+        )
+        if backtester.load_klines(days) == 0:
+            logger.error("❌ 数据库中没有K线数据，请先运行 --init 初始化")
+            return
+
+        summary, per_symbol = backtester.run(min_price_increases=sorted({0.1, self.min_price_increase, 0.3}))
+        backtester.report(summary, per_symbol, os.path.join(project_root, 'trade/backtest'),
+                          live_params=(7, 0.05, self.min_price_increase))
 
     async def update_pnl_only(self, fetch_prices: bool = True):
         """更新盈亏信息并显示汇总
@@ -2865,8 +3538,8 @@ class BinancePriceHighScanner:
                     
                     # 从数据库获取最新的K线数据来获取当前价格
                     klines = self.get_kline_data_from_db(symbol, days=1)  # 只获取1天的数据就够了
-                    if klines and len(klines) > 0:
-                        current_price = float(klines[-1][4])  # 最后一根K线的收盘价
+                    if len(klines) > 0:
+                        current_price = float(klines.close[-1])  # 最后一根K线的收盘价
                         self.save_current_price(symbol, current_price)
                         logger.debug(f"获取到{symbol}当前价格: ${current_price:.6f}")
                         updated_count += 1
@@ -2933,8 +3606,51 @@ class BinancePriceHighScanner:
         else:
             logger.info("📊 当前无按交易对合并的持仓记录")
 
+    def _log_kline_ingest_stats(self):
+        """输出并重置本轮K线写入统计"""
+        stats = self.kline_ingest_stats
+        logger.info(f"💾 K线写入统计: 新增 {stats['inserted']} 条, 重复跳过 {stats['duplicates']} 条")
+        self.kline_ingest_stats = {'inserted': 0, 'duplicates': 0}
+
+    def _metrics_counters(self) -> Dict[str, float]:
+        """限速器、连接池和通知分发器的累计计数（输出时减去上一轮的值，得到本轮的增量）"""
+        limiter_stats = self.weight_limiter.stats()
+        pool_stats = self.db_pool.stats()
+        return {
+            'api_weight': limiter_stats['total_weight'],
+            'api_rate_limit_wait_seconds': limiter_stats['total_wait_seconds'],
+            'db_queries': pool_stats['queries'],
+            'db_checkouts': pool_stats['checkouts'],
+            'notifications_queued': self.notifier.stats['queued'],
+        }
+
+    def _report_scan_metrics(self):
+        """输出本轮分阶段耗时汇总表，写入Prometheus文本文件，然后开始新一轮统计"""
+        counters = self._metrics_counters()
+        for name, value in counters.items():
+            self.scan_metrics.set(name, value - self._metrics_baseline.get(name, 0))
+        self.scan_metrics.set('db_pool_in_use', self.db_pool.stats()['in_use'])
+
+        self.scan_metrics.log_summary()
+        self.scan_metrics.write_prometheus(self.metrics_file)
+
+        self.scan_metrics.reset()
+        self._metrics_baseline = counters
+
     async def close(self):
         """关闭交易所连接，释放资源"""
+        # 等待队列中的通知发送完成
+        await self.notifier.close()
+        if self.order_listener_task:
+            self.order_listener_task.cancel()
+            # 等待监听任务退出后再关闭数据库和交易所连接
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.order_listener_task
+        if self.metadata_prefetch_task:
+            self.metadata_prefetch_task.cancel()
+        self.metadata_refresh_executor.shutdown(wait=False)
+        logger.info(f"🗄️ 数据库连接池统计: {self.db_pool.stats()}")
+        self.db_pool.close_all()
         if self.binance_trading:
             try:
                 await self.binance_trading.close()
@@ -2967,6 +3683,45 @@ def parse_arguments():
         action='store_true',
         help='初始化所有交易对的K线数据 (首次运行必须)'
     )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='WebSocket流式模式，订阅1分钟K线流，K线收盘即检查突破'
+    )
+    parser.add_argument(
+        '--interval',
+        type=int,
+        default=0,
+        help='循环扫描间隔分钟数，进程常驻并复用内存索引 (默认: 0，只扫描一次)'
+    )
+    parser.add_argument(
+        '--partition',
+        action='store_true',
+        help='将现有的K线表改为分区表 (1分钟按天、30分钟按月，一次性操作)'
+    )
+    parser.add_argument(
+        '--backtest',
+        action='store_true',
+        help='回测模式，用数据库中的K线回放突破卖空策略并输出参数对比报告'
+    )
+    parser.add_argument(
+        '--backtest-days',
+        type=int,
+        default=60,
+        help='回测加载的历史天数 (默认: 60)'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=10,
+        help='并发分析/初始化的交易对数量 (默认: 10)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=1000,
+        help='K线批量写入数据库时每批的行数 (默认: 1000)'
+    )
     return parser.parse_args()
 
 
@@ -2980,19 +3735,32 @@ async def main():
         if args.init:
             logger.info("🚀 启动模式: 初始化K线数据")
             logger.warning("⚠️  此操作将花费较长时间，请耐心等待...")
-            scanner = BinancePriceHighScanner(days_to_analyze=args.days, enable_trading=False)
+            scanner = BinancePriceHighScanner(days_to_analyze=args.days, enable_trading=False,
+                                              kline_batch_size=args.batch_size,
+                                              scan_concurrency=args.concurrency)
             await scanner.initialize_all_kline_data()
         elif args.pnl_only:
             logger.info("🔄 启动模式: 仅更新盈亏信息")
-            scanner = BinancePriceHighScanner(days_to_analyze=args.days, enable_trading=False)
+            scanner = BinancePriceHighScanner(days_to_analyze=args.days, enable_trading=False,
+                                              kline_batch_size=args.batch_size)
             
             # 检查并更新平仓订单状态
             logger.info("🔍 检查平仓订单状态...")
-            await scanner.check_and_update_close_orders()
+            await scanner.check_and_update_close_orders(listen=False)
             
             logger.info("🧹 清理交易记录...")
             await scanner.clean_trade_records()
             await scanner.update_pnl_only(fetch_prices=True)
+        elif args.partition:
+            logger.info("🔧 启动模式: K线表分区迁移")
+            scanner = BinancePriceHighScanner(days_to_analyze=args.days, enable_trading=False,
+                                              kline_batch_size=args.batch_size)
+            await asyncio.to_thread(scanner.partition_kline_tables)
+        elif args.backtest:
+            logger.info("🧪 启动模式: 策略回测")
+            scanner = BinancePriceHighScanner(days_to_analyze=args.days, enable_trading=False,
+                                              kline_batch_size=args.batch_size)
+            await asyncio.to_thread(scanner.run_backtest, args.backtest_days)
         else:
             logger.info(f"🔄 启动模式: 价格突破扫描")
             logger.info(f"启动参数: 历史分析天数 = {args.days}天, 自动交易 = {'启用' if args.trade else '禁用'}")
@@ -3001,8 +3769,20 @@ async def main():
             if args.trade:
                 logger.warning("⚠️  自动交易功能已启用! 请确保您了解交易风险!")
 
-            scanner = BinancePriceHighScanner(days_to_analyze=args.days, enable_trading=args.trade)
-            await scanner.run_scan()
+            scanner = BinancePriceHighScanner(days_to_analyze=args.days, enable_trading=args.trade,
+                                              kline_batch_size=args.batch_size,
+                                              scan_concurrency=args.concurrency)
+            if args.stream:
+                logger.info("📡 WebSocket流式模式")
+                await scanner.run_stream()
+            elif args.interval > 0:
+                logger.info(f"🔁 循环扫描模式，间隔 {args.interval} 分钟")
+                while True:
+                    scan_start = time.time()
+                    await scanner.run_scan()
+                    await asyncio.sleep(max(0.0, args.interval * 60 - (time.time() - scan_start)))
+            else:
+                await scanner.run_scan()
 
     except KeyboardInterrupt:
         logger.info("❌ 用户中断执行")
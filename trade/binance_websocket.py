@@ -1,16 +1,33 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import argparse
 import asyncio
 import sqlite3
 import json
+import time
 from datetime import datetime
+from typing import List, Optional, Tuple
 from binance import AsyncClient, BinanceSocketManager
 from config import binance_api_key, binance_api_secret, proxies
+from tools.premium_index_snapshot import PremiumIndexPublisher
+from trade.mark_price_store import DB_PATH, DEFAULT_KEYFRAME_SECONDS, MarkPriceChangeFilter, init_settings_table
 
 
-def init_database():
-    """初始化数据库和表结构"""
-    conn = sqlite3.connect('trading_records.db')
+def init_database(db_path: str = DB_PATH, keyframe_seconds: int = 1) -> sqlite3.Connection:
+    """
+    初始化数据库和表结构，返回写入使用的长连接（WAL模式）
+
+    Args:
+        db_path: 数据库路径
+        keyframe_seconds: 每个交易对两行之间的最大间隔（逐秒记录时为1），读取时据此前向填充
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    # WAL模式下写入不阻塞其他进程读取，NORMAL同步级别足够保证WAL的一致性
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
     cursor = conn.cursor()
-    
+
     # 创建合约标记价格表
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS binance_mark_prices (
@@ -26,99 +43,249 @@ def init_database():
             UNIQUE(symbol, event_time)
         )
     ''')
-    
+
     # 创建索引以提高查询性能
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_symbol_time ON binance_mark_prices(symbol, event_time)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_created_at ON binance_mark_prices(created_at)')
-    
+
     conn.commit()
-    conn.close()
+    init_settings_table(conn, keyframe_seconds)
     print("数据库初始化完成")
+    return conn
 
 
-def save_mark_price_data(data_list):
-    """保存标记价格数据到数据库"""
-    conn = sqlite3.connect('trading_records.db')
-    cursor = conn.cursor()
-    
-    saved_count = 0
-    for item in data_list:
+def mark_price_row(item: dict) -> Tuple:
+    """将markPriceUpdate事件转换为binance_mark_prices表的一行"""
+    return (
+        item.get('E'),  # event_time
+        item.get('s'),  # symbol
+        float(item.get('p', 0)),  # mark_price
+        float(item.get('i', 0)) if item.get('i') else None,  # index_price
+        float(item.get('P', 0)) if item.get('P') else None,  # estimated_settle_price
+        float(item.get('r', 0)) if item.get('r') else None,  # funding_rate
+        item.get('T')  # next_funding_time
+    )
+
+
+def save_mark_price_data(conn: sqlite3.Connection, rows: List[Tuple]) -> int:
+    """在一个事务中批量保存标记价格数据，返回写入的行数"""
+    with conn:
+        conn.executemany('''
+            INSERT OR REPLACE INTO binance_mark_prices
+            (event_time, symbol, mark_price, index_price,
+             estimated_settle_price, funding_rate, next_funding_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+    return len(rows)
+
+
+class MarkPriceWriter:
+    """
+    标记价格写入任务
+
+    接收循环只把消息放入有界队列，由单独的写入协程按时间窗口合并为一个批次，
+    在线程中用长连接 executemany 写入，recv() 不会被数据库写入阻塞。
+    队列满时丢弃新消息并计数，定期打印写入统计。
+    指定 change_filter 时只写入有变化的行和关键帧（见 trade/mark_price_store.py）。
+    """
+
+    def __init__(self, conn: sqlite3.Connection, change_filter: Optional[MarkPriceChangeFilter] = None,
+                 max_backlog: int = 300, batch_seconds: float = 1.0, max_batch_rows: int = 20000,
+                 stats_seconds: float = 60):
+        """
+        Args:
+            conn: 数据库长连接
+            change_filter: 变化记录过滤器，None表示逐秒全部写入
+            max_backlog: 队列中最多积压的消息数（每条消息约600行）
+            batch_seconds: 每个批次最长收集的秒数
+            max_batch_rows: 每个批次最多写入的行数
+            stats_seconds: 打印统计的间隔（秒）
+        """
+        self.conn = conn
+        self.change_filter = change_filter
+        self.batch_seconds = batch_seconds
+        self.max_batch_rows = max_batch_rows
+        self.stats_seconds = stats_seconds
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_backlog)
+        self.task: Optional[asyncio.Task] = None
+
+        self.stats = {'messages': 0, 'rows': 0, 'skipped': 0, 'batches': 0, 'dropped': 0, 'errors': 0}
+        self._last_stats_time = time.time()
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    def submit(self, data_list: List[dict]) -> bool:
+        """放入一条消息（不等待写入），队列满时丢弃并返回False"""
         try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO binance_mark_prices 
-                (event_time, symbol, mark_price, index_price, 
-                 estimated_settle_price, funding_rate, next_funding_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                item.get('E'),  # event_time
-                item.get('s'),  # symbol
-                float(item.get('p', 0)),  # mark_price
-                float(item.get('i', 0)) if item.get('i') else None,  # index_price
-                float(item.get('P', 0)) if item.get('P') else None,  # estimated_settle_price
-                float(item.get('r', 0)) if item.get('r') else None,  # funding_rate
-                item.get('T')  # next_funding_time
-            ))
-            saved_count += 1
+            self.queue.put_nowait(data_list)
+            return True
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            if self.stats['dropped'] == 1 or self.stats['dropped'] % 100 == 0:
+                print(f"写入队列已满({self.queue.maxsize})，已丢弃 {self.stats['dropped']} 条消息")
+            return False
+
+    def _collect_rows(self, data_list: List[dict], rows: List[Tuple]):
+        for item in data_list:
+            try:
+                row = mark_price_row(item)
+            except Exception as e:
+                print(f"解析数据失败 {item.get('s', 'unknown')}: {e}")
+                continue
+            if self.change_filter is None or self.change_filter.should_write(row):
+                rows.append(row)
+            else:
+                self.stats['skipped'] += 1
+
+    async def _next_batch(self) -> Tuple[List[Tuple], int]:
+        """等待第一条消息，然后在batch_seconds内继续收集，返回(合并后的行, 消息数)"""
+        rows: List[Tuple] = []
+        self._collect_rows(await self.queue.get(), rows)
+        messages = 1
+
+        deadline = time.monotonic() + self.batch_seconds
+        while len(rows) < self.max_batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                data_list = await asyncio.wait_for(self.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            self._collect_rows(data_list, rows)
+            messages += 1
+
+        self.stats['messages'] += messages
+        return rows, messages
+
+    async def _run(self):
+        while True:
+            rows, messages = await self._next_batch()
+            try:
+                if rows:
+                    self.stats['rows'] += await asyncio.to_thread(save_mark_price_data, self.conn, rows)
+                    self.stats['batches'] += 1
+                # 提交成功后才更新变化过滤器的比较基准
+                if self.change_filter is not None:
+                    self.change_filter.commit()
+            except Exception as e:
+                self.stats['errors'] += 1
+                if self.change_filter is not None:
+                    self.change_filter.rollback()
+                print(f"保存 {len(rows)} 条标记价格数据失败: {e}")
+            finally:
+                # 写入完成后才标记消息已处理，close() 等待队列时不会丢掉最后一批
+                for _ in range(messages):
+                    self.queue.task_done()
+
+            if time.time() - self._last_stats_time >= self.stats_seconds:
+                self._print_stats()
+
+    def _print_stats(self):
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 写入统计: 消息 {self.stats['messages']} 条, "
+              f"写入 {self.stats['rows']} 行/{self.stats['batches']} 批, 未变化跳过 {self.stats['skipped']} 行, "
+              f"丢弃 {self.stats['dropped']} 条, 失败 {self.stats['errors']} 批, 积压 {self.queue.qsize()} 条")
+        self._last_stats_time = time.time()
+
+    async def close(self, timeout: float = 10):
+        """等待队列中的数据写完后停止写入任务"""
+        if self.task and not self.task.done():
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                print(f"等待写入超时，{self.queue.qsize()} 条消息未写入")
+            self.task.cancel()
+        self._print_stats()
+
+
+async def receive_mark_prices(bsm: BinanceSocketManager, writer: MarkPriceWriter,
+                              publisher: Optional[PremiumIndexPublisher] = None, reconnect_seconds: float = 5):
+    """接收全市场标记价格推送，连接异常时自动重连；指定publisher时同时更新共享内存中的最新值快照"""
+    while True:
+        try:
+            async with bsm.all_mark_price_socket() as amp_cm:
+                print("开始接收Binance标记价格数据...")
+                while True:
+                    res = await amp_cm.recv()
+                    """
+                    {'stream': '!markPrice@arr@1s', 'data': [
+                        {
+                        "e": "markPriceUpdate",  	// Event type
+                        "E": 1562305380000,      	// Event time
+                        "s": "BTCUSDT",          	// Symbol
+                        "p": "11185.87786614",   	// Mark price
+                        "i": "11784.62659091"		// Index price
+                        "P": "11784.25641265",		// Estimated Settle Price, only useful in the last hour before the settlement starts
+                        "r": "0.00030000",       	// Funding rate
+                        "T": 1562306400000       	// Next funding time
+                      }
+                    ]}
+                    """
+                    # 放入写入队列，由写入任务批量保存
+                    if isinstance(res, dict) and isinstance(res.get('data'), list):
+                        writer.submit(res['data'])
+                        if publisher:
+                            publisher.update(res['data'])
+                    elif isinstance(res, dict) and res.get('e') == 'error':
+                        raise Exception(f"连接返回错误: {res}")
+                    else:
+                        print(f"接收到非预期数据格式: {res}")
+
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            print(f"保存数据失败 {item.get('s', 'unknown')}: {e}")
-    
-    conn.commit()
-    conn.close()
-    
-    if saved_count > 0:
-        print(f"成功保存 {saved_count} 条标记价格数据到数据库")
+            print(f"标记价格连接异常，{reconnect_seconds}秒后重连: {e}")
+            await asyncio.sleep(reconnect_seconds)
+
 
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Binance全市场标记价格记录')
+    parser.add_argument('--record-mode', choices=['change', 'full'], default='full',
+                        help='full: 每秒记录所有交易对（默认）; change: 只记录变化和关键帧')
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help='变化记录模式下价格字段的相对容差（0表示任何变化都记录，读取结果与逐秒记录一致）')
+    parser.add_argument('--keyframe-seconds', type=int, default=DEFAULT_KEYFRAME_SECONDS,
+                        help='变化记录模式下每个交易对的关键帧间隔（秒）')
+    return parser.parse_args()
 
-async def main():
+
+async def main(record_mode: str = 'full', tolerance: float = 0.0,
+               keyframe_seconds: int = DEFAULT_KEYFRAME_SECONDS):
     # 初始化数据库
-    init_database()
-    
+    if record_mode == 'change':
+        conn = init_database(keyframe_seconds=keyframe_seconds)
+        writer = MarkPriceWriter(conn, MarkPriceChangeFilter(tolerance, keyframe_seconds))
+        print(f"记录模式: 变化记录（容差 {tolerance}, 关键帧 {keyframe_seconds}秒）")
+    else:
+        conn = init_database()
+        writer = MarkPriceWriter(conn)
+        print("记录模式: 逐秒记录")
+    writer.start()
+    # 最新值快照，供其他脚本代替REST查询 premiumIndex（见 tools/premium_index_snapshot.py）
+    publisher = PremiumIndexPublisher()
+
     client = await AsyncClient.create(
         api_key=binance_api_key,
         api_secret=binance_api_secret,
         https_proxy=proxies.get('https')
     )
     bsm = BinanceSocketManager(client)
-    # start any sockets here, i.e a trade socket
-    all_mark_price = bsm.all_mark_price_socket()
-    # then start receiving messages
-    async with all_mark_price as amp_cm:
-        print("开始接收Binance标记价格数据...")
-        while True:
-            try:
-                res = await amp_cm.recv()
-                """
-                {'stream': '!markPrice@arr@1s', 'data': [
-                    {
-                    "e": "markPriceUpdate",  	// Event type
-                    "E": 1562305380000,      	// Event time
-                    "s": "BTCUSDT",          	// Symbol
-                    "p": "11185.87786614",   	// Mark price
-                    "i": "11784.62659091"		// Index price
-                    "P": "11784.25641265",		// Estimated Settle Price, only useful in the last hour before the settlement starts
-                    "r": "0.00030000",       	// Funding rate
-                    "T": 1562306400000       	// Next funding time
-                  }
-                ]}
-                """
-                # 将数据保存到数据库
-                if 'data' in res and isinstance(res['data'], list):
-                    save_mark_price_data(res['data'])
-                else:
-                    print(f"接收到非预期数据格式: {res}")
-                    
-            except Exception as e:
-                print(f"处理数据时发生错误: {e}")
-                continue
-
-    await client.close_connection()
+    try:
+        await receive_mark_prices(bsm, writer, publisher)
+    finally:
+        publisher.close()
+        await writer.close()
+        await client.close_connection()
+        conn.close()
 
 
 if __name__ == "__main__":
     try:
+        args = parse_arguments()
         loop = asyncio.get_event_loop()
-        loop.run_until_complete(main())
+        loop.run_until_complete(main(args.record_mode, args.tolerance, args.keyframe_seconds))
     except KeyboardInterrupt:
         print("\n程序被用户中断")
     except Exception as e:
-        print(f"程序运行出错: {e}")
\ No newline at end of file
+        print(f"程序运行出错: {e}")
@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+价格突破卖空策略回测
+
+在数据库中已保存的混合K线（历史30分钟 + 当天1分钟聚合为30分钟）上回放
+binance_price_high_scanner 的交易逻辑：
+1. 信号：30分钟K线收盘价 >= 之前N天（不含当前K线）的最高价
+2. 过滤：K线数据天数 >= min_launch_days；可选按当前市值排名过滤
+   （历史资金费率不在数据库中，不参与过滤）
+3. 开仓：无持仓时首次卖空；已有持仓时价格较最近一次开仓上涨 min_price_increase 以上才追加
+4. 平仓：开仓价 * (1 - 止盈比例) 的限价单成交；按逐仓估算强平价，触及则损失全部保证金
+5. 回测结束时仍未平仓的仓位按最后收盘价计算浮动盈亏
+
+滚动最高价使用分块前缀/后缀最大值（van Herk/Gil-Werman）在NumPy中向量化计算，
+每个交易对每个区间只需O(n)，逐笔模拟只遍历信号K线。
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.logger import logger
+from trade.kline_array import KlineArray
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from itertools import product
+import time
+import numpy as np
+import pandas as pd
+import pymysql
+import pymysql.cursors
+
+BUCKET_MS = 30 * 60 * 1000
+DAY_MS = 24 * 60 * 60 * 1000
+BUCKETS_PER_DAY = DAY_MS // BUCKET_MS
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    滚动最大值：result[k] = max(values[k-window+1 .. k])，开头不足window的部分按已有数据计算
+
+    Args:
+        values: 一维数组（缺失值用-inf表示）
+        window: 窗口长度
+
+    Returns:
+        np.ndarray: 与values等长的滚动最大值
+    """
+    n = len(values)
+    if n == 0:
+        return values.astype(np.float64)
+
+    padded = np.concatenate([np.full(window - 1, -np.inf), values.astype(np.float64)])
+    tail = (-len(padded)) % window
+    if tail:
+        padded = np.concatenate([padded, np.full(tail, -np.inf)])
+
+    blocks = padded.reshape(-1, window)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    # 补齐后第k个窗口为 [k, k+window-1]，最多跨两个分块
+    starts = np.arange(n)
+    return np.maximum(suffix[starts], prefix[starts + window - 1])
+
+
+class SymbolSeries:
+    """单个交易对按30分钟网格对齐的价格序列（缺失的K线high=-inf, low=+inf）"""
+
+    __slots__ = ('symbol', 'open_time', 'high', 'low', 'close', 'valid', 'first_open_time')
+
+    def __init__(self, symbol: str, klines: KlineArray):
+        self.symbol = symbol
+        start = int(klines.open_time[0])
+        index = (klines.open_time - start) // BUCKET_MS
+        size = int(index[-1]) + 1
+
+        self.open_time = start + np.arange(size, dtype=np.int64) * BUCKET_MS
+        self.high = np.full(size, -np.inf)
+        self.low = np.full(size, np.inf)
+        self.close = np.full(size, np.nan)
+        self.valid = np.zeros(size, dtype=bool)
+
+        self.high[index] = klines.high
+        self.low[index] = klines.low
+        self.close[index] = klines.close
+        self.valid[index] = True
+        self.first_open_time = start
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    @property
+    def last_close(self) -> float:
+        return float(self.close[self.valid][-1])
+
+
+class BreakoutBacktester:
+    """价格突破卖空策略的向量化回测"""
+
+    def __init__(self, db_pool, leverage: int = 20, margin_amount: float = 10, min_launch_days: int = 7,
+                 taker_fee: float = 0.0005, maker_fee: float = 0.0002, maintenance_margin_rate: float = 0.005,
+                 token_ranks: Optional[Dict[str, int]] = None, max_market_rank: int = 50):
+        """
+        Args:
+            db_pool: 数据库连接池（tools.db_pool.MySQLConnectionPool）
+            leverage: 杠杆倍数
+            margin_amount: 每笔保证金(USDT)
+            min_launch_days: 最小上市天数（按K线数据开始时间计算）
+            taker_fee: 市价开仓手续费率
+            maker_fee: 限价止盈手续费率
+            maintenance_margin_rate: 估算强平价使用的维持保证金率
+            token_ranks: 代币当前市值排名 {base_asset: rank}，为None时不按排名过滤
+            max_market_rank: 市值排名在该名次以内的代币不交易
+        """
+        self.db_pool = db_pool
+        self.leverage = leverage
+        self.margin_amount = margin_amount
+        self.min_launch_days = min_launch_days
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.maintenance_margin_rate = maintenance_margin_rate
+        self.token_ranks = token_ranks
+        self.max_market_rank = max_market_rank
+
+        self.series: Dict[str, SymbolSeries] = {}
+        self.data_start_ms = 0
+
+    def load_klines(self, days: int) -> int:
+        """
+        从数据库一次性加载所有交易对最近days天的K线（当天1分钟K线聚合为30分钟）
+
+        Returns:
+            int: 加载的K线条数
+        """
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        today_start_ms = int(today_start.timestamp() * 1000)
+        self.data_start_ms = int((today_start - timedelta(days=days)).timestamp() * 1000)
+
+        rows_by_symbol: Dict[str, Dict[str, List]] = {}
+        row_count = 0
+
+        # 使用流式游标，避免一次性加载全部结果集
+        conn = self.db_pool.get_connection()
+        try:
+            cursor = conn.cursor(pymysql.cursors.SSCursor)
+            for table, start_ms, end_ms in (('kline_data_30min', self.data_start_ms, today_start_ms),
+                                            ('kline_data_1min', today_start_ms, None)):
+                if end_ms is None:
+                    cursor.execute(f'''
+                        SELECT symbol, open_time, open_price, high_price, low_price, close_price, volume,
+                               close_time, quote_volume, trades_count, taker_buy_base_volume,
+                               taker_buy_quote_volume
+                        FROM {table}
+                        WHERE open_time >= %s
+                        ORDER BY symbol, open_time
+                    ''', (start_ms,))
+                else:
+                    cursor.execute(f'''
+                        SELECT symbol, open_time, open_price, high_price, low_price, close_price, volume,
+                               close_time, quote_volume, trades_count, taker_buy_base_volume,
+                               taker_buy_quote_volume
+                        FROM {table}
+                        WHERE open_time >= %s AND open_time < %s
+                        ORDER BY symbol, open_time
+                    ''', (start_ms, end_ms))
+
+                for row in cursor:
+                    rows_by_symbol.setdefault(row[0], {}).setdefault(table, []).append(row[1:])
+                    row_count += 1
+            cursor.close()
+        finally:
+            conn.close()
+
+        self.series = {}
+        for symbol, tables in rows_by_symbol.items():
+            history = KlineArray.from_rows(tables.get('kline_data_30min', []))
+            today = KlineArray.from_rows(tables.get('kline_data_1min', [])).aggregate(BUCKET_MS)
+            klines = KlineArray.concat([history, today])
+            if len(klines) > 0:
+                self.series[symbol] = SymbolSeries(symbol, klines)
+
+        logger.info(f"📥 回测数据加载完成: {len(self.series)}个交易对, {row_count}根K线")
+        return row_count
+
+    def _passes_rank_filter(self, symbol: str) -> bool:
+        if self.token_ranks is None:
+            return True
+        rank = self.token_ranks.get(symbol.replace('USDT', ''), 0)
+        return bool(rank) and rank > self.max_market_rank
+
+    def breakout_signals(self, series: SymbolSeries, breakout_days: int) -> np.ndarray:
+        """
+        计算突破信号K线的下标
+
+        信号条件：收盘价 >= 之前breakout_days天的最高价，之前的区间数据完整覆盖，
+        且K线数据已满min_launch_days天。
+        """
+        window = breakout_days * BUCKETS_PER_DAY
+        if len(series) <= window:
+            return np.empty(0, dtype=np.int64)
+
+        window_high = rolling_max(series.high, window)
+        previous_high = np.empty(len(series))
+        previous_high[0] = -np.inf
+        previous_high[1:] = window_high[:-1]
+
+        # 交易对在加载区间开始之后才有数据时，视为上市时间
+        listed_ms = series.first_open_time if series.first_open_time > self.data_start_ms else -np.inf
+        signal = (series.valid
+                  & (series.close >= previous_high)
+                  & (np.arange(len(series)) >= window)
+                  & (series.open_time - listed_ms >= self.min_launch_days * DAY_MS))
+        return np.flatnonzero(signal)
+
+    def simulate(self, series: SymbolSeries, signal_index: np.ndarray, take_profit: float,
+                 min_price_increase: float) -> Dict[str, Any]:
+        """
+        按信号逐笔模拟开平仓
+
+        Returns:
+            Dict: trades, take_profits, liquidations, open, realized_pnl, unrealized_pnl, total_pnl
+        """
+        result = {'trades': 0, 'take_profits': 0, 'liquidations': 0, 'open': 0,
+                  'realized_pnl': 0.0, 'unrealized_pnl': 0.0}
+        if len(signal_index) == 0:
+            return result
+
+        notional = self.margin_amount * self.leverage
+        liquidation_ratio = 1 + 1 / self.leverage - self.maintenance_margin_rate
+        size = len(series)
+        # 未平仓仓位 [(平仓下标, 开仓价)]
+        positions: List[Tuple[int, float]] = []
+        last_close = series.last_close
+
+        for i in signal_index.tolist():
+            positions = [position for position in positions if position[0] > i]
+            price = float(series.close[i])
+
+            # 有未平仓仓位时，价格较最近一次开仓上涨min_price_increase以上才追加
+            if positions and (price - positions[-1][1]) / positions[-1][1] < min_price_increase:
+                continue
+
+            quantity = notional / price
+            result['trades'] += 1
+            result['realized_pnl'] -= notional * self.taker_fee
+
+            take_profit_price = price * (1 - take_profit)
+            liquidation_price = price * liquidation_ratio
+            hit_take_profit = series.low[i + 1:] <= take_profit_price
+            hit_liquidation = series.high[i + 1:] >= liquidation_price
+            tp_offset = int(np.argmax(hit_take_profit)) if hit_take_profit.any() else size
+            liq_offset = int(np.argmax(hit_liquidation)) if hit_liquidation.any() else size
+
+            if liq_offset <= tp_offset and liq_offset < size:
+                # 同一根K线同时触及时按先强平处理（保守估计）
+                result['liquidations'] += 1
+                result['realized_pnl'] -= self.margin_amount
+                exit_index = i + 1 + liq_offset
+            elif tp_offset < size:
+                result['take_profits'] += 1
+                result['realized_pnl'] += (price - take_profit_price) * quantity
+                result['realized_pnl'] -= take_profit_price * quantity * self.maker_fee
+                exit_index = i + 1 + tp_offset
+            else:
+                result['open'] += 1
+                result['unrealized_pnl'] += (price - last_close) * quantity
+                exit_index = size
+
+            positions.append((exit_index, price))
+
+        result['total_pnl'] = result['realized_pnl'] + result['unrealized_pnl']
+        return result
+
+    def run(self, breakout_days: Iterable[int] = (7, 15, 30), take_profits: Iterable[float] = (0.03, 0.05, 0.1),
+            min_price_increases: Iterable[float] = (0.1, 0.2, 0.3)) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        对所有交易对和参数组合回测
+
+        Returns:
+            Tuple[DataFrame, DataFrame]: (按参数汇总, 按交易对和参数明细)
+        """
+        start_time = time.time()
+        rows = []
+
+        for symbol, series in self.series.items():
+            if not self._passes_rank_filter(symbol):
+                continue
+            for days in breakout_days:
+                signal_index = self.breakout_signals(series, days)
+                for take_profit, min_price_increase in product(take_profits, min_price_increases):
+                    result = self.simulate(series, signal_index, take_profit, min_price_increase)
+                    result.update({
+                        'symbol': symbol,
+                        'breakout_days': days,
+                        'take_profit': take_profit,
+                        'min_price_increase': min_price_increase,
+                        'signals': len(signal_index),
+                    })
+                    result.setdefault('total_pnl', 0.0)
+                    rows.append(result)
+
+        columns = ['symbol', 'breakout_days', 'take_profit', 'min_price_increase', 'signals', 'trades',
+                   'take_profits', 'liquidations', 'open', 'realized_pnl', 'unrealized_pnl', 'total_pnl']
+        per_symbol = pd.DataFrame(rows, columns=columns)
+
+        params = ['breakout_days', 'take_profit', 'min_price_increase']
+        summary = per_symbol.groupby(params).agg(
+            symbols=('symbol', 'nunique'),
+            traded_symbols=('trades', lambda trades: int((trades > 0).sum())),
+            trades=('trades', 'sum'),
+            take_profits=('take_profits', 'sum'),
+            liquidations=('liquidations', 'sum'),
+            open=('open', 'sum'),
+            realized_pnl=('realized_pnl', 'sum'),
+            unrealized_pnl=('unrealized_pnl', 'sum'),
+            total_pnl=('total_pnl', 'sum'),
+        ).reset_index()
+        summary['win_rate'] = summary['take_profits'] / summary['trades'].where(summary['trades'] > 0)
+        summary['return_on_margin'] = summary['total_pnl'] / (summary['trades'] * self.margin_amount).where(
+            summary['trades'] > 0)
+        summary = summary.sort_values('total_pnl', ascending=False).reset_index(drop=True)
+
+        logger.info(f"⏱️ 回测完成: {len(self.series)}个交易对, {len(summary)}组参数, 耗时{time.time() - start_time:.1f}秒")
+        return summary, per_symbol
+
+    def report(self, summary: pd.DataFrame, per_symbol: pd.DataFrame, output_dir: str,
+               live_params: Tuple[int, float, float] = (7, 0.05, 0.2), top: int = 20):
+        """输出按参数汇总和实盘参数下的交易对排行，并保存CSV"""
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        summary_file = os.path.join(output_dir, f"backtest_summary_{timestamp}.csv")
+        per_symbol_file = os.path.join(output_dir, f"backtest_symbols_{timestamp}.csv")
+        summary.to_csv(summary_file, index=False)
+        per_symbol.to_csv(per_symbol_file, index=False)
+
+        with pd.option_context('display.width', 200, 'display.max_columns', 20, 'display.float_format', '{:.4f}'.format):
+            logger.info(f"📊 按参数汇总（按总盈亏排序）:\n{summary.to_string()}")
+
+            days, take_profit, min_price_increase = live_params
+            live = per_symbol[(per_symbol['breakout_days'] == days)
+                              & (per_symbol['take_profit'] == take_profit)
+                              & (per_symbol['min_price_increase'] == min_price_increase)
+                              & (per_symbol['trades'] > 0)].sort_values('total_pnl')
+            if not live.empty:
+                logger.info(f"📉 实盘参数（{days}天突破, 止盈{take_profit * 100:.0f}%, 追加涨幅{min_price_increase * 100:.0f}%）"
+                            f"亏损最多的交易对:\n{live.head(top).to_string(index=False)}")
+                logger.info(f"📈 盈利最多的交易对:\n{live.tail(top).iloc[::-1].to_string(index=False)}")
+
+        logger.info(f"💾 回测报告已保存: {summary_file}, {per_symbol_file}")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+列式K线容器
+
+用NumPy数组按列保存K线数据，替代扫描器中 List[List[str]] 形式的K线：
+1. 直接由数据库游标行或Binance REST返回数据构造，不做字符串往返转换
+2. 每个交易对的内存占用约为列表形式的几分之一
+3. 提供向量化的区间高低点、周期聚合等操作
+
+列顺序与Binance K线接口一致：
+open_time, open, high, low, close, volume, close_time, quote_volume,
+trades_count, taker_buy_base_volume, taker_buy_quote_volume
+"""
+
+from typing import List, Sequence, Iterable, Tuple, Optional
+import numpy as np
+
+# Binance K线接口的列顺序（忽略最后一列ignore）
+KLINE_FIELDS = (
+    'open_time', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_volume', 'trades_count',
+    'taker_buy_base_volume', 'taker_buy_quote_volume'
+)
+
+_INT_FIELDS = ('open_time', 'close_time', 'trades_count')
+
+
+def _field_dtype(field: str):
+    return np.int64 if field in _INT_FIELDS else np.float64
+
+
+class KlineArray:
+    """列式K线数据（按open_time升序）"""
+
+    __slots__ = KLINE_FIELDS
+
+    def __init__(self, **columns):
+        for field in KLINE_FIELDS:
+            values = columns.get(field)
+            if values is None:
+                values = ()
+            setattr(self, field, np.asarray(values, dtype=_field_dtype(field)))
+
+    @classmethod
+    def empty(cls) -> 'KlineArray':
+        """创建空的K线容器"""
+        return cls()
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence]) -> 'KlineArray':
+        """
+        由按Binance列顺序排列的行构造（数据库游标行或REST返回的K线）
+
+        Args:
+            rows: K线行列表，多余的列（如ignore）会被忽略
+        """
+        if not rows:
+            return cls.empty()
+        columns = list(zip(*rows))
+        return cls(**{field: columns[i] for i, field in enumerate(KLINE_FIELDS)})
+
+    @classmethod
+    def concat(cls, parts: Iterable['KlineArray']) -> 'KlineArray':
+        """按顺序拼接多个K线容器"""
+        parts = [part for part in parts if len(part) > 0]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(**{field: np.concatenate([getattr(part, field) for part in parts])
+                      for field in KLINE_FIELDS})
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    def __getitem__(self, item) -> 'KlineArray':
+        if isinstance(item, (int, np.integer)):
+            item = slice(item, item + 1 if item != -1 else None)
+        return KlineArray(**{field: getattr(self, field)[item] for field in KLINE_FIELDS})
+
+    @property
+    def nbytes(self) -> int:
+        """所有列占用的字节数"""
+        return sum(getattr(self, field).nbytes for field in KLINE_FIELDS)
+
+    def to_db_rows(self, symbol: str) -> List[Tuple]:
+        """转换为K线表的插入行 (symbol, open_time, close_time, open, high, low, close, ...)"""
+        return list(zip(
+            [symbol] * len(self),
+            self.open_time.tolist(),
+            self.close_time.tolist(),
+            self.open.tolist(),
+            self.high.tolist(),
+            self.low.tolist(),
+            self.close.tolist(),
+            self.volume.tolist(),
+            self.quote_volume.tolist(),
+            self.trades_count.tolist(),
+            self.taker_buy_base_volume.tolist(),
+            self.taker_buy_quote_volume.tolist()
+        ))
+
+    def range_high_low(self, start_ms: int, end_index: Optional[int] = None) -> Optional[Tuple[float, float]]:
+        """
+        计算 open_time >= start_ms 的K线最高价和最低价
+
+        Args:
+            start_ms: 区间开始时间戳（毫秒）
+            end_index: 区间结束下标（不含），默认到最后一根
+
+        Returns:
+            Optional[Tuple[float, float]]: (最高价, 最低价)，区间为空时返回None
+        """
+        end = len(self) if end_index is None else end_index
+        start = int(np.searchsorted(self.open_time[:end], start_ms, side='left'))
+        if start >= end:
+            return None
+        return float(self.high[start:end].max()), float(self.low[start:end].min())
+
+    def aggregate(self, interval_ms: int, origin_ms: int = 0) -> 'KlineArray':
+        """
+        按固定周期聚合K线（如1分钟聚合为30分钟）
+
+        Args:
+            interval_ms: 目标周期（毫秒）
+            origin_ms: 周期对齐的起点时间戳（毫秒）
+
+        Returns:
+            KlineArray: 聚合后的K线，close_time为周期结束时间-1
+        """
+        if len(self) == 0:
+            return KlineArray.empty()
+
+        bucket_ids = (self.open_time - origin_ms) // interval_ms
+        # 每个周期的第一根K线下标（数据已按时间升序）
+        starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+        ends = np.r_[starts[1:], len(self)] - 1
+        bucket_open_time = origin_ms + bucket_ids[starts] * interval_ms
+
+        return KlineArray(
+            open_time=bucket_open_time,
+            open=self.open[starts],
+            high=np.maximum.reduceat(self.high, starts),
+            low=np.minimum.reduceat(self.low, starts),
+            close=self.close[ends],
+            volume=np.add.reduceat(self.volume, starts),
+            close_time=bucket_open_time + interval_ms - 1,
+            quote_volume=np.add.reduceat(self.quote_volume, starts),
+            trades_count=np.add.reduceat(self.trades_count, starts),
+            taker_buy_base_volume=np.add.reduceat(self.taker_buy_base_volume, starts),
+            taker_buy_quote_volume=np.add.reduceat(self.taker_buy_quote_volume, starts)
+        )
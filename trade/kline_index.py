@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+K线滚动高低点索引
+
+为价格高点扫描器维护常驻内存的分桶索引，用于7天/15天/30天突破检测：
+1. 每个交易对按30分钟分桶记录最高价/最低价，同时按天汇总
+2. 启动时从MySQL一次性加载所有交易对的历史数据，之后由新K线增量更新
+3. 查询某个区间时只需合并整天汇总 + 区间起点所在天的30分钟分桶，
+   计算量与K线条数无关（最多约30个天桶 + 48个30分钟桶）
+
+与 check_price_breakouts 的语义保持一致：最新一根K线不计入区间统计，
+区间起点为最新K线开盘时间往前N天。
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.logger import logger
+from trade.kline_array import KlineArray
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+import pymysql
+import pymysql.cursors
+
+BUCKET_MS = 30 * 60 * 1000
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class SymbolHighIndex:
+    """单个交易对的分桶高低点索引"""
+
+    __slots__ = ('buckets', 'days', 'last')
+
+    def __init__(self):
+        # {30分钟桶开始时间: [最高价, 最低价]}
+        self.buckets: Dict[int, List[float]] = {}
+        # {自然日开始时间(UTC): [最高价, 最低价]}
+        self.days: Dict[int, List[float]] = {}
+        # 最新一根K线 (open_time, high, low, close)，不计入区间统计
+        self.last: Optional[Tuple[int, float, float, float]] = None
+
+    def _fold(self, open_time: int, high: float, low: float):
+        """将一根K线合并进分桶和天汇总"""
+        for table, key in ((self.buckets, open_time - open_time % BUCKET_MS),
+                           (self.days, open_time - open_time % DAY_MS)):
+            entry = table.get(key)
+            if entry is None:
+                table[key] = [high, low]
+            else:
+                if high > entry[0]:
+                    entry[0] = high
+                if low < entry[1]:
+                    entry[1] = low
+
+    def add(self, open_time: int, high: float, low: float, close: float):
+        """
+        增量加入一根K线
+
+        同一开盘时间的K线重复加入时只替换最新K线（未收盘K线的刷新）；
+        更早的K线直接合并进分桶，高低点合并满足幂等性。
+        """
+        last = self.last
+        if last is None or open_time > last[0]:
+            if last is not None:
+                self._fold(last[0], last[1], last[2])
+            self.last = (open_time, high, low, close)
+        elif open_time == last[0]:
+            self.last = (open_time, high, low, close)
+        else:
+            self._fold(open_time, high, low)
+
+    def prune(self, keep_from_ms: int):
+        """丢弃早于指定时间的分桶"""
+        for key in [k for k in self.buckets if k + BUCKET_MS <= keep_from_ms]:
+            del self.buckets[key]
+        for key in [k for k in self.days if k + DAY_MS <= keep_from_ms]:
+            del self.days[key]
+
+    def range_high_low(self, cutoff_ms: int) -> Optional[Tuple[float, float]]:
+        """
+        计算开盘时间 >= cutoff_ms 的K线（不含最新一根）的最高价和最低价
+
+        Returns:
+            Optional[Tuple[float, float]]: (最高价, 最低价)，区间内无数据时返回None
+        """
+        if self.last is None:
+            return None
+
+        max_high = None
+        min_low = None
+
+        # 区间起点之后的第一个完整自然日
+        first_full_day = -(-cutoff_ms // DAY_MS) * DAY_MS
+
+        # 起点所在自然日的剩余部分按30分钟分桶合并
+        bucket = -(-cutoff_ms // BUCKET_MS) * BUCKET_MS
+        while bucket < first_full_day:
+            entry = self.buckets.get(bucket)
+            if entry is not None:
+                if max_high is None or entry[0] > max_high:
+                    max_high = entry[0]
+                if min_low is None or entry[1] < min_low:
+                    min_low = entry[1]
+            bucket += BUCKET_MS
+
+        # 完整自然日直接使用天汇总
+        day = first_full_day
+        last_day = self.last[0] - self.last[0] % DAY_MS
+        while day <= last_day:
+            entry = self.days.get(day)
+            if entry is not None:
+                if max_high is None or entry[0] > max_high:
+                    max_high = entry[0]
+                if min_low is None or entry[1] < min_low:
+                    min_low = entry[1]
+            day += DAY_MS
+
+        if max_high is None:
+            return None
+        return max_high, min_low
+
+
+class RollingHighIndex:
+    """所有交易对的常驻滚动高低点索引"""
+
+    def __init__(self, max_days: int = 30, periods: Iterable[int] = (7, 15, 30)):
+        """
+        Args:
+            max_days: 索引保留的最大天数（与扫描器分析天数一致）
+            periods: 需要检测突破的时间区间（天）
+        """
+        self.max_days = max_days
+        self.periods = tuple(periods)
+        self.symbols: Dict[str, SymbolHighIndex] = {}
+        self.seeded = False
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.symbols and self.symbols[symbol].last is not None
+
+    def add_kline(self, symbol: str, open_time: int, high: float, low: float, close: float):
+        """加入一根K线"""
+        index = self.symbols.get(symbol)
+        if index is None:
+            index = self.symbols[symbol] = SymbolHighIndex()
+        index.add(int(open_time), float(high), float(low), float(close))
+
+    def add_klines(self, symbol: str, klines):
+        """加入K线列表（Binance API格式或KlineArray）"""
+        if isinstance(klines, KlineArray):
+            for open_time, high, low, close in zip(klines.open_time.tolist(), klines.high.tolist(),
+                                                   klines.low.tolist(), klines.close.tolist()):
+                self.add_kline(symbol, open_time, high, low, close)
+        else:
+            for kline in klines:
+                self.add_kline(symbol, kline[0], kline[2], kline[3], kline[4])
+
+    def get_current_price(self, symbol: str) -> Optional[float]:
+        """获取最新一根K线的收盘价"""
+        index = self.symbols.get(symbol)
+        if index is None or index.last is None:
+            return None
+        return index.last[3]
+
+    def prune(self):
+        """按保留天数清理所有交易对的过期分桶"""
+        for index in self.symbols.values():
+            if index.last is not None:
+                index.prune(index.last[0] - (self.max_days + 1) * DAY_MS)
+
+    def check_breakouts(self, symbol: str) -> Dict[str, Any]:
+        """
+        检查最新K线价格是否为各时间区间的最高点
+
+        Returns:
+            Dict: 与 BinancePriceHighScanner.check_price_breakouts 相同结构的结果
+        """
+        index = self.symbols.get(symbol)
+        if index is None or index.last is None:
+            return {
+                'current_price': 0.0,
+                'has_breakout': False,
+                'breakout_periods': [],
+                'breakouts': {}
+            }
+
+        current_time_ms, _, _, current_price = index.last
+        # 数据窗口最多覆盖max_days天
+        earliest_ms = current_time_ms - self.max_days * DAY_MS
+
+        breakouts = {}
+        breakout_periods = []
+
+        for days in self.periods:
+            cutoff_ms = max(current_time_ms - days * DAY_MS, earliest_ms)
+            high_low = index.range_high_low(cutoff_ms)
+
+            if high_low is None:
+                breakouts[days] = {'is_high': False, 'max_high': 0.0, 'min_low': 0.0}
+                continue
+
+            max_high, min_low = high_low
+            is_high = current_price >= max_high
+            breakouts[days] = {'is_high': is_high, 'max_high': max_high, 'min_low': min_low}
+
+            if is_high:
+                breakout_periods.append(days)
+
+        return {
+            'current_price': current_price,
+            'has_breakout': bool(breakout_periods),
+            'breakout_periods': breakout_periods,
+            'breakouts': breakouts
+        }
+
+    def seed_from_db(self, db_pool) -> bool:
+        """
+        从MySQL一次性加载所有交易对的混合K线（历史30分钟 + 当天1分钟）
+
+        Args:
+            db_pool: 数据库连接池（tools.db_pool.MySQLConnectionPool）
+
+        Returns:
+            bool: 是否加载成功
+        """
+        try:
+            start_time = datetime.now()
+            today_start = start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+            today_start_ms = int(today_start.timestamp() * 1000)
+            history_start_ms = int((start_time - timedelta(days=self.max_days + 1)).timestamp() * 1000)
+
+            self.symbols = {}
+            row_count = 0
+
+            # 使用流式游标，避免一次性加载全部结果集
+            conn = db_pool.get_connection()
+            try:
+                cursor = conn.cursor(pymysql.cursors.SSCursor)
+                for table, start_ms, end_ms in (('kline_data_30min', history_start_ms, today_start_ms),
+                                                ('kline_data_1min', today_start_ms, None)):
+                    if end_ms is None:
+                        cursor.execute(f'''
+                            SELECT symbol, open_time, high_price, low_price, close_price
+                            FROM {table}
+                            WHERE open_time >= %s
+                        ''', (start_ms,))
+                    else:
+                        cursor.execute(f'''
+                            SELECT symbol, open_time, high_price, low_price, close_price
+                            FROM {table}
+                            WHERE open_time >= %s AND open_time < %s
+                        ''', (start_ms, end_ms))
+
+                    for symbol, open_time, high, low, close in cursor:
+                        self.add_kline(symbol, open_time, high, low, close)
+                        row_count += 1
+                cursor.close()
+            finally:
+                conn.close()
+
+            self.prune()
+            self.seeded = True
+
+            elapsed = (datetime.now() - start_time).total_seconds()
+            logger.info(f"✅ 滚动高点索引加载完成: {len(self.symbols)}个交易对, {row_count}根K线, 耗时{elapsed:.1f}秒")
+            return True
+
+        except Exception as e:
+            logger.error(f"从数据库加载滚动高点索引失败: {str(e)}")
+            self.seeded = False
+            return False
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+K线表分区管理
+
+kline_data_1min 按天、kline_data_30min 按月做 RANGE(open_time) 分区：
+1. 保留期之外的数据整分区 DROP，代替大范围 DELETE，清理几乎瞬间完成且不产生碎片
+2. 删除前把分区导出为压缩的NPZ列式文件（按表/分区命名），供离线研究使用
+3. 每次跨天时预先创建未来几个分区，新数据不会落入 pmax 分区
+4. 按 open_time 的范围查询只扫描相关分区
+
+分区边界按本地时间的自然日/自然月计算，与扫描器的跨天处理保持一致。
+MySQL要求分区键包含在所有唯一键中，分区表的主键为 (id, open_time)。
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.logger import logger
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import numpy as np
+import pymysql
+import pymysql.cursors
+
+# 表名 -> 分区粒度
+KLINE_TABLE_GRANULARITY = {
+    'kline_data_1min': 'day',
+    'kline_data_30min': 'month',
+}
+
+KLINE_COLUMNS = (
+    'symbol', 'open_time', 'close_time', 'open_price', 'high_price', 'low_price', 'close_price',
+    'volume', 'quote_volume', 'trades_count', 'taker_buy_base_volume', 'taker_buy_quote_volume'
+)
+
+
+def period_start(dt: datetime, granularity: str) -> datetime:
+    """所在自然日/自然月的开始时间"""
+    dt = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'month':
+        dt = dt.replace(day=1)
+    return dt
+
+
+def next_period(dt: datetime, granularity: str) -> datetime:
+    """下一个自然日/自然月的开始时间"""
+    if granularity == 'month':
+        return (dt.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return dt + timedelta(days=1)
+
+
+def partition_name(start: datetime, granularity: str) -> str:
+    """分区名，如 p20240101（按天）或 p202401（按月）"""
+    return 'p' + start.strftime('%Y%m' if granularity == 'month' else '%Y%m%d')
+
+
+def to_ms(dt: datetime) -> int:
+    return int(dt.timestamp() * 1000)
+
+
+def partition_definitions(granularity: str, start: datetime, end: datetime) -> List[str]:
+    """生成 [start, end) 范围内每个周期一个分区的定义，最后附加 pmax"""
+    definitions = []
+    current = period_start(start, granularity)
+    while current < end:
+        upper = next_period(current, granularity)
+        definitions.append(f"PARTITION {partition_name(current, granularity)} VALUES LESS THAN ({to_ms(upper)})")
+        current = upper
+    definitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return definitions
+
+
+class KlinePartitionManager:
+    """K线表的分区创建、滚动和归档"""
+
+    def __init__(self, db_pool, database: str, archive_dir: str, days_ahead: int = 3, months_ahead: int = 2):
+        """
+        Args:
+            db_pool: 数据库连接池（tools.db_pool.MySQLConnectionPool）
+            database: 数据库名
+            archive_dir: 过期分区导出目录
+            days_ahead: 按天分区的表预先创建的天数
+            months_ahead: 按月分区的表预先创建的月数
+        """
+        self.db_pool = db_pool
+        self.database = database
+        self.archive_dir = archive_dir
+        self.days_ahead = days_ahead
+        self.months_ahead = months_ahead
+
+    def _ahead_end(self, granularity: str) -> datetime:
+        """需要预先创建分区到的时间（不含）"""
+        end = period_start(datetime.now(), granularity)
+        for _ in range(1 + (self.months_ahead if granularity == 'month' else self.days_ahead)):
+            end = next_period(end, granularity)
+        return end
+
+    def partition_clause(self, table: str, history_start: datetime) -> str:
+        """建表/改表使用的 PARTITION BY 子句"""
+        granularity = KLINE_TABLE_GRANULARITY[table]
+        definitions = partition_definitions(granularity, history_start, self._ahead_end(granularity))
+        return "PARTITION BY RANGE (open_time) (\n    " + ",\n    ".join(definitions) + "\n)"
+
+    def get_partitions(self, table: str) -> List[Tuple[str, Optional[int]]]:
+        """
+        获取表的分区列表
+
+        Returns:
+            List[Tuple[str, Optional[int]]]: [(分区名, 上界时间戳)]，pmax的上界为None；未分区时返回空列表
+        """
+        conn = self.db_pool.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+                FROM information_schema.PARTITIONS
+                WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+                ORDER BY PARTITION_ORDINAL_POSITION
+            ''', (self.database, table))
+            return [(name, None if description == 'MAXVALUE' else int(description))
+                    for name, description in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def is_partitioned(self, table: str) -> bool:
+        return bool(self.get_partitions(table))
+
+    def partition_table(self, table: str) -> bool:
+        """
+        将现有的未分区表改为分区表（一次性操作，会重建整张表）
+
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            if self.is_partitioned(table):
+                logger.info(f"{table}已经是分区表")
+                return True
+
+            conn = self.db_pool.get_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f'SELECT MIN(open_time) FROM {table}')
+                min_open_time = cursor.fetchone()[0]
+                history_start = datetime.fromtimestamp(min_open_time / 1000) if min_open_time else datetime.now()
+
+                logger.info(f"🔧 开始将{table}改为分区表（数据开始于{history_start.strftime('%Y-%m-%d')}）...")
+                cursor.execute(f'''
+                    ALTER TABLE {table}
+                    DROP PRIMARY KEY,
+                    ADD PRIMARY KEY (id, open_time)
+                    {self.partition_clause(table, history_start)}
+                ''')
+                conn.commit()
+            finally:
+                conn.close()
+
+            logger.info(f"✅ {table}分区完成")
+            return True
+
+        except Exception as e:
+            logger.error(f"将{table}改为分区表失败: {str(e)}")
+            return False
+
+    def ensure_future_partitions(self, table: str) -> int:
+        """
+        拆分 pmax，预先创建未来的分区
+
+        Returns:
+            int: 新建的分区数
+        """
+        partitions = self.get_partitions(table)
+        bounds = [bound for _, bound in partitions if bound is not None]
+        if not bounds:
+            return 0
+
+        granularity = KLINE_TABLE_GRANULARITY[table]
+        start = datetime.fromtimestamp(bounds[-1] / 1000)
+        definitions = partition_definitions(granularity, start, self._ahead_end(granularity))
+        if len(definitions) <= 1:
+            return 0
+
+        conn = self.db_pool.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                ALTER TABLE {table} REORGANIZE PARTITION pmax INTO (
+                    {", ".join(definitions)}
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+        logger.info(f"📅 {table}新建{len(definitions) - 1}个分区")
+        return len(definitions) - 1
+
+    def archive_partition(self, table: str, name: str, fetch_size: int = 50000) -> int:
+        """
+        将一个分区导出为压缩NPZ文件（每列一个数组）
+
+        Args:
+            fetch_size: 每次从流式游标读取的行数
+
+        Returns:
+            int: 导出的行数
+        """
+        table_dir = os.path.join(self.archive_dir, table)
+        os.makedirs(table_dir, exist_ok=True)
+
+        # 按列累积，不保留整个结果集的行元组
+        columns = [[] for _ in KLINE_COLUMNS]
+        conn = self.db_pool.get_connection()
+        try:
+            # 使用流式游标分批读取，避免一次性加载全部结果集
+            cursor = conn.cursor(pymysql.cursors.SSCursor)
+            try:
+                cursor.execute(f"SELECT {', '.join(KLINE_COLUMNS)} FROM {table} PARTITION ({name}) "
+                               f"ORDER BY symbol, open_time")
+                while True:
+                    rows = cursor.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    for values, row_column in zip(columns, zip(*rows)):
+                        values.extend(row_column)
+            finally:
+                cursor.close()
+        finally:
+            conn.close()
+
+        row_count = len(columns[0])
+        if not row_count:
+            return 0
+
+        arrays = {'symbol': np.array(columns[0], dtype=str)}
+        for i, column in enumerate(KLINE_COLUMNS[1:], 1):
+            dtype = np.int64 if column in ('open_time', 'close_time', 'trades_count') else np.float64
+            arrays[column] = np.array(columns[i], dtype=dtype)
+
+        # 先写临时文件再改名，避免中断时留下不完整的归档
+        file_path = os.path.join(table_dir, f"{name}.npz")
+        tmp_path = file_path + '.tmp.npz'
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, file_path)
+
+        logger.info(f"📦 已归档{table}分区{name}: {row_count}行 -> {file_path}")
+        return row_count
+
+    def drop_partitions_before(self, table: str, cutoff_ms: int, archive: bool = True) -> int:
+        """
+        删除上界不超过cutoff_ms的分区（即数据全部早于cutoff_ms），删除前可先归档
+
+        Returns:
+            int: 删除的分区数
+        """
+        expired = [name for name, bound in self.get_partitions(table) if bound is not None and bound <= cutoff_ms]
+        dropped = 0
+        for name in expired:
+            if archive:
+                self.archive_partition(table, name)
+
+            conn = self.db_pool.get_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f'ALTER TABLE {table} DROP PARTITION {name}')
+                conn.commit()
+            finally:
+                conn.close()
+            dropped += 1
+
+        if dropped:
+            logger.info(f"🗑️ {table}删除{dropped}个过期分区")
+        return dropped
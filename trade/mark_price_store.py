@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+标记价格存储（变化记录 + 关键帧）
+
+binance_websocket.py 每秒收到全市场的标记价格，大部分交易对的字段在相邻两秒间没有变化。
+变化记录模式下只有字段变化超过容差时才写入一行，另外每个交易对至少每 keyframe_seconds
+秒写入一次关键帧。读取时用前向填充还原为逐秒的稠密序列：
+1. 容差为0时还原结果与逐秒记录完全一致
+2. 距上一行超过关键帧间隔的秒视为没有数据（断线、下架），返回NaN
+"""
+
+import sqlite3
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+DB_PATH = 'trading_records.db'
+
+# binance_mark_prices 的数值字段（与 mark_price_row 的顺序一致）
+PRICE_FIELDS = ('mark_price', 'index_price', 'estimated_settle_price', 'funding_rate', 'next_funding_time')
+
+DEFAULT_KEYFRAME_SECONDS = 60
+
+
+def init_settings_table(conn: sqlite3.Connection, keyframe_seconds: int):
+    """
+    记录写入使用的关键帧间隔
+
+    读取时按历史上最大的关键帧间隔判断数据是否中断，因此只保留最大值。
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS binance_mark_price_settings (
+            setting_key TEXT PRIMARY KEY,
+            setting_value TEXT NOT NULL
+        )
+    ''')
+    current = get_keyframe_seconds(conn)
+    if current is None or keyframe_seconds > current:
+        conn.execute('INSERT OR REPLACE INTO binance_mark_price_settings VALUES (?, ?)',
+                     ('keyframe_seconds', str(keyframe_seconds)))
+    conn.commit()
+
+
+def get_keyframe_seconds(conn: sqlite3.Connection) -> Optional[int]:
+    """读取记录的关键帧间隔，未记录（逐秒写入的旧数据）时返回None"""
+    try:
+        row = conn.execute("SELECT setting_value FROM binance_mark_price_settings "
+                           "WHERE setting_key = 'keyframe_seconds'").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return int(row[0]) if row else None
+
+
+class MarkPriceChangeFilter:
+    """
+    判断每一行是否需要写入（字段变化超过容差或到达关键帧间隔）
+
+    should_write() 选中的行先记为待写入，批次写入成功后调用 commit() 才作为比较基准；
+    写入失败时调用 rollback()，后续的行仍与上一次成功写入的行比较，不会因失败的批次漏记变化。
+    """
+
+    def __init__(self, tolerance: float = 0.0, keyframe_seconds: int = DEFAULT_KEYFRAME_SECONDS):
+        """
+        Args:
+            tolerance: 价格字段的相对容差（0表示任何变化都写入）；资金费率和下次结算时间任何变化都写入
+            keyframe_seconds: 每个交易对至少每隔多少秒写入一行
+        """
+        self.tolerance = tolerance
+        self.keyframe_ms = keyframe_seconds * 1000
+        # {symbol: 最近写入成功的行}
+        self._last_written: Dict[str, Tuple] = {}
+        # {symbol: 当前批次中最近选中的行}
+        self._pending: Dict[str, Tuple] = {}
+
+    def _price_changed(self, old: Optional[float], new: Optional[float]) -> bool:
+        if old is None or new is None:
+            return old is not new
+        return abs(new - old) > self.tolerance * abs(old)
+
+    def should_write(self, row: Tuple) -> bool:
+        """row 为 mark_price_row 的结果: (event_time, symbol, mark, index, settle, funding, next_funding_time)"""
+        event_time, symbol = row[0], row[1]
+        last = self._pending.get(symbol) or self._last_written.get(symbol)
+
+        write = (
+            last is None
+            or event_time - last[0] >= self.keyframe_ms
+            or self._price_changed(last[2], row[2])
+            or self._price_changed(last[3], row[3])
+            or self._price_changed(last[4], row[4])
+            or last[5] != row[5]
+            or last[6] != row[6]
+        )
+        if write:
+            self._pending[symbol] = row
+        return write
+
+    def commit(self):
+        """当前批次写入成功"""
+        self._last_written.update(self._pending)
+        self._pending.clear()
+
+    def rollback(self):
+        """当前批次写入失败，丢弃待写入的状态"""
+        self._pending.clear()
+
+
+def load_mark_price_series(symbol: str, start_ms: int, end_ms: int, db_path: str = DB_PATH,
+                           max_gap_seconds: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    读取一个交易对的逐秒标记价格序列
+
+    Args:
+        symbol: 交易对，如 BTCUSDT
+        start_ms: 开始时间（毫秒，包含）
+        end_ms: 结束时间（毫秒，包含）
+        db_path: 数据库路径
+        max_gap_seconds: 前向填充的最长秒数，默认使用记录的关键帧间隔
+
+    Returns:
+        Dict[str, np.ndarray]: {'time': 每秒的毫秒时间戳, 'mark_price': ..., ...}，没有数据的秒为NaN
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        if max_gap_seconds is None:
+            max_gap_seconds = get_keyframe_seconds(conn) or DEFAULT_KEYFRAME_SECONDS
+
+        # 多读取一个关键帧间隔，取得开始时刻之前的最后状态
+        rows = conn.execute(f'''
+            SELECT event_time, {', '.join(PRICE_FIELDS)}
+            FROM binance_mark_prices
+            WHERE symbol = ? AND event_time >= ? AND event_time <= ?
+            ORDER BY event_time
+        ''', (symbol, start_ms - max_gap_seconds * 1000, end_ms)).fetchall()
+    finally:
+        conn.close()
+
+    grid = np.arange(start_ms // 1000, end_ms // 1000 + 1, dtype=np.int64)
+    series = {'time': grid * 1000}
+    if not rows:
+        for field in PRICE_FIELDS:
+            series[field] = np.full(len(grid), np.nan)
+        return series
+
+    data = np.array(rows, dtype=np.float64)
+    row_seconds = data[:, 0].astype(np.int64) // 1000
+
+    # 每一秒取该秒及之前的最后一行
+    idx = np.searchsorted(row_seconds, grid, side='right') - 1
+    valid = idx >= 0
+    # 关键帧按事件时间触发，相邻两行的间隔可能比关键帧间隔多出1秒
+    valid[valid] = grid[valid] - row_seconds[idx[valid]] <= max_gap_seconds + 1
+
+    for i, field in enumerate(PRICE_FIELDS, 1):
+        values = np.full(len(grid), np.nan)
+        values[valid] = data[idx[valid], i]
+        series[field] = values
+    return series
@@ -25,6 +25,7 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
 from tools.logger import logger
+from tools.funding_rate_store import FundingRateStore
 from config import okx_api_key, okx_api_secret, okx_api_passphrase, proxies, project_root
 import ccxt
 import time
@@ -78,6 +79,9 @@ class OKXContractScanner:
         self.price_volatility_threshold = price_volatility_threshold
         self.min_leverage = min_leverage
         self.days_to_analyze = days_to_analyze
+        
+        # 资金费率历史仓库（与其他扫描器和套利监控共用）
+        self.funding_store = FundingRateStore()
         self.exchange_name = "OKX"  # 交易所名称
         
         logger.info(f"OKX合约扫描器初始化完成")
@@ -345,9 +349,55 @@ class OKXContractScanner:
         
         # return 8.0  # 默认8小时
 
+    def _fetch_funding_rates(self, symbol: str, start_ms: int, end_ms: int, max_pages: int = 20) -> List[Dict]:
+        """
+        分页获取 [start_ms, end_ms] 内的资金费率，供资金费率仓库增量同步，失败或超过页数上限时抛出异常
+        
+        Args:
+            symbol: 交易对符号
+            start_ms: 开始时间（毫秒）
+            end_ms: 结束时间（毫秒）
+            max_pages: 最多请求的页数
+            
+        Returns:
+            List[Dict]: [{'fundingTime': 毫秒, 'fundingRate': 资金费率}]
+        """
+        history = []
+        if not symbol.endswith('/USDT:USDT'):
+            # 非USDT永续合约使用ccxt的fetch_funding_rate_history，按时间正序分页
+            since = start_ms
+            for _ in range(max_pages):
+                funding_rates = self.exchange.fetch_funding_rate_history(symbol=symbol, since=since, limit=100)
+                history.extend({'fundingTime': rate['timestamp'], 'fundingRate': rate['fundingRate']}
+                               for rate in funding_rates if rate['timestamp'] <= end_ms)
+                if len(funding_rates) < 100 or funding_rates[-1]['timestamp'] >= end_ms:
+                    return history
+                since = funding_rates[-1]['timestamp'] + 1
+            # 达到页数上限时返回部分数据会被仓库记录为已同步，缺失的部分不会再获取
+            raise Exception(f"{symbol}资金费率超过{max_pages}页仍未取完，放弃本次同步以免记录不完整的范围")
+        
+        # 使用OKX原生API，按时间倒序分页（before/after 为开区间）
+        inst_id = f"{symbol.split('/')[0]}-USDT-SWAP"
+        after = end_ms + 1
+        for _ in range(max_pages):
+            response = self.exchange.publicGetPublicFundingRateHistory({
+                'instId': inst_id,
+                'before': str(start_ms - 1),
+                'after': str(after),
+                'limit': '100'
+            })
+            page = response.get('data', []) if response else []
+            history.extend({'fundingTime': int(rate['fundingTime']), 'fundingRate': rate['fundingRate']}
+                           for rate in page)
+            if len(page) < 100:
+                return history
+            after = min(int(rate['fundingTime']) for rate in page)
+        # 倒序分页达到上限时缺少的是较早的结算，仓库不会再补齐
+        raise Exception(f"{symbol}资金费率超过{max_pages}页仍未取完，放弃本次同步以免记录不完整的范围")
+
     def get_funding_rate_history(self, symbol: str, days: int = 30) -> Optional[List[float]]:
         """
-        获取交易对的资金费率历史数据
+        获取交易对的资金费率历史数据（来自本地资金费率仓库，只增量请求新的结算记录）
         
         Args:
             symbol: 交易对符号
@@ -360,65 +410,21 @@ class OKXContractScanner:
             # 计算开始时间
             since = int((datetime.now() - timedelta(days=days)).timestamp() * 1000)
             
-            # 尝试使用原始的OKX instId格式
-            inst_id = None
-            if symbol.endswith('/USDT:USDT'):
-                base_asset = symbol.split('/')[0]
-                inst_id = f"{base_asset}-USDT-SWAP"
+            # 增量同步后从本地读取
+            data = self.funding_store.history('OKX', symbol,
+                                              lambda start, end: self._fetch_funding_rates(symbol, start, end), since)
             
-            funding_rates_raw = None
+            if len(data['funding_rate']) == 0:
+                logger.warning(f"{symbol}: 无资金费率数据")
+                return None
             
-            # 首先尝试使用原始API调用
-            if inst_id:
-                try:
-                    # 使用OKX原生API获取资金费率历史
-                    response = self.exchange.publicGetPublicFundingRateHistory({
-                        'instId': inst_id,
-                        'before': str(since),
-                        'limit': str(days * 3 + 10)  # 每天3次，多获取一些
-                    })
-                    
-                    if response and 'data' in response and response['data']:
-                        funding_rates_raw = response['data']
-                        rates = []
-                        for rate_data in response['data']:
-                            if 'fundingRate' in rate_data and rate_data['fundingRate'] is not None:
-                                rates.append(float(rate_data['fundingRate']))
-                        
-                        if rates:
-                            # 计算结算周期
-                            self.funding_interval_hours = self.get_funding_rate_interval(funding_rates_raw)
-                            logger.debug(f"{symbol}: 通过原生API获取到{len(rates)}个资金费率数据点，结算周期{self.funding_interval_hours:.1f}小时")
-                            return rates
-                        else:
-                            logger.warning(f"{symbol}: 原生API无有效资金费率数据")
-                            
-                except Exception as api_error:
-                    logger.debug(f"{symbol}: 原生API资金费率调用失败: {str(api_error)}")
+            # 计算结算周期
+            self.funding_interval_hours = self.funding_store.interval_hours('OKX', symbol)
             
-            # 如果原生API失败，尝试使用ccxt的fetch_funding_rate_history
-            try:
-                funding_rates = self.exchange.fetch_funding_rate_history(
-                    symbol=symbol,
-                    since=since,
-                    limit=days * 3 + 10  # 每天3次，多获取一些
-                )
-                
-                if not funding_rates:
-                    logger.warning(f"{symbol}: ccxt无资金费率数据")
-                    return None
-                
-                # 计算结算周期
-                self.funding_interval_hours = self.get_funding_rate_interval(funding_rates)
-                
-                # 提取资金费率
-                rates = [float(rate['fundingRate']) for rate in funding_rates if rate['fundingRate'] is not None]
-                logger.debug(f"{symbol}: 通过ccxt获取到{len(rates)}个资金费率数据点，结算周期{self.funding_interval_hours:.1f}小时")
-                return rates
-                
-            except Exception as ccxt_error:
-                logger.debug(f"{symbol}: ccxt资金费率调用失败: {str(ccxt_error)}")
-                return None
+            # 提取资金费率
+            rates = data['funding_rate'].tolist()
+            logger.debug(f"{symbol}: 获取到{len(rates)}个资金费率数据点，结算周期{self.funding_interval_hours:.1f}小时")
+            return rates
             
         except Exception as e:
             logger.error(f"获取{symbol}资金费率数据失败: {str(e)}")
@@ -627,6 +633,7 @@ class OKXContractScanner:
                 logger.info(f"已处理 {i}/{total_count} 个交易对，找到 {len(qualified_symbols)} 个符合条件的交易对")
         
         logger.info(f"扫描完成! 总共分析了 {total_count} 个交易对，找到 {len(qualified_symbols)} 个符合条件的交易对")
+        self.funding_store.log_stats()
         return qualified_symbols
 
     def generate_report(self, qualified_symbols: List[Dict[str, Any]]):